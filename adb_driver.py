@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+ADB Device Driver
+Drives the PlayerID app over one persistent `adb shell` session and waits on
+real device conditions (screen contents, TrainingPipeline log lines) instead of
+fixed sleeps.
+
+Finding adb (first match wins):
+    1. the ADB environment variable (full path to adb / adb.exe, or a fake-adb .py script)
+    2. ANDROID_SDK_ROOT or ANDROID_HOME + platform-tools/adb
+    3. sdk.dir in local.properties (written by Android Studio next to settings.gradle)
+    4. adb on PATH
+
+Fake device for local testing: point ADB at a Python script that accepts the same
+arguments (`shell`, `logcat ...`, `-s SERIAL ...`) and the driver runs it with the
+current interpreter. tests/fake_adb.py is such a stand-in (real `sh`, canned
+dumpsys / logcat); the driver's tests run against it:
+    python -m pytest tests
+
+Usage:
+    with AdbDriver() as device:
+        device.start_app()
+        device.tap_until_screen([(540, 700), (540, 800)], "JerseyValidation")
+        device.wait_for_log("exported successfully", timeout=120)
+"""
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Configuration
+APP_PACKAGE = "com.playerid.app"
+MAIN_ACTIVITY = f"{APP_PACKAGE}/.MainActivity"
+LOG_TAGS = ("TrainingPipeline", "Export", "Training", "Convert", "Deploy")  # logcat tags of the pipeline
+POLL_INTERVAL = 0.25  # seconds between screen checks while waiting
+COMMAND_TIMEOUT = 15  # seconds for a single shell command
+
+PROJECT_DIR = Path(__file__).resolve().parent
+
+
+class AdbError(RuntimeError):
+    """adb is missing, the device went away or a shell command failed"""
+
+
+def _sdk_dir_from_local_properties(project_dir=PROJECT_DIR):
+    properties = project_dir / "local.properties"
+    if not properties.exists():
+        return None
+    for line in properties.read_text(encoding="utf-8").splitlines():
+        if line.strip().startswith("sdk.dir="):
+            # local.properties escapes ':' and '\' on Windows
+            return line.split("=", 1)[1].strip().replace("\\:", ":").replace("\\\\", "\\")
+    return None
+
+
+def find_adb():
+    """Returns the adb command as an argv list (see module docstring for the lookup order)"""
+    candidates = [os.environ.get("ADB")]
+    sdk_dirs = [os.environ.get("ANDROID_SDK_ROOT"), os.environ.get("ANDROID_HOME"), _sdk_dir_from_local_properties()]
+    exe = "adb.exe" if os.name == "nt" else "adb"
+    candidates += [str(Path(sdk) / "platform-tools" / exe) for sdk in sdk_dirs if sdk]
+    candidates.append(shutil.which("adb"))
+
+    for candidate in candidates:
+        if candidate and Path(candidate).exists():
+            return adb_command(candidate)
+    raise AdbError("adb not found: set ADB, ANDROID_SDK_ROOT or sdk.dir in local.properties")
+
+
+def adb_command(path):
+    """A .py path runs under this interpreter (fake adb); anything else is executed directly"""
+    return [sys.executable, str(path)] if str(path).endswith(".py") else [str(path)]
+
+
+def _pump(stream, lines):
+    """Reader thread: moves stream lines into a queue so reads can time out"""
+    for line in iter(stream.readline, ""):
+        lines.put(line.rstrip("\r\n"))
+    lines.put(None)  # EOF
+
+
+class AdbDriver:
+    """
+    One device: a persistent `adb shell` for commands plus a background
+    `adb logcat` reader filtered to LOG_TAGS.
+    """
+
+    def __init__(self, serial=None, adb=None, log_tags=LOG_TAGS):
+        self.adb = adb_command(adb) if adb else find_adb()
+        self.serial = serial
+        self.log_tags = log_tags
+        self._shell = None
+        self._shell_lines = None
+        self._logcat = None
+        self._log_lines = None
+        self._lock = threading.Lock()
+
+    def _argv(self, *args):
+        return self.adb + (["-s", self.serial] if self.serial else []) + list(args)
+
+    def _spawn(self, *args):
+        process = subprocess.Popen(self._argv(*args), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace",
+                                   bufsize=1)
+        lines = queue.Queue()
+        threading.Thread(target=_pump, args=(process.stdout, lines), daemon=True).start()
+        return process, lines
+
+    # Session ----------------------------------------------------------
+
+    def open(self):
+        if self._shell is None or self._shell.poll() is not None:
+            self._shell, self._shell_lines = self._spawn("shell")
+        return self
+
+    def close(self):
+        for process in (self._shell, self._logcat):
+            if process and process.poll() is None:
+                try:
+                    if process is self._shell:
+                        process.stdin.write("exit\n")
+                        process.stdin.flush()
+                        process.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+                if process.poll() is None:
+                    process.kill()
+        self._shell = self._logcat = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run(self, *args, timeout=COMMAND_TIMEOUT):
+        """One-off adb invocation outside the shell session (pull, install, ...)"""
+        result = subprocess.run(self._argv(*args), capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise AdbError(f"adb {' '.join(args)} failed: {result.stderr.strip() or result.stdout.strip()}")
+        return result.stdout
+
+    def pull_tar(self, remote_dir, local_dir, paths=(".",), timeout=600):
+        """
+        Copies remote_dir/paths in one transfer: the device streams a tar archive
+        over `adb exec-out` and it is unpacked locally as it arrives.
+        Returns the number of files extracted.
+        """
+        Path(local_dir).mkdir(parents=True, exist_ok=True)
+        command = f"tar -cf - -C {remote_dir} {' '.join(paths)}"
+        process = subprocess.Popen(self._argv("exec-out", command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Refuse absolute paths / links escaping local_dir where the tarfile filter is available
+        safe = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        files = 0
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+                for member in archive:
+                    if member.isfile() or member.isdir():
+                        archive.extract(member, local_dir, **safe)
+                        files += member.isfile()
+            process.wait(timeout=timeout)
+        except (tarfile.TarError, subprocess.TimeoutExpired) as e:
+            process.kill()
+            raise AdbError(f"Bulk pull of {remote_dir} failed: {e}") from e
+        if process.returncode != 0:
+            raise AdbError(f"tar on device failed: {process.stderr.read().decode(errors='replace').strip()}")
+        return files
+
+    # Shell ------------------------------------------------------------
+
+    def shell(self, command, timeout=COMMAND_TIMEOUT):
+        """
+        Runs a command in the persistent shell and returns its output.
+        A unique end marker carrying the exit status tells us when the output is complete.
+        The marker goes on a line of its own even when the output has no trailing newline.
+        """
+        with self._lock:
+            self.open()
+            marker = f"__adb_driver_{uuid.uuid4().hex}__"
+            try:
+                self._shell.stdin.write(f"{command}; printf '\\n%s %d\\n' {marker} $?\n")
+                self._shell.stdin.flush()
+            except OSError as e:
+                raise AdbError(f"adb shell session closed: {e}") from e
+
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # The session is now out of sync with our markers; start a fresh one next time
+                    self._shell.kill()
+                    self._shell = None
+                    raise TimeoutError(f"'{command}' did not finish within {timeout}s")
+                try:
+                    line = self._shell_lines.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    raise AdbError("adb shell session ended (device disconnected?)")
+                if line.startswith(marker):
+                    if output and output[-1] == "":
+                        output.pop()  # the newline printf puts in front of the marker
+                    status = line[len(marker):].strip()
+                    if status not in ("", "0"):
+                        raise AdbError(f"'{command}' exited with {status}: {' '.join(output)[-500:]}")
+                    return "\n".join(output)
+                output.append(line)
+
+    def batch(self, commands, timeout=COMMAND_TIMEOUT):
+        """Sends several commands in one round trip"""
+        return self.shell("; ".join(commands), timeout=timeout)
+
+    def tap(self, x, y):
+        self.shell(f"input tap {int(x)} {int(y)}")
+
+    def taps(self, points):
+        """All taps in a single write; each `input` still completes before the next starts"""
+        self.batch([f"input tap {int(x)} {int(y)}" for x, y in points])
+
+    # Screen -----------------------------------------------------------
+
+    def start_app(self, activity=MAIN_ACTIVITY):
+        """`am start -W` returns once the activity has actually launched"""
+        output = self.shell(f"am start -W -n {activity}", timeout=30)
+        if "Error" in output:
+            raise AdbError(f"Could not start {activity}: {output}")
+        return output
+
+    def top_activity(self):
+        return self.shell("dumpsys activity top", timeout=COMMAND_TIMEOUT)
+
+    def is_app_running(self, package=APP_PACKAGE):
+        return bool(self.shell(f"pidof {package} || true").strip())
+
+    def wait_until(self, predicate, timeout, interval=POLL_INTERVAL, description="condition"):
+        """Polls predicate() until it returns something truthy; raises TimeoutError otherwise"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = predicate()
+            if result:
+                return result
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+            time.sleep(interval)
+
+    def wait_for_screen(self, text, timeout=5):
+        """Waits until `dumpsys activity top` mentions text (activity, fragment or view name)"""
+        return self.wait_until(lambda: text in self.top_activity(), timeout, description=f"screen '{text}'")
+
+    def tap_until_screen(self, points, text, timeout_per_tap=2):
+        """
+        Taps candidate positions one at a time, stopping as soon as the screen shows text.
+        Returns the point that worked; raises TimeoutError if none did.
+        """
+        if text in self.top_activity():
+            return None
+        for point in points:
+            self.tap(*point)
+            try:
+                self.wait_for_screen(text, timeout_per_tap)
+                return point
+            except TimeoutError:
+                continue
+        raise TimeoutError(f"None of {len(points)} tap positions opened '{text}'")
+
+    # Logcat -----------------------------------------------------------
+
+    def start_logcat(self):
+        """Starts streaming LOG_TAGS from now on (older lines are skipped with -T 1)"""
+        if self._logcat is None or self._logcat.poll() is not None:
+            filters = [f"{tag}:V" for tag in self.log_tags] + ["*:S"]
+            self._logcat, self._log_lines = self._spawn("logcat", "-v", "threadtime", "-T", "1", *filters)
+        return self
+
+    def log_lines(self, timeout=None):
+        """Yields logcat lines as they arrive; stops after timeout seconds of silence"""
+        self.start_logcat()
+        while True:
+            try:
+                line = self._log_lines.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if line is None:
+                return
+            yield line
+
+    def wait_for_log(self, pattern, timeout=60, fail_pattern=None):
+        """
+        Waits for a logcat line matching pattern (regex) and returns it.
+        A line matching fail_pattern raises AdbError immediately.
+        """
+        self.start_logcat()
+        match, fail = re.compile(pattern), re.compile(fail_pattern) if fail_pattern else None
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No log line matching '{pattern}' within {timeout}s")
+            try:
+                line = self._log_lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                raise AdbError("adb logcat ended (device disconnected?)")
+            if fail and fail.search(line):
+                raise AdbError(f"Device reported failure: {line}")
+            if match.search(line):
+                return line
+
+
+def list_devices(adb=None):
+    """Serials of attached devices in the 'device' state"""
+    command = adb_command(adb) if adb else find_adb()
+    output = subprocess.run(command + ["devices"], capture_output=True, text=True, timeout=COMMAND_TIMEOUT).stdout
+    return [line.split()[0] for line in output.splitlines()[1:]
+            if line.strip() and line.split()[-1] == "device"]
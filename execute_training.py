@@ -4,81 +4,111 @@ Automated Training Pipeline Executor
 Triggers the enhanced ML model training with realistic positioning data
 """
 
-import subprocess
-import time
+import argparse
 import os
 import json
+import time
 from datetime import datetime
+from pathlib import Path
+
+from adb_driver import AdbDriver, AdbError
+from pipeline_monitor import STAGES, PipelineMonitor
 
-def execute_training_pipeline():
+# Candidate positions of the Jersey Validation entry and of the "Export & Train" button
+NAV_POSITIONS = [(540, 700), (540, 800), (540, 900)]
+TRAIN_BUTTON_POSITIONS = [
+    (540, 1400),  # Bottom center
+    (540, 1350),  # Slightly higher
+    (270, 1400),  # Bottom left
+    (810, 1400),  # Bottom right
+    (540, 1300),  # Middle bottom area
+]
+PIPELINE_STARTED = r"TrainingPipeline.*Starting"
+
+def execute_training_pipeline(serial=None, adb=None, timeout=300, until="export", events_path=None):
     """Execute the automated training pipeline with enhanced positioning"""
     
     print("🚀 EXECUTING AUTOMATED TRAINING PIPELINE")
     print("=" * 60)
     print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
-    
-    # Step 1: Ensure app is in Jersey Validation screen
-    print("📱 Step 1: Navigating to Jersey Validation Screen...")
-    try:
-        # Start app if not running
-        subprocess.run([
-            "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-            "shell", "am", "start", "-n", "com.playerid.app/.MainActivity"
-        ], timeout=10)
-        time.sleep(3)
-        
-        # Navigate to Jersey Validation (try multiple tap positions)
-        nav_positions = [(540, 700), (540, 800), (540, 900)]
-        for x, y in nav_positions:
-            subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "input", "tap", str(x), str(y)
-            ], timeout=5)
-            time.sleep(2)
-        
-        print("✅ Navigation to Jersey Validation screen completed")
-        
-    except Exception as e:
-        print(f"⚠️  Navigation warning: {e}")
-    
-    # Step 2: Trigger automated training pipeline
-    print("\n🎯 Step 2: Triggering Automated Training Pipeline...")
+
     try:
-        # Look for the "Train Model" or "Export & Train" button
-        # This should be at the bottom of the Jersey Validation screen
-        train_button_positions = [
-            (540, 1400),  # Bottom center
-            (540, 1350),  # Slightly higher
-            (270, 1400),  # Bottom left
-            (810, 1400),  # Bottom right
-            (540, 1300),  # Middle bottom area
-        ]
-        
-        for i, (x, y) in enumerate(train_button_positions):
+        device = AdbDriver(serial=serial, adb=adb).open()
+    except AdbError as e:
+        print(f"❌ {e}")
+        return False
+
+    with device:
+        # Listen before tapping so the pipeline's first log line isn't missed
+        device.start_logcat()
+
+        # Step 1: Ensure app is in Jersey Validation screen
+        print("📱 Step 1: Navigating to Jersey Validation Screen...")
+        try:
+            device.start_app()
+            point = device.tap_until_screen(NAV_POSITIONS, "JerseyValidation")
+            print(f"✅ Jersey Validation screen open{f' (tapped {point})' if point else ''}")
+        except (AdbError, TimeoutError) as e:
+            print(f"⚠️  Navigation warning: {e}")
+
+        # Step 2: Trigger automated training pipeline
+        print("\n🎯 Step 2: Triggering Automated Training Pipeline...")
+        triggered = False
+        for x, y in TRAIN_BUTTON_POSITIONS:
             print(f"  Attempting to tap training button at ({x}, {y})...")
-            subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "input", "tap", str(x), str(y)
-            ], timeout=5)
-            time.sleep(3)
-            
-            if i < len(train_button_positions) - 1:
-                time.sleep(2)  # Wait between attempts
-        
-        print("✅ Training pipeline trigger commands sent")
-        
-    except Exception as e:
-        print(f"⚠️  Training trigger warning: {e}")
-    
-    # Step 3: Monitor training progress
-    print("\n📊 Step 3: Monitoring Training Progress...")
-    print("🔄 The automated pipeline will now:")
-    print("   1. Export validation data with enhanced positioning")
-    print("   2. Convert to YOLO format with realistic bounding boxes")
-    print("   3. Train custom ML model using TensorFlow")
-    print("   4. Convert to TensorFlow Lite format")
-    print("   5. Deploy to CustomJerseyDetectionManager")
+            try:
+                device.tap(x, y)
+                line = device.wait_for_log(PIPELINE_STARTED, timeout=3)
+                print(f"✅ Pipeline started: {line}")
+                triggered = True
+                break
+            except TimeoutError:
+                continue
+            except AdbError as e:
+                print(f"⚠️  Training trigger warning: {e}")
+                break
+
+        if not triggered:
+            print("❌ No TrainingPipeline activity after tapping every candidate position")
+            return False
+
+        # Step 3: Monitor training progress
+        print("\n📊 Step 3: Monitoring Training Progress...")
+        print("🔄 The automated pipeline will now:")
+        print("   1. Export validation data with enhanced positioning")
+        print("   2. Convert to YOLO format with realistic bounding boxes")
+        print("   3. Train custom ML model using TensorFlow")
+        print("   4. Convert to TensorFlow Lite format")
+        print("   5. Deploy to CustomJerseyDetectionManager")
+        print()
+
+        events = open(events_path, "a", encoding="utf-8") if events_path else None
+        monitor = PipelineMonitor(events)
+        try:
+            monitor.feed(line)
+            deadline = time.monotonic() + timeout
+            # log_lines() stops on its own if logcat stays quiet for the whole timeout
+            for log_line in device.log_lines(timeout=timeout):
+                for event in monitor.feed(log_line):
+                    duration = f" ({event['duration_s']}s)" if "duration_s" in event else ""
+                    print(f"  [{event['elapsed_s']:>8.1f}s] {event['stage']:<17} {event['event']}{duration}")
+                if until in monitor.finished or monitor.failed or time.monotonic() >= deadline:
+                    break
+        finally:
+            if events:
+                events.close()
+
+        summary = monitor.summary()
+        for stage, totals in summary["stages"].items():
+            if totals["runs"] or totals["errors"]:
+                print(f"  ⏱️  {stage:<17} {totals['last_s']}s" + (" ❌" if totals["errors"] else ""))
+        if monitor.failed:
+            print("❌ The pipeline reported a failure")
+            return False
+        if until not in monitor.finished:
+            print(f"❌ '{until}' did not finish within {timeout}s")
+            return False
     
     # Step 4: Check for training files
     print("\n📁 Step 4: Checking for Training Files...")
@@ -89,7 +119,7 @@ def execute_training_pipeline():
     ]
     
     for filename in expected_files:
-        filepath = f"C:/Users/Ryan/PlayerID/PlayerID-Android/{filename}"
+        filepath = Path(__file__).resolve().parent / filename
         if os.path.exists(filepath):
             print(f"✅ Found: {filename}")
         else:
@@ -118,7 +148,15 @@ def execute_training_pipeline():
     return True
 
 if __name__ == "__main__":
-    success = execute_training_pipeline()
+    parser = argparse.ArgumentParser(description="Trigger the on-device training pipeline over adb")
+    parser.add_argument("--serial", help="Device serial (adb devices); default: the only attached device")
+    parser.add_argument("--adb", help="adb executable (default: ADB, ANDROID_SDK_ROOT or local.properties)")
+    parser.add_argument("--timeout", type=int, default=300, help="Seconds to wait for the pipeline")
+    parser.add_argument("--until", choices=STAGES, default="export", help="Pipeline stage to wait for")
+    parser.add_argument("--events", help="Append stage events (JSON Lines) to this file")
+    args = parser.parse_args()
+
+    success = execute_training_pipeline(args.serial, args.adb, args.timeout, args.until, args.events)
     if success:
         print("\n🎉 AUTOMATED TRAINING PIPELINE EXECUTION COMPLETE!")
         print("The enhanced ML model training is now in progress...")
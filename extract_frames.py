@@ -0,0 +1,356 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import queue
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+from PIL import Image
+
+from image_dedup import INDEX_NAME, NEAR_DUPLICATE_DISTANCE, DedupIndex, dhash, pixel_sha256
+from sanitize_images import JPEG_QUALITY, peak_rss_mb
+
+# --- HOW TO USE ---
+# 1. Install OpenCV, NumPy and Pillow:
+#    pip install opencv-python numpy Pillow
+#
+# 2. Run it on one video or a folder of videos:
+#    python extract_frames.py --video game_footage.mp4 --fps 2
+#    python extract_frames.py --video ./game_videos --output ml_training/data/images --workers 4
+#
+#    Videos are decoded as a stream, one process per video. Frames that are
+#    skipped anyway are only grabbed, never converted to pixels. Every
+#    candidate frame gets two cheap scores on a small grayscale copy:
+#      * sharpness: variance of the Laplacian (low = motion blur / out of focus),
+#        compared with the running median of the same video, since a night game
+#        and a sunny one have very different absolute values.
+#      * novelty: mean absolute difference of a 32x18 thumbnail against the last
+#        kept frame (low = same scene, camera hasn't moved).
+#    Of every --oversample consecutive candidates only the sharpest one is kept,
+#    and only if it is sharp and novel enough.
+#
+#    Kept frames never hit the disk as full-resolution PNGs: they are downscaled,
+#    checked against the same duplicate index sanitize_images.py uses and written
+#    straight out as clean JPEGs. Memory stays flat however long the game is.
+#
+#    Re-running is cheap: finished videos are recorded in a manifest in the output
+#    folder and skipped unless the video or the settings change.
+# ------------------
+
+# --- Configuration ---
+output_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ml_training", "data", "images")
+
+# Kept frames per second of video, at most.
+fps = 2.0
+
+# Candidates scored per kept frame; the sharpest of each group wins.
+oversample = 4
+
+# A candidate must be at least this sharp relative to the video's running median...
+relative_sharpness = 0.6
+# ...and never below this absolute Laplacian variance.
+min_sharpness = 20.0
+
+# Minimum mean thumbnail difference (0-1) to the last kept frame.
+min_novelty = 0.04
+
+# Longest side of the saved frames (the trainers run at 640px).
+max_side = 640
+
+workers = os.cpu_count() or 1
+# --- End Configuration ---
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.m4v', '.webm')
+MANIFEST_NAME = ".extract_manifest.jsonl"
+ANALYSIS_WIDTH = 320
+THUMB_SIZE = (32, 18)
+SHARPNESS_HISTORY = 200
+QUEUE_FRAMES_PER_WORKER = 8
+
+
+def _settings_key(settings):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _iter_videos(video):
+    if os.path.isdir(video):
+        with os.scandir(video) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(VIDEO_EXTENSIONS) and entry.is_file():
+                    yield entry.path
+    else:
+        yield video
+
+
+def score_frame(frame):
+    """Returns (sharpness, thumbnail) from a small grayscale copy of a BGR frame."""
+    import cv2
+    import numpy as np
+
+    height, width = frame.shape[:2]
+    scale = ANALYSIS_WIDTH / float(width)
+    small = cv2.resize(frame, (ANALYSIS_WIDTH, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+    return sharpness, thumb
+
+
+def _encode_frame(frame, max_side_px):
+    """BGR frame -> downscaled RGB image -> (JPEG bytes, dedup signatures), all in memory."""
+    import cv2
+
+    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if max_side_px and max(img.size) > max_side_px:
+        img.thumbnail((max_side_px, max_side_px), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue(), (pixel_sha256(img), dhash(img))
+
+
+def _extract_video(video_path, frame_queue, settings):
+    """
+    Worker entry point: streams one video and puts every kept frame on the queue.
+    The queue is bounded, so a slow writer throttles decoding instead of piling up frames.
+    """
+    import cv2
+    import numpy as np
+
+    stats = {"video": os.path.basename(video_path), "frames": 0, "candidates": 0, "blurry": 0,
+             "similar": 0, "kept": 0, "error": None}
+    started = time.perf_counter()
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        stats["error"] = "could not open video"
+        frame_queue.put(("done", video_path, stats))
+        return
+
+    native_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, round(native_fps / (settings["fps"] * settings["oversample"])))
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    history = deque(maxlen=SHARPNESS_HISTORY)
+    window = []
+    last_thumb = None
+
+    def flush_window():
+        nonlocal last_thumb
+        sharpness, index, frame, thumb = max(window, key=lambda candidate: candidate[0])
+        window.clear()
+        threshold = max(settings["min_sharpness"], settings["relative_sharpness"] * float(np.median(history)))
+        if sharpness < threshold:
+            stats["blurry"] += 1
+            return
+        novelty = 1.0 if last_thumb is None else float(np.abs(thumb - last_thumb).mean())
+        if novelty < settings["min_novelty"]:
+            stats["similar"] += 1
+            return
+        last_thumb = thumb
+        jpeg, signatures = _encode_frame(frame, settings["max_side"])
+        stats["kept"] += 1
+        frame_queue.put(("frame", video_path, {
+            "output": f"{stem}_{index:07d}.jpg",
+            "time_s": round(index / native_fps, 3),
+            "sharpness": round(sharpness, 1),
+            "novelty": round(novelty, 4),
+            "jpeg": jpeg,
+            "signatures": signatures,
+        }))
+
+    index = -1
+    try:
+        while capture.grab():
+            index += 1
+            if index % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            stats["candidates"] += 1
+            sharpness, thumb = score_frame(frame)
+            history.append(sharpness)
+            window.append((sharpness, index, frame, thumb))
+            if len(window) >= settings["oversample"]:
+                flush_window()
+        if window:
+            flush_window()
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        capture.release()
+
+    stats["frames"] = index + 1
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["decode_fps"] = round(stats["frames"] / stats["seconds"], 1) if stats["seconds"] > 0 else 0.0
+    frame_queue.put(("done", video_path, stats))
+
+
+def _write_frame(record, output_dir, index, duplicates):
+    """Runs in the parent: skips duplicates of already imported images, otherwise writes the JPEG."""
+    pixel_hash, perceptual_hash = record["signatures"]
+    match = index.find(pixel_hash, perceptual_hash) if index is not None else None
+    if match and match[1] != record["output"]:
+        kind, kept, distance = match
+        index.add(record["output"], pixel_hash, perceptual_hash, duplicate_of=kept)
+        duplicates.append({"file": record["output"], "kept": kept, "match": kind, "distance": distance})
+        return False
+
+    output_path = os.path.join(output_dir, record["output"])
+    partial_path = output_path + ".part"
+    with open(partial_path, "wb") as f:
+        f.write(record["jpeg"])
+    os.replace(partial_path, output_path)
+    if index is not None and not match:
+        index.add(record["output"], pixel_hash, perceptual_hash)
+    return True
+
+
+def _load_manifest(manifest_path):
+    done = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[(entry["video"], entry["size"], entry["mtime_ns"], entry["settings"])] = entry
+    return done
+
+
+def extract_frames(video, output_dir=None, num_workers=None, fps_out=None, oversample_n=None,
+                   relative=None, min_sharp=None, novelty=None, max_side_px=None, use_dedup=True,
+                   near_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Extracts sharp, novel frames from one video or a folder of videos into output_dir.
+    Videos are decoded in parallel, one per worker process; kept frames come back
+    over a bounded queue and go through the dedup index before being written.
+    Returns a summary dict with per-video counts and throughput.
+    """
+    output_dir = output_dir or output_folder
+    num_workers = max(1, num_workers or workers)
+    settings = {
+        "fps": fps_out or fps,
+        "oversample": oversample_n or oversample,
+        "relative_sharpness": relative if relative is not None else relative_sharpness,
+        "min_sharpness": min_sharp if min_sharp is not None else min_sharpness,
+        "min_novelty": novelty if novelty is not None else min_novelty,
+        "max_side": max_side_px if max_side_px is not None else max_side,
+    }
+    settings_key = _settings_key(settings)
+
+    if not os.path.exists(video):
+        raise FileNotFoundError(f"Video not found: {video}")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    done = _load_manifest(manifest_path)
+
+    jobs, skipped = [], 0
+    for video_path in _iter_videos(video):
+        st = os.stat(video_path)
+        key = (os.path.basename(video_path), st.st_size, st.st_mtime_ns, settings_key)
+        if key in done:
+            skipped += 1
+        else:
+            jobs.append((video_path, key))
+
+    index = DedupIndex(os.path.join(output_dir, INDEX_NAME), near_distance) if use_dedup else None
+    videos, duplicates = [], []
+    written = 0
+    started = time.perf_counter()
+
+    with Manager() as manager, open(manifest_path, "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=min(num_workers, max(1, len(jobs)))) as executor:
+        frame_queue = manager.Queue(maxsize=num_workers * QUEUE_FRAMES_PER_WORKER)
+        keys = dict(jobs)
+        futures = [executor.submit(_extract_video, video_path, frame_queue, settings) for video_path, _ in jobs]
+        remaining = len(jobs)
+        while remaining:
+            try:
+                kind, video_path, payload = frame_queue.get(timeout=1.0)
+            except queue.Empty:
+                # A worker that died without reporting would otherwise hang the loop
+                crashed = [f for f in futures if f.done() and f.exception() is not None]
+                if crashed and all(f.done() for f in futures):
+                    raise crashed[0].exception()
+                continue
+            if kind == "frame":
+                written += _write_frame(payload, output_dir, index, duplicates)
+                continue
+
+            remaining -= 1
+            if index is not None:
+                index.flush()
+            videos.append(payload)
+            if payload["error"] is None:
+                name, size, mtime_ns, key = keys[video_path]
+                manifest.write(json.dumps({"video": name, "size": size, "mtime_ns": mtime_ns, "settings": key,
+                                           **{k: payload[k] for k in ("frames", "candidates", "kept")}}) + "\n")
+                manifest.flush()
+            print(f"{payload['video']}: {payload['kept']} kept of {payload['candidates']} candidates "
+                  f"({payload['blurry']} blurry, {payload['similar']} similar)", file=sys.stderr)
+
+    if index is not None:
+        index.close()
+
+    elapsed = time.perf_counter() - started
+    frames = sum(v["frames"] for v in videos)
+    return {
+        "output_folder": output_dir,
+        "settings": settings,
+        "videos": len(videos),
+        "skipped_videos": skipped,
+        "frames_decoded": frames,
+        "frames_written": written,
+        "duplicates": len(duplicates),
+        "elapsed_seconds": round(elapsed, 3),
+        "decode_fps": round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "per_video": videos,
+        "duplicate_frames": duplicates,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract sharp, novel frames from game footage.")
+    parser.add_argument("--video", required=True, help="Video file or folder of videos")
+    parser.add_argument("--output", default=output_folder, help="Folder where frames are written")
+    parser.add_argument("--fps", type=float, default=fps, help="Kept frames per second of video, at most")
+    parser.add_argument("--oversample", type=int, default=oversample,
+                        help="Candidates scored per kept frame (the sharpest wins)")
+    parser.add_argument("--relative-sharpness", type=float, default=relative_sharpness,
+                        help="Minimum sharpness relative to the video's running median")
+    parser.add_argument("--min-sharpness", type=float, default=min_sharpness,
+                        help="Minimum absolute Laplacian variance")
+    parser.add_argument("--min-novelty", type=float, default=min_novelty,
+                        help="Minimum thumbnail difference (0-1) to the last kept frame")
+    parser.add_argument("--max-side", type=int, default=max_side, help="Longest side of saved frames")
+    parser.add_argument("--workers", type=int, default=workers, help="Videos decoded in parallel")
+    parser.add_argument("--no-dedup", action="store_true", help="Write duplicates instead of skipping them")
+    parser.add_argument("--near-distance", type=int, default=NEAR_DUPLICATE_DISTANCE,
+                        help="Max dHash Hamming distance (0-64) treated as a near-duplicate")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = extract_frames(args.video, args.output, args.workers, args.fps, args.oversample,
+                                 args.relative_sharpness, args.min_sharpness, args.min_novelty, args.max_side,
+                                 not args.no_dedup, args.near_distance)
+    except FileNotFoundError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 2
+
+    report = json.dumps(summary, indent=2)
+    print(report)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    return 1 if any(v["error"] for v in summary["per_video"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+from PIL import Image
+
+# --- HOW IT WORKS ---
+# Every kept image gets two signatures:
+#   * an exact signature: SHA-256 of the decoded RGB pixels, so the same photo saved
+#     under another name or re-encoded losslessly is caught regardless of metadata.
+#   * a perceptual signature: a 64-bit difference hash (dHash). Re-compressed,
+#     resized or slightly retouched copies land within a few bits of each other.
+#
+# Exact signatures live in a dict; perceptual ones in a BK-tree keyed on Hamming
+# distance, so a lookup only visits the branches that can hold a match instead of
+# comparing against every image seen so far.
+#
+# The index is an append-only JSON-lines file, so incremental batches are checked
+# against everything that was ever imported into the same output folder. A kept
+# file that is written again (its source changed) gets a new line; the newest
+# signature wins and the old one no longer matches anything.
+# ------------------
+
+INDEX_NAME = ".dedup_index.jsonl"
+
+# Two dHashes this many bits apart (or fewer) are treated as the same photo.
+NEAR_DUPLICATE_DISTANCE = 5
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def pixel_sha256(img):
+    """Exact signature: hash of the decoded pixels, independent of file format."""
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(img, hash_size=8):
+    """Perceptual signature: compares neighbouring pixels of a tiny grayscale copy."""
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance.
+    Each node is [hash, key, {distance: child}].
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, key):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, key, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, key, {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Returns [(distance, key)] for every hash within max_distance, closest first."""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[1]))
+            # Triangle inequality: only children in [d - max, d + max] can match.
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        matches.sort()
+        return matches
+
+
+class DedupIndex:
+    """
+    Persistent exact + near-duplicate index for one output folder.
+    Only kept images are searchable; duplicates are recorded so clusters can be
+    reported across runs. Kept entries can carry the source file name and its
+    content hash, so a caller can tell its own earlier output from another image.
+    """
+
+    def __init__(self, index_path, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.index_path = index_path
+        self.max_distance = max_distance
+        self.exact = {}
+        self.kept = {}
+        self.tree = BKTree()
+        self.clusters = {}
+        self._load()
+        self._log = open(index_path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("duplicate_of"):
+                    self.clusters.setdefault(entry["duplicate_of"], []).append(entry["file"])
+                else:
+                    self._insert(entry["file"], entry["pixel_sha256"], int(entry["dhash"], 16),
+                                 entry.get("source"), entry.get("source_sha256"))
+
+    def _insert(self, file, pixel_hash, perceptual_hash, source=None, source_sha256=None):
+        previous = self.kept.get(file)
+        if previous and self.exact.get(previous["pixel_sha256"]) == file:
+            del self.exact[previous["pixel_sha256"]]
+        self.kept[file] = {"pixel_sha256": pixel_hash, "dhash": perceptual_hash,
+                           "source": source, "source_sha256": source_sha256}
+        self.exact.setdefault(pixel_hash, file)
+        # A replaced file's old tree node stays behind; find() skips it
+        self.tree.add(perceptual_hash, file)
+
+    def __len__(self):
+        return len(self.kept)
+
+    def entry(self, file):
+        """Signatures and source of a kept file, or None."""
+        return self.kept.get(file)
+
+    def find(self, pixel_hash, perceptual_hash, exclude=None):
+        """Returns (kind, kept_file, distance) for a duplicate, or None. exclude is never matched."""
+        kept = self.exact.get(pixel_hash)
+        if kept is not None and kept != exclude:
+            return "exact", kept, 0
+        for distance, kept in self.tree.search(perceptual_hash, self.max_distance):
+            current = hamming_distance(self.kept[kept]["dhash"], perceptual_hash)
+            if kept != exclude and current == distance:  # skip nodes of replaced signatures
+                return "near", kept, distance
+        return None
+
+    def add(self, file, pixel_hash, perceptual_hash, duplicate_of=None, source=None, source_sha256=None):
+        entry = {"file": file, "pixel_sha256": pixel_hash, "dhash": f"{perceptual_hash:016x}"}
+        if duplicate_of:
+            entry["duplicate_of"] = duplicate_of
+            self.clusters.setdefault(duplicate_of, []).append(file)
+        else:
+            if source is not None:
+                entry.update(source=source, source_sha256=source_sha256)
+            self._insert(file, pixel_hash, perceptual_hash, source, source_sha256)
+        self._log.write(json.dumps(entry) + "\n")
+
+    def flush(self):
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,453 @@
+"""
+🎲 Offline Augmentation Cache
+
+Pre-renders N seeded augmentation variants per training image into a packed,
+memory-mapped store under AUGMENTED_DIR, so training reads finished variants
+instead of redoing rotation/zoom/brightness work every epoch on the CPU.
+
+Store layout (data/augmented):
+    variants.u8   fixed-size slots of input_size x input_size x 3 uint8 pixels (np.memmap)
+    index.npy     one INDEX_DTYPE row per slot (memory-mapped, updated in place)
+    meta.json     format version, input size, slot count, augmentation config hash
+
+A variant is addressed by (sample_id, variant_seed). Rendering is deterministic:
+the same image, seed and config always give the same pixels and box. Entries
+become stale when the source image changes (size/mtime for loose files, a
+checksum for shards) or when AUGMENT_CONFIG changes. The number of slots is
+derived from a disk budget; when it's full the least recently used slot is
+reused.
+
+Unlike the Keras augmentation layers, geometric transforms here also move the
+bounding box.
+
+Usage:
+    python augment_cache.py --variants 8 --budget-gb 5           # populate from data/
+    python augment_cache.py --shards data/shards --variants 8
+    python augment_cache.py --stats
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from jersey_annotations import iter_samples, read_image_bytes, yolo_box
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+VARIANTS_FILE = "variants.u8"
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+DEFAULT_BUDGET_GB = 5.0
+
+# Online training uses the same ranges (jersey_tf_data.random_affine + create_data_augmentation())
+AUGMENT_CONFIG = {
+    "rotation": 0.1,      # fraction of a full turn (RandomRotation(0.1))
+    "zoom": 0.2,          # RandomZoom(0.2)
+    "translation": 0.1,   # RandomTranslation(0.1, 0.1)
+    "brightness": 0.3,    # RandomBrightness(0.3) on 0-255 pixels
+    "contrast": 0.2,      # RandomContrast(0.2)
+    "min_visible": 0.5,   # re-draw geometry if less than half of the box stays in frame
+}
+
+INDEX_DTYPE = np.dtype([
+    ("sample_key", "<u8"),
+    ("variant_seed", "<u4"),
+    ("fingerprint", "<u8"),     # source image version
+    ("config_hash", "<u4"),
+    ("last_used", "<u8"),       # LRU clock
+    ("jersey_number", "<i2"),
+    ("bbox", "<f4", (4,)),      # YOLO center_x, center_y, width, height after augmentation
+    ("valid", "?"),
+])
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def config_hash(config, input_size):
+    return zlib.crc32(json.dumps({**config, "input_size": input_size}, sort_keys=True).encode("utf-8"))
+
+
+def sample_fingerprint(ref, image_bytes=None):
+    """Changes whenever the source image does: size+mtime for files, a checksum for shard records"""
+    if ref[0] == "file":
+        stat = os.stat(ref[1])
+        return _hash64(f"{stat.st_size}:{stat.st_mtime_ns}")
+    if image_bytes is None:
+        image_bytes = read_image_bytes(ref)
+    return _hash64(f"{len(image_bytes)}:{zlib.crc32(image_bytes)}")
+
+
+# 🎨 Rendering --------------------------------------------------------------
+
+def _affine(rng, config, size):
+    """Forward 2x3 matrix (source pixel -> output pixel) for one random draw"""
+    angle = rng.uniform(-1, 1) * config["rotation"] * 2 * np.pi
+    scale = 1.0 + rng.uniform(-1, 1) * config["zoom"]
+    tx, ty = rng.uniform(-1, 1, 2) * config["translation"] * size
+    cos, sin = np.cos(angle) * scale, np.sin(angle) * scale
+    c = size / 2
+    return np.array([[cos, -sin, c - cos * c + sin * c + tx],
+                     [sin, cos, c - sin * c - cos * c + ty]])
+
+
+def _transform_box(matrix, box, size):
+    """Enclosing box of the transformed corners, clipped to the frame, plus the visible fraction"""
+    cx, cy, w, h = np.asarray(box, dtype=np.float64) * size
+    corners = np.array([[cx - w / 2, cy - h / 2, 1], [cx + w / 2, cy - h / 2, 1],
+                        [cx - w / 2, cy + h / 2, 1], [cx + w / 2, cy + h / 2, 1]])
+    points = corners @ matrix.T
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    full = max((x1 - x0) * (y1 - y0), 1e-6)
+    x0, x1 = np.clip([x0, x1], 0, size)
+    y0, y1 = np.clip([y0, y1], 0, size)
+    visible = (x1 - x0) * (y1 - y0) / full
+    return np.array([(x0 + x1) / 2, (y0 + y1) / 2, x1 - x0, y1 - y0]) / size, visible
+
+
+def render_variant(image, box, sample_key, seed, config=AUGMENT_CONFIG):
+    """
+    🎲 One deterministic variant of a decoded, resized uint8 image.
+    Returns (pixels uint8 (S, S, 3), YOLO box).
+    """
+    size = image.shape[0]
+    rng = np.random.default_rng([sample_key, seed])
+
+    matrix, new_box = None, box
+    for _ in range(3):  # a few draws to keep the jersey mostly in frame
+        candidate = _affine(rng, config, size)
+        candidate_box, visible = _transform_box(candidate, box, size)
+        if visible >= config["min_visible"]:
+            matrix, new_box = candidate, candidate_box
+            break
+
+    pil = Image.fromarray(image)
+    if matrix is not None:
+        inverse = np.linalg.inv(np.vstack([matrix, [0, 0, 1]]))[:2]
+        pil = pil.transform((size, size), Image.Transform.AFFINE, inverse.flatten().tolist(),
+                            resample=Image.Resampling.BILINEAR)
+    pixels = np.asarray(pil, dtype=np.float32)
+
+    # Contrast around the per-channel mean, then brightness, like RandomContrast / RandomBrightness
+    contrast = 1.0 + rng.uniform(-1, 1) * config["contrast"]
+    mean = pixels.mean(axis=(0, 1), keepdims=True)
+    pixels = (pixels - mean) * contrast + mean + rng.uniform(-1, 1) * config["brightness"] * 255
+    return np.clip(pixels, 0, 255).astype(np.uint8), np.asarray(new_box, dtype=np.float32)
+
+
+def decode_resized(image_bytes, size):
+    """Decode + bilinear resize, matching jersey_tf_data.decode_image"""
+    with Image.open(BytesIO(image_bytes)) as img:
+        return np.asarray(img.convert("RGB").resize((size, size), Image.Resampling.BILINEAR))
+
+
+def _render_sample(ref, annotation, sample_key, seeds, size, config):
+    """Worker entry point: decodes a source once and renders the requested seeds"""
+    image_bytes = read_image_bytes(ref)
+    fingerprint = sample_fingerprint(ref, image_bytes)
+    image = decode_resized(image_bytes, size)
+    box = yolo_box(annotation)
+    return sample_key, fingerprint, annotation["jersey_number"], [
+        (seed,) + render_variant(image, box, sample_key, seed, config) for seed in seeds]
+
+
+# 📦 Store ------------------------------------------------------------------
+
+class SlotStore:
+    """
+    Fixed-size slots of one memory-mapped payload array, with one memory-mapped
+    INDEX_DTYPE row per slot; lookups go through an in-memory dict keyed on
+    KEY_FIELDS. The slot count comes from a disk budget and, when the store is
+    full, the least recently used slot is reused.
+
+    Subclasses set the class attributes below. `layout` (meta.json fields besides
+    version and capacity) decides whether the files can be reused as they are;
+    when meta.json's VERSION_FIELD differs from `content[VERSION_FIELD]`, every
+    entry is invalidated. INDEX_DTYPE needs "last_used" and "valid" fields.
+    """
+
+    KIND = "slot"
+    SCRIPT = None
+    STORE_VERSION = 1
+    PAYLOAD_FILE = None
+    PAYLOAD_DTYPE = None
+    INDEX_DTYPE = None
+    KEY_FIELDS = ()
+    VERSION_FIELD = None
+
+    def __init__(self, store_dir, slot_shape, budget_bytes, layout, content):
+        self.store_dir = Path(store_dir)
+        self.slot_shape = tuple(int(d) for d in slot_shape)
+        self.slot_bytes = self.slot_size(self.slot_shape)
+        self.capacity = max(1, int(budget_bytes // self.slot_bytes))
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        meta_path = self.store_dir / META_FILE
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        layout = {"version": self.STORE_VERSION, **layout, "capacity": self.capacity}
+        fresh = any(meta.get(field) != value for field, value in layout.items())
+        mode = "w+" if fresh else "r+"
+        if fresh:
+            logger.info(f"🆕 New {self.KIND} store at {self.store_dir} ({self.capacity} slots, "
+                        f"{self.capacity * self.slot_bytes / 1024 ** 3:.1f} GB)")
+
+        self.index = np.lib.format.open_memmap(self.store_dir / INDEX_FILE, mode=mode,
+                                               dtype=self.INDEX_DTYPE, shape=(self.capacity,))
+        self.payload = np.memmap(self.store_dir / self.PAYLOAD_FILE, dtype=self.PAYLOAD_DTYPE, mode=mode,
+                                 shape=(self.capacity,) + self.slot_shape)
+        if fresh:
+            self.index[:] = np.zeros(self.capacity, dtype=self.INDEX_DTYPE)
+
+        if meta.get(self.VERSION_FIELD) != content[self.VERSION_FIELD]:
+            # What produced the payloads changed: every entry is stale
+            self.index["valid"] = False
+        meta_path.write_text(json.dumps({**layout, **content}, indent=2))
+
+        valid = np.nonzero(self.index["valid"])[0]
+        self.slots = {self._row_key(self.index[s]): int(s) for s in valid}
+        self.clock = int(self.index["last_used"].max()) if self.capacity else 0
+        self.free = [int(s) for s in np.nonzero(~self.index["valid"])[0][::-1]]
+
+    @classmethod
+    def slot_size(cls, slot_shape):
+        return int(np.prod(slot_shape)) * np.dtype(cls.PAYLOAD_DTYPE).itemsize
+
+    @classmethod
+    def read_meta(cls, store_dir):
+        """meta.json of an existing store"""
+        meta_path = Path(store_dir) / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No {cls.KIND} store at {store_dir}; run {cls.SCRIPT} first")
+        return json.loads(meta_path.read_text())
+
+    def _row_key(self, row):
+        return tuple(int(row[field]) for field in self.KEY_FIELDS)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _touch(self, slot):
+        self.clock += 1
+        self.index["last_used"][slot] = self.clock
+
+    def _allocate(self):
+        if self.free:
+            return self.free.pop(), False
+        # Full: reuse the least recently used slot
+        slot = int(np.argmin(self.index["last_used"]))
+        self.slots.pop(self._row_key(self.index[slot]), None)
+        return slot, True
+
+    def _put(self, key, payload, row):
+        """Writes one slot (row has last_used 0); returns True if an older entry had to be evicted"""
+        slot = self.slots.get(key)
+        evicted = False
+        if slot is None:
+            slot, evicted = self._allocate()
+        self.payload[slot] = payload
+        self.index[slot] = row
+        self._touch(slot)
+        self.slots[key] = slot
+        return evicted
+
+    def flush(self):
+        self.payload.flush()
+        self.index.flush()
+
+    def stats(self):
+        return {"store": str(self.store_dir), "capacity": self.capacity, "used": len(self.slots),
+                "disk_budget_gb": round(self.capacity * self.slot_bytes / 1024 ** 3, 2)}
+
+
+class AugmentationStore(SlotStore):
+    """
+    Slot store for rendered variants, addressed by (sample_id, variant_seed).
+    Pixels and index are both memory-mapped; lookups go through an in-memory dict.
+    """
+
+    KIND = "augmentation"
+    SCRIPT = "augment_cache.py"
+    STORE_VERSION = STORE_VERSION
+    PAYLOAD_FILE = VARIANTS_FILE
+    PAYLOAD_DTYPE = np.uint8
+    INDEX_DTYPE = INDEX_DTYPE
+    KEY_FIELDS = ("sample_key", "variant_seed")
+    VERSION_FIELD = "config_hash"
+
+    def __init__(self, store_dir, input_size, budget_bytes=int(DEFAULT_BUDGET_GB * 1024 ** 3),
+                 config=AUGMENT_CONFIG):
+        self.input_size = input_size
+        self.config = config
+        self.config_hash = config_hash(config, input_size)
+        super().__init__(store_dir, (input_size, input_size, 3), budget_bytes, {"input_size": input_size},
+                         {"config_hash": self.config_hash, "config": config})
+        self.pixels = self.payload
+
+    @classmethod
+    def open(cls, store_dir, config=AUGMENT_CONFIG):
+        """Opens an existing store with the size and capacity it was created with"""
+        meta = cls.read_meta(store_dir)
+        size = meta["input_size"]
+        return cls(store_dir, size, meta["capacity"] * cls.slot_size((size, size, 3)), config)
+
+    @staticmethod
+    def sample_key(sample_id):
+        return _hash64(str(sample_id))
+
+    def get(self, sample_id, seed, fingerprint=None):
+        """(pixels view, box, jersey_number) or None if missing or stale"""
+        slot = self.slots.get((self.sample_key(sample_id), seed))
+        if slot is None:
+            return None
+        row = self.index[slot]
+        if fingerprint is not None and int(row["fingerprint"]) != fingerprint:
+            return None
+        self._touch(slot)
+        return self.pixels[slot], row["bbox"].copy(), int(row["jersey_number"])
+
+    def is_current(self, sample_key, seed, fingerprint):
+        slot = self.slots.get((sample_key, seed))
+        return slot is not None and int(self.index["fingerprint"][slot]) == fingerprint
+
+    def put(self, sample_key, seed, fingerprint, jersey_number, pixels, box):
+        """Stores one variant; returns True if an older entry had to be evicted"""
+        return self._put((sample_key, seed), pixels,
+                         (sample_key, seed, fingerprint, self.config_hash, 0, jersey_number, box, True))
+
+    def drop_missing(self, live_keys):
+        """Frees slots of samples that no longer exist in the dataset"""
+        dropped = 0
+        for (key, seed), slot in list(self.slots.items()):
+            if key not in live_keys:
+                self.index["valid"][slot] = False
+                del self.slots[(key, seed)]
+                self.free.append(slot)
+                dropped += 1
+        return dropped
+
+    def variant_table(self, seeds):
+        """
+        (samples, len(seeds)) slot table for every sample that has all seeds cached,
+        so training can pick a random column per sample each epoch.
+        """
+        by_sample = {}
+        for (key, seed), slot in self.slots.items():
+            by_sample.setdefault(key, {})[seed] = slot
+        rows = [[slots[s] for s in seeds] for slots in by_sample.values() if all(s in slots for s in seeds)]
+        return np.array(rows, dtype=np.int64).reshape(-1, len(seeds))
+
+    def stats(self):
+        return {**super().stats(), "input_size": self.input_size, "config_hash": f"{self.config_hash:08x}"}
+
+
+def populate_store(store, data_dir=None, shards_dir=None, variants=8, split="train", workers=None):
+    """
+    🚀 Renders every missing or stale (sample, seed) for seeds 0..variants-1.
+    Current entries are reused as-is; samples gone from the dataset are dropped.
+    """
+    seeds = list(range(variants))
+    started = time.perf_counter()
+    live, jobs = set(), []
+    reused = 0
+    for ref, annotation in iter_samples(data_dir, shards_dir, split):
+        key = store.sample_key(annotation["image_path"])
+        live.add(key)
+        try:
+            # Shards need the image bytes for their checksum; workers recompute it on render
+            fingerprint = sample_fingerprint(ref)
+        except OSError:
+            continue
+        missing = [seed for seed in seeds if not store.is_current(key, seed, fingerprint)]
+        reused += len(seeds) - len(missing)
+        if missing:
+            jobs.append((ref, annotation, key, missing))
+
+    dropped = store.drop_missing(live)
+    rendered = evicted = 0
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    def store_result(result):
+        nonlocal rendered, evicted
+        key, fingerprint, number, outputs = result
+        for seed, pixels, box in outputs:
+            evicted += store.put(key, seed, fingerprint, number, pixels, box)
+            rendered += 1
+
+    args = (store.input_size, store.config)
+    if workers == 1:
+        for job in jobs:
+            store_result(_render_sample(*job, *args))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            for future in as_completed(executor.submit(_render_sample, *job, *args) for job in jobs):
+                store_result(future.result())
+    store.flush()
+
+    return {"samples": len(live), "variants": variants, "rendered": rendered, "reused": reused,
+            "dropped": dropped, "evicted": evicted, "seconds": round(time.perf_counter() - started, 2),
+            **store.stats()}
+
+
+def to_tf_dataset(store, variants):
+    """
+    📊 tf.data source of (uint8 image, jersey_number, box) that draws one random
+    cached variant per sample each epoch; no augmentation is recomputed.
+    """
+    import tensorflow as tf
+
+    table = store.variant_table(list(range(variants)))
+    if not len(table):
+        raise ValueError(f"No sample in {store.store_dir} has all {variants} variants; run populate first")
+    numbers = store.index["jersey_number"][table[:, 0]].astype(np.int32)
+    size = store.input_size
+
+    def read_slot(slot):
+        slot = int(slot)
+        return np.asarray(store.pixels[slot]), store.index["bbox"][slot].astype(np.float32)
+
+    def load(slots, number):
+        pick = tf.random.uniform((), 0, variants, dtype=tf.int32)
+        image, box = tf.numpy_function(read_slot, [slots[pick]], [tf.uint8, tf.float32])
+        image.set_shape((size, size, 3))
+        box.set_shape((4,))
+        return image, number, box
+
+    ds = tf.data.Dataset.from_tensor_slices((table, numbers))
+    return ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from training_config import AUGMENTED_DIR, DATA_DIR, MODEL_CONFIG
+
+    parser = argparse.ArgumentParser(description='🎲 Pre-render seeded augmentation variants')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', help='Packed shards root (overrides --data-path)')
+    parser.add_argument('--store', default=str(AUGMENTED_DIR), help='Augmentation store directory')
+    parser.add_argument('--variants', type=int, default=8, help='Variants per training image')
+    parser.add_argument('--budget-gb', type=float, default=DEFAULT_BUDGET_GB, help='Disk budget for the store')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Render processes')
+    parser.add_argument('--stats', action='store_true', help='Only print store statistics')
+    args = parser.parse_args()
+
+    store = AugmentationStore(args.store, MODEL_CONFIG["input_size"], int(args.budget_gb * 1024 ** 3))
+    report = store.stats() if args.stats else populate_store(store, args.data_path, args.shards, args.variants,
+                                                             workers=args.workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+⚖️ Class- and Condition-Balanced Sampler
+
+The collection is heavily skewed toward a few jersey numbers (see
+DatasetStats.getDataBalance() in the app), while the collection guide targets
+~500 examples for each of 0-99. Both trainers otherwise sample uniformly and
+spend most of an epoch on over-represented numbers.
+
+The sampler precomputes an index of sample ids per
+(jersey_number, lighting_condition, distance, angle) bucket and draws with
+replacement:
+
+    p(number)            ~ count(number) ** (1 / temperature)
+    p(bucket | number)   ~ count(bucket) ** (1 / temperature)
+    p(sample | bucket)   = uniform
+
+temperature=1 keeps the natural distribution; larger values flatten it, and
+temperature=inf gives every number (and every condition within a number) the
+same share. Buckets are flattened into one Walker alias table, so each draw is
+O(1) and a whole epoch is a few vectorized NumPy ops.
+
+Epochs are seeded by (seed, epoch), so the sampler position is just the epoch
+counter (state_dict / load_state_dict).
+
+Hooks:
+    tf.data        jersey_tf_data.build_dataset(..., balance_temperature=T)
+    ultralytics    balanced_trainer(DetectionTrainer, T) for model.train(trainer=...)
+
+Usage:
+    python balanced_sampler.py --data-path data --temperature 2     # before/after report
+"""
+
+import argparse
+import json
+import logging
+import math
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from calibration import stratum_key
+from jersey_annotations import (
+    CAPTURE_METADATA_DEFAULTS,
+    CONDITION_FIELDS,
+    NUM_CLASSES,
+    iter_annotation_files,
+    iter_samples,
+    load_annotation,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPERATURE = 2.0
+
+
+def balance_score(counts, num_classes=NUM_CLASSES):
+    """Same formula as DatasetStats.getDataBalance(): 1 / (1 + variance of per-number counts)"""
+    counts = np.asarray(counts, dtype=np.float64)
+    if not counts.sum():
+        return 0.0
+    mean = counts.sum() / num_classes
+    return float(1.0 / (1.0 + np.mean((counts - mean) ** 2)))
+
+
+def _alias_table(weights):
+    """Vose's alias method: (prob, alias) so a draw is one uniform column pick plus one coin flip"""
+    n = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64) * n / np.sum(weights)
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return prob, alias
+
+
+class BalancedSampler:
+    """
+    Draws sample ids (row numbers of the caller's sample list) balanced across
+    jersey numbers and capture conditions.
+    keys[i] is (jersey_number, lighting_condition, distance, angle) of sample i.
+    """
+
+    def __init__(self, keys, temperature=DEFAULT_TEMPERATURE, epoch_size=None, seed=0):
+        if temperature <= 0:
+            raise ValueError(f"temperature must be > 0, got {temperature}")
+        if not len(keys):
+            raise ValueError("Cannot balance an empty sample list")
+
+        # Sort sample ids by bucket so every bucket is one contiguous slice of `order`
+        bucket_ids = {}
+        sample_bucket = np.array([bucket_ids.setdefault(tuple(key), len(bucket_ids)) for key in keys])
+        self.buckets = list(bucket_ids)
+        self.order = np.argsort(sample_bucket, kind="stable")
+        self.counts = np.bincount(sample_bucket, minlength=len(self.buckets))
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+
+        self.temperature = temperature
+        self.bucket_weights = self._bucket_weights(temperature)
+        self._prob, self._alias = _alias_table(self.bucket_weights)
+
+        self.epoch_size = epoch_size or len(keys)
+        self.seed = seed
+        self.epoch = 0
+
+    def _bucket_weights(self, temperature):
+        exponent = 0.0 if math.isinf(temperature) else 1.0 / temperature
+        numbers = np.array([bucket[0] for bucket in self.buckets])
+        number_counts = Counter()
+        for number, count in zip(numbers, self.counts):
+            number_counts[number] += count
+
+        # Flatten within each number first, then across numbers
+        within = self.counts.astype(np.float64) ** exponent
+        within_total = Counter()
+        for number, weight in zip(numbers, within):
+            within_total[number] += weight
+        number_weight = {number: count ** exponent for number, count in number_counts.items()}
+        total = sum(number_weight.values())
+        return np.array([number_weight[n] / total * w / within_total[n] for n, w in zip(numbers, within)])
+
+    @classmethod
+    def from_annotations(cls, annotations, **kwargs):
+        return cls([stratum_key(annotation) for annotation in annotations], **kwargs)
+
+    @classmethod
+    def from_shards(cls, shard_dir, **kwargs):
+        """Keys for a packed split; sample ids are shard row numbers"""
+        from jersey_shards import ShardReader
+
+        reader = ShardReader(shard_dir)
+        return cls.from_annotations((reader.annotation(i) for i in range(len(reader))), **kwargs)
+
+    def __len__(self):
+        return self.epoch_size
+
+    def draw(self, n, rng):
+        """n sample ids: alias-table bucket pick, then a uniform pick inside the bucket"""
+        column = rng.integers(0, len(self.buckets), n)
+        bucket = np.where(rng.random(n) < self._prob[column], column, self._alias[column])
+        within = (rng.random(n) * self.counts[bucket]).astype(np.int64)
+        return self.order[self.offsets[bucket] + within]
+
+    def epoch_ids(self, epoch):
+        """The ids for one epoch; the same (seed, epoch) always gives the same ids"""
+        return self.draw(self.epoch_size, np.random.default_rng([self.seed, epoch]))
+
+    def __iter__(self):
+        ids = self.epoch_ids(self.epoch)
+        self.epoch += 1
+        return iter(ids.tolist())
+
+    def state_dict(self):
+        return {"seed": self.seed, "epoch": self.epoch, "temperature": self.temperature,
+                "epoch_size": self.epoch_size}
+
+    def load_state_dict(self, state):
+        self.seed = state["seed"]
+        self.epoch = state["epoch"]
+
+    def report(self):
+        """Expected samples per number in one epoch, before and after balancing"""
+        numbers = np.array([bucket[0] for bucket in self.buckets])
+        labeled = numbers >= 0  # -1 = image without boxes
+        natural = np.bincount(numbers[labeled], weights=self.counts[labeled], minlength=NUM_CLASSES)
+        expected = np.bincount(numbers[labeled], weights=self.bucket_weights[labeled],
+                               minlength=NUM_CLASSES) * self.epoch_size
+        return {
+            "samples": int(self.counts.sum()),
+            "buckets": len(self.buckets),
+            "numbers": int(np.count_nonzero(natural)),
+            "temperature": self.temperature,
+            "epoch_size": self.epoch_size,
+            "min_max_per_number": [int(natural[natural > 0].min()), int(natural.max())],
+            "expected_min_max_per_number": [round(float(expected[natural > 0].min()), 1),
+                                            round(float(expected.max()), 1)],
+            "balance_before": balance_score(natural),
+            "balance_after": balance_score(expected),
+        }
+
+
+def sample_id_dataset(sampler):
+    """📊 tf.data source of int64 sample ids; every pass over the dataset is a new sampler epoch"""
+    import tensorflow as tf
+
+    return tf.data.Dataset.from_generator(
+        lambda: iter(sampler),
+        output_signature=tf.TensorSpec(shape=(), dtype=tf.int64),
+    )
+
+
+def torch_sampler(sampler):
+    """Wraps a BalancedSampler as a torch.utils.data.Sampler (torch is only imported here)"""
+    from torch.utils.data import Sampler
+
+    class _TorchBalancedSampler(Sampler):
+        def __init__(self):
+            self.sampler = sampler
+
+        def __iter__(self):
+            return iter(self.sampler)
+
+        def __len__(self):
+            return len(self.sampler)
+
+    return _TorchBalancedSampler()
+
+
+def yolo_dataset_keys(dataset, annotations_dir=None):
+    """
+    Bucket keys for an ultralytics YOLODataset.
+    Shard-backed datasets read CaptureMetadata from the shards; loose datasets look
+    the image up in annotations_dir (JerseyAnnotation JSON by image_path) and fall
+    back to the defaults, i.e. number-only balancing. Images with several boxes
+    are keyed on their rarest number.
+    """
+    reader = getattr(dataset, "reader", None)
+    metadata = {}
+    if reader is None and annotations_dir:
+        for annotation_file in iter_annotation_files(annotations_dir):
+            try:
+                annotation = load_annotation(annotation_file)
+            except (OSError, ValueError):
+                continue
+            metadata[Path(annotation["image_path"]).name] = annotation["metadata"]
+
+    box_counts = Counter(int(c) for label in dataset.labels for c in label["cls"].ravel())
+    default = tuple(CAPTURE_METADATA_DEFAULTS[field] for field in CONDITION_FIELDS)
+    keys = []
+    for i, label in enumerate(dataset.labels):
+        classes = [int(c) for c in label["cls"].ravel()]
+        number = min(classes, key=lambda c: box_counts[c]) if classes else -1
+        if reader is not None:
+            conditions = tuple(reader.annotation(i)["metadata"][field] for field in CONDITION_FIELDS)
+        elif Path(label["im_file"]).name in metadata:
+            conditions = tuple(metadata[Path(label["im_file"]).name][field] for field in CONDITION_FIELDS)
+        else:
+            conditions = default
+        keys.append((number,) + conditions)
+    return keys
+
+
+def balanced_trainer(base_cls, temperature=DEFAULT_TEMPERATURE, annotations_dir=None, seed=0):
+    """
+    🏋️ Subclass of an ultralytics DetectionTrainer (or ShardDetectionTrainer) whose
+    train loader draws through a BalancedSampler. ultralytics instantiates the
+    trainer itself, so the settings are bound here rather than passed to train().
+    """
+    from ultralytics.data.build import InfiniteDataLoader, seed_worker
+
+    class BalancedDetectionTrainer(base_cls):
+        def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode="train"):
+            if mode != "train" or rank != -1:
+                # Validation stays sequential; DDP keeps its DistributedSampler
+                return super().get_dataloader(dataset_path, batch_size, rank, mode)
+
+            dataset = self.build_dataset(dataset_path, mode, batch_size)
+            self.balanced_sampler = BalancedSampler(yolo_dataset_keys(dataset, annotations_dir),
+                                                    temperature=temperature, seed=seed)
+            logger.info(f"⚖️ Balanced sampling: {json.dumps(self.balanced_sampler.report())}")
+            return InfiniteDataLoader(
+                dataset=dataset,
+                batch_size=batch_size,
+                sampler=torch_sampler(self.balanced_sampler),
+                num_workers=min(self.args.workers, batch_size),
+                pin_memory=True,
+                collate_fn=getattr(dataset, "collate_fn", None),
+                worker_init_fn=seed_worker,
+            )
+
+        def resume_training(self, ckpt):
+            super().resume_training(ckpt)
+            sampler = getattr(self, "balanced_sampler", None)
+            if ckpt is not None and sampler is not None and self.start_epoch:
+                # The sampler position is the epoch; its loader was already started at epoch 0
+                sampler.epoch = self.start_epoch
+                self.train_loader.reset()
+
+    return BalancedDetectionTrainer
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from training_config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description='⚖️ Class- and condition-balanced sampling report')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', help='Packed shards root (overrides --data-path)')
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE,
+                        help='1 = natural distribution, inf = uniform over numbers and conditions')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed')
+    args = parser.parse_args()
+
+    if args.shards:
+        sampler = BalancedSampler.from_shards(Path(args.shards) / "train", temperature=args.temperature,
+                                              seed=args.seed)
+    else:
+        annotations = (annotation for _ref, annotation in iter_samples(args.data_path, split="train"))
+        sampler = BalancedSampler.from_annotations(annotations, temperature=args.temperature, seed=args.seed)
+    print(json.dumps(sampler.report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+⏱️ Offline TFLite Inference Benchmark
+
+Measures CPU latency of any exported jersey model (Keras export, ultralytics
+export or the bundled app/src/main/assets/model.tflite) with the TFLite
+interpreter, so latency regressions show up before the model reaches a phone.
+
+For each thread count it reports warm-up vs steady-state latency,
+p50/p95/p99, throughput and peak memory. Each configuration runs in a fresh
+process so peak memory isn't inflated by the previous one.
+
+Usage:
+    python benchmark_tflite.py models/jersey_detector.tflite --threads 1 2 4 --output bench.json
+    python benchmark_tflite.py ../app/src/main/assets/model.tflite --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = (1, 2, 4)
+DEFAULT_WARMUP = 10
+DEFAULT_RUNS = 100
+
+
+def load_interpreter(model_path, num_threads=None):
+    """Prefers full TensorFlow; falls back to the lightweight tflite_runtime package"""
+    try:
+        import tensorflow as tf
+        interpreter_cls = tf.lite.Interpreter
+    except ImportError:
+        from tflite_runtime.interpreter import Interpreter as interpreter_cls
+    return interpreter_cls(model_path=str(model_path), num_threads=num_threads)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process, or None if the platform can't tell"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS reports bytes
+        return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 1e6, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def random_inputs(interpreter, seed=0):
+    """Random tensors matching each input's shape and dtype"""
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for detail in interpreter.get_input_details():
+        dtype = np.dtype(detail["dtype"])
+        shape = detail["shape"]
+        if dtype.kind in "iu":
+            info = np.iinfo(dtype)
+            inputs.append(rng.integers(info.min, info.max, size=shape, endpoint=True).astype(dtype))
+        else:
+            inputs.append((rng.random(shape) * 255).astype(dtype))
+    return inputs
+
+
+def percentiles_ms(latencies):
+    values = np.asarray(latencies) * 1000.0
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "min": round(float(values.min()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def benchmark_config(model_path, num_threads, warmup=DEFAULT_WARMUP, runs=DEFAULT_RUNS):
+    """Benchmarks one thread count in the current process"""
+    rss_before = peak_rss_mb()
+    load_started = time.perf_counter()
+    interpreter = load_interpreter(model_path, num_threads)
+    interpreter.allocate_tensors()
+    load_ms = (time.perf_counter() - load_started) * 1000.0
+
+    input_details = interpreter.get_input_details()
+    inputs = random_inputs(interpreter)
+
+    def invoke():
+        for detail, value in zip(input_details, inputs):
+            interpreter.set_tensor(detail["index"], value)
+        started = time.perf_counter()
+        interpreter.invoke()
+        return time.perf_counter() - started
+
+    warmup_latencies = [invoke() for _ in range(warmup)]
+    latencies = [invoke() for _ in range(runs)]
+    steady = percentiles_ms(latencies)
+
+    return {
+        "threads": num_threads,
+        "load_ms": round(load_ms, 3),
+        "first_run_ms": round(warmup_latencies[0] * 1000.0, 3) if warmup_latencies else None,
+        "warmup": percentiles_ms(warmup_latencies) if warmup_latencies else None,
+        "steady_state": steady,
+        "throughput_per_sec": round(1000.0 / steady["mean"], 2) if steady["mean"] else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_before,
+    }
+
+
+def benchmark_model(model_path, threads=DEFAULT_THREADS, warmup=DEFAULT_WARMUP, runs=DEFAULT_RUNS,
+                    isolate=True):
+    """
+    🚀 Benchmarks a .tflite model at several thread counts.
+    With isolate=True every thread count runs in its own spawned process.
+    """
+    model_path = Path(model_path)
+    interpreter = load_interpreter(model_path)
+    io = {
+        "inputs": [{"name": d["name"], "shape": [int(x) for x in d["shape"]], "dtype": np.dtype(d["dtype"]).name}
+                   for d in interpreter.get_input_details()],
+        "outputs": [{"name": d["name"], "shape": [int(x) for x in d["shape"]], "dtype": np.dtype(d["dtype"]).name}
+                    for d in interpreter.get_output_details()],
+    }
+    del interpreter
+
+    results = []
+    for num_threads in threads:
+        if isolate:
+            # A crashing interpreter (e.g. unsupported op) takes down only its own process
+            try:
+                with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    result = pool.submit(benchmark_config, str(model_path), num_threads, warmup, runs).result()
+            except BrokenProcessPool:
+                logger.error(f"💥 Interpreter process crashed with {num_threads} thread(s)")
+                results.append({"threads": num_threads, "error": "interpreter process crashed"})
+                continue
+        else:
+            result = benchmark_config(model_path, num_threads, warmup, runs)
+        results.append(result)
+        logger.info(f"⏱️ {num_threads} thread(s): p50 {result['steady_state']['p50']} ms")
+
+    return {
+        "model": str(model_path),
+        "model_size_bytes": model_path.stat().st_size,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": {"platform": platform.platform(), "processor": platform.processor(),
+                 "cpu_count": os.cpu_count(), "python": platform.python_version()},
+        "warmup_runs": warmup,
+        "timed_runs": runs,
+        **io,
+        "results": results,
+    }
+
+
+def compare(current, previous):
+    """Steady-state p50/p95 deltas vs a previous result file, per thread count"""
+    before = {r["threads"]: r for r in previous["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(result["threads"])
+        if not old or "error" in old or "error" in result:
+            continue
+        row = {"threads": result["threads"]}
+        for key in ("p50", "p95"):
+            new_ms, old_ms = result["steady_state"][key], old["steady_state"][key]
+            row[key] = {"before": old_ms, "after": new_ms,
+                        "change_pct": round((new_ms - old_ms) / old_ms * 100, 1) if old_ms else None}
+        rows.append(row)
+    return {"previous": previous["model"], "previous_timestamp": previous["timestamp"],
+            "size_change_bytes": current["model_size_bytes"] - previous["model_size_bytes"], "threads": rows}
+
+
+def add_arguments(parser):
+    """Options shared by this script and `jersey_cli.py benchmark`"""
+    parser.add_argument('model', help='Path to a .tflite model')
+    parser.add_argument('--threads', type=int, nargs='+', default=list(DEFAULT_THREADS), help='Thread counts')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help='Untimed warm-up invocations')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Timed invocations per thread count')
+    parser.add_argument('--in-process', action='store_true', help="Don't spawn a process per thread count")
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    parser.add_argument('--compare', help='Previous JSON result to diff against')
+
+
+def run(args):
+    report = benchmark_model(args.model, args.threads, args.warmup, args.runs, isolate=not args.in_process)
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='⏱️ CPU benchmark for exported TFLite models')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+🎚️ Int8 Calibration for TFLite Export
+
+Full-integer quantization needs a representative dataset to pick activation
+ranges. This module builds one from real training images instead of random
+noise:
+
+- Stratified sample: round-robin over (jersey_number, lighting_condition,
+  distance, angle) strata, so rare numbers and conditions are represented
+  instead of whatever dominates the collection.
+- Same preprocessing as training and the app: decode, bilinear resize to the
+  model input, raw 0-255 RGB.
+- Range report: per-tensor float ranges implied by the converted model's
+  scale/zero-point, plus a check for ops that fall back to float/Flex.
+
+Usage:
+    python calibration.py --data-path data --num-samples 300        # sampling report
+    python calibration.py --inspect ../app/src/main/assets/model.tflite
+"""
+
+import argparse
+import json
+import logging
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from jersey_annotations import CONDITION_FIELDS, iter_samples, read_image_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NUM_SAMPLES = 300
+
+
+def stratum_key(annotation):
+    metadata = annotation["metadata"]
+    return (annotation["jersey_number"],) + tuple(metadata[field] for field in CONDITION_FIELDS)
+
+
+def load_candidates(data_dir=None, shards_dir=None, split="train"):
+    """
+    Returns [(annotation, read_image_bytes)] for every sample of split (training
+    images only by default, the same split for loose files and shards).
+    Only annotations are parsed here; image bytes are read on demand.
+    """
+    candidates = []
+    for ref, annotation in iter_samples(data_dir, shards_dir, split):
+        if ref[0] == "file" and not Path(ref[1]).exists():
+            continue
+        candidates.append((annotation, lambda ref=ref: read_image_bytes(ref)))
+    return candidates
+
+
+def select_calibration_samples(candidates, num_samples=DEFAULT_NUM_SAMPLES, seed=0):
+    """
+    🎯 Stratified selection: shuffle within each stratum, then take one sample from
+    each stratum in turn until num_samples are picked.
+    """
+    rng = random.Random(seed)
+    strata = defaultdict(list)
+    for candidate in candidates:
+        strata[stratum_key(candidate[0])].append(candidate)
+
+    queues = list(strata.values())
+    rng.shuffle(queues)
+    for queue in queues:
+        rng.shuffle(queue)
+
+    selected = []
+    while queues and len(selected) < num_samples:
+        remaining = []
+        for queue in queues:
+            if len(selected) >= num_samples:
+                break
+            selected.append(queue.pop())
+            if queue:
+                remaining.append(queue)
+        queues = remaining
+    return selected
+
+
+def sample_report(samples):
+    """How the selected samples spread across numbers and capture conditions"""
+    report = {"num_samples": len(samples),
+              "jersey_numbers": len({annotation["jersey_number"] for annotation, _ in samples})}
+    for field in CONDITION_FIELDS:
+        report[field] = dict(Counter(annotation["metadata"][field] for annotation, _ in samples))
+    return report
+
+
+def representative_dataset(samples, input_size):
+    """
+    📊 Generator for TFLiteConverter.representative_dataset.
+    Uses jersey_tf_data.decode_image so calibration sees exactly what training
+    (and the app's bilinear ResizeOp) produces.
+    """
+    import tensorflow as tf
+    from jersey_tf_data import decode_image
+
+    def generate():
+        for _annotation, read_bytes in samples:
+            image = decode_image(tf.constant(read_bytes()), input_size)
+            yield [tf.cast(image, tf.float32)[tf.newaxis, ...].numpy()]
+
+    return generate
+
+
+def tensor_range_report(tflite_model):
+    """
+    📏 Per-tensor ranges from a converted model.
+    Quantized tensors report the float range their scale/zero-point can represent;
+    float tensors in an int8 model are flagged since they mean a float fallback.
+    Accepts model bytes or a path.
+    """
+    import tensorflow as tf
+
+    if isinstance(tflite_model, (str, Path)):
+        interpreter = tf.lite.Interpreter(model_path=str(tflite_model))
+    else:
+        interpreter = tf.lite.Interpreter(model_content=tflite_model)
+
+    tensors = []
+    float_tensors = 0
+    for detail in interpreter.get_tensor_details():
+        dtype = np.dtype(detail["dtype"])
+        entry = {"name": detail["name"], "dtype": dtype.name, "shape": [int(d) for d in detail["shape"]]}
+        scale, zero_point = detail["quantization"]
+        if scale and dtype.kind in "iu":
+            info = np.iinfo(dtype)
+            entry["scale"] = float(scale)
+            entry["zero_point"] = int(zero_point)
+            entry["range"] = [round(float((info.min - zero_point) * scale), 6),
+                              round(float((info.max - zero_point) * scale), 6)]
+        elif dtype.kind == "f":
+            float_tensors += 1
+        tensors.append(entry)
+
+    ops = []
+    if hasattr(interpreter, "_get_ops_details"):
+        ops = [op["op_name"] for op in interpreter._get_ops_details()]
+    flex_ops = sorted({op for op in ops if op.startswith("Flex")})
+
+    return {
+        "inputs": [(d["name"], np.dtype(d["dtype"]).name) for d in interpreter.get_input_details()],
+        "outputs": [(d["name"], np.dtype(d["dtype"]).name) for d in interpreter.get_output_details()],
+        "num_tensors": len(tensors),
+        "float_tensors": float_tensors,
+        "op_counts": dict(Counter(ops)),
+        "flex_ops": flex_ops,
+        "tensors": tensors,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🎚️ Int8 calibration sampling and TFLite range report')
+    parser.add_argument('--data-path', default=str(Path(__file__).parent / "data"),
+                        help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', help='Packed shards root (overrides --data-path)')
+    parser.add_argument('--num-samples', type=int, default=DEFAULT_NUM_SAMPLES, help='Calibration images')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed')
+    parser.add_argument('--inspect', help='Report tensor ranges and ops of an existing .tflite model')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    if args.inspect:
+        report = tensor_range_report(args.inspect)
+    else:
+        candidates = load_candidates(args.data_path, args.shards)
+        report = sample_report(select_calibration_samples(candidates, args.num_samples, args.seed))
+        report["candidates"] = len(candidates)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
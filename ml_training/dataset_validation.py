@@ -0,0 +1,267 @@
+"""
+🔍 YOLO Dataset Validation
+
+Checks a YOLO export (dataset.yaml + images/ + labels/, as written by the app's
+training pipeline) before ultralytics gets to it:
+
+- image/label pairing (by file stem)
+- label syntax: `class cx cy w h` per line
+- box bounds: normalized, positive size, inside the frame
+- class ids within `nc`
+- image decodability
+
+Per-file results are cached in labels/../.validation_cache.jsonl keyed by
+(path, mtime, size), so re-running on a large dataset only re-checks files that
+changed. Checks run in a process pool.
+
+Usage:
+    python dataset_validation.py data/yolo_export/dataset.yaml
+    python dataset_validation.py dataset.yaml --no-cache --output validation.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import yaml
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = ".validation_cache.jsonl"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CHUNK_SIZE = 64
+# Rounding slack for box edges that land a hair outside [0, 1]
+BOUNDS_TOLERANCE = 1e-3
+
+
+def check_image(path):
+    """Fully decodes the image; returns a result dict"""
+    try:
+        with Image.open(path) as img:
+            img.load()
+            return {"errors": [], "dimensions": list(img.size)}
+    except Exception as e:  # PIL raises a zoo of exception types for broken files
+        return {"errors": [f"undecodable: {e}"]}
+
+
+def check_label(path, num_classes):
+    """Parses every `class cx cy w h` line; returns a result dict with errors and class ids"""
+    errors, classes = [], []
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        return {"errors": [f"unreadable: {e}"], "classes": []}
+
+    for line_no, line in enumerate(text.splitlines(), 1):
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) != 5:
+            errors.append(f"line {line_no}: expected 5 values, got {len(parts)}")
+            continue
+        try:
+            cls = int(parts[0])
+            cx, cy, w, h = (float(v) for v in parts[1:])
+        except ValueError:
+            errors.append(f"line {line_no}: not numeric: {line.strip()}")
+            continue
+
+        if not 0 <= cls < num_classes:
+            errors.append(f"line {line_no}: class {cls} outside 0..{num_classes - 1}")
+        if w <= 0 or h <= 0:
+            errors.append(f"line {line_no}: non-positive box size {w} x {h}")
+        elif (cx - w / 2 < -BOUNDS_TOLERANCE or cy - h / 2 < -BOUNDS_TOLERANCE
+              or cx + w / 2 > 1 + BOUNDS_TOLERANCE or cy + h / 2 > 1 + BOUNDS_TOLERANCE):
+            errors.append(f"line {line_no}: box outside the normalized frame")
+        classes.append(cls)
+
+    return {"errors": errors, "classes": classes}
+
+
+def _check_chunk(jobs, num_classes):
+    """Worker entry point: [(kind, path)] -> [(kind, path, result)]"""
+    results = []
+    for kind, path in jobs:
+        result = check_image(path) if kind == "image" else check_label(path, num_classes)
+        results.append((kind, path, result))
+    return results
+
+
+def _scan(directory, extensions):
+    """{stem: (path, mtime_ns, size)} for matching files"""
+    files = {}
+    if not directory.is_dir():
+        return files
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(extensions):
+                stat = entry.stat()
+                files[Path(entry.name).stem] = (entry.path, stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def load_cache(cache_path):
+    """{(kind, path): entry}; later lines win, unreadable lines are ignored"""
+    cache = {}
+    if not cache_path or not cache_path.exists():
+        return cache
+    with open(cache_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                cache[(entry["kind"], entry["path"])] = entry
+            except (ValueError, KeyError):
+                continue
+    return cache
+
+
+def save_cache(cache_path, entries):
+    """Rewrites the cache with only the current files, so deleted files drop out"""
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, cache_path)
+
+
+def validate_yolo_dataset(data_yaml, workers=None, use_cache=True, chunk_size=CHUNK_SIZE):
+    """
+    🔍 Validates a YOLO dataset described by dataset.yaml and returns a structured report.
+    The report's "ok" is False for broken labels, undecodable images or no usable pairs;
+    unpaired files are reported but don't fail validation (ultralytics skips them).
+    """
+    started = time.perf_counter()
+    data_yaml = Path(data_yaml)
+    with open(data_yaml, "r") as f:
+        config = yaml.safe_load(f)
+
+    base_dir = data_yaml.parent / config.get("path", ".")
+    num_classes = int(config["nc"])
+    image_dirs = sorted({base_dir / config[split] for split in ("train", "val") if split in config})
+    labels_dir = base_dir / "labels"
+
+    images = {}
+    for image_dir in image_dirs:
+        images.update(_scan(image_dir, IMAGE_EXTENSIONS))
+    labels = _scan(labels_dir, (".txt",))
+
+    cache_path = labels_dir.parent / CACHE_NAME
+    cache = load_cache(cache_path) if use_cache else {}
+
+    # Class range only matters for labels, so nc is part of their cache key
+    files = [("image", path, mtime, size, None) for path, mtime, size in images.values()]
+    files += [("label", path, mtime, size, num_classes) for path, mtime, size in labels.values()]
+
+    results, jobs = {}, []
+    for kind, path, mtime, size, nc in files:
+        entry = cache.get((kind, path))
+        if entry and entry["mtime_ns"] == mtime and entry["size"] == size and entry.get("nc") == nc:
+            results[(kind, path)] = entry
+        else:
+            jobs.append((kind, path, mtime, size, nc))
+    cached = len(results)
+
+    pending = {(kind, path): (mtime, size, nc) for kind, path, mtime, size, nc in jobs}
+
+    def collect(chunk_results):
+        for kind, path, result in chunk_results:
+            mtime, size, nc = pending[(kind, path)]
+            results[(kind, path)] = {**result, "kind": kind, "path": path, "mtime_ns": mtime, "size": size, "nc": nc}
+
+    job_pairs = [(kind, path) for kind, path, *_ in jobs]
+    chunks = [job_pairs[i:i + chunk_size] for i in range(0, len(job_pairs), chunk_size)]
+    num_workers = max(1, workers or os.cpu_count() or 1)
+    if len(chunks) <= 1 or num_workers == 1:
+        for chunk in chunks:
+            collect(_check_chunk(chunk, num_classes))
+    else:
+        with ProcessPoolExecutor(num_workers) as executor:
+            in_flight = set()
+            for chunk in chunks:
+                in_flight.add(executor.submit(_check_chunk, chunk, num_classes))
+                if len(in_flight) >= num_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            for future in wait(in_flight).done:
+                collect(future.result())
+
+    if use_cache and labels_dir.parent.exists():
+        save_cache(cache_path, results.values())
+
+    # Pairing is cheap (names only), so it is recomputed every run
+    paired = images.keys() & labels.keys()
+    class_counts = Counter()
+    invalid_labels, empty_labels, undecodable_images = [], [], []
+    for (kind, path), entry in results.items():
+        if entry["errors"]:
+            (undecodable_images if kind == "image" else invalid_labels).append(
+                {"path": path, "errors": entry["errors"]})
+        elif kind == "label":
+            class_counts.update(entry["classes"])
+            if not entry["classes"]:
+                empty_labels.append(path)
+
+    report = {
+        "dataset": str(data_yaml),
+        "nc": num_classes,
+        "images": len(images),
+        "labels": len(labels),
+        "paired": len(paired),
+        "checked": len(jobs),
+        "cached": cached,
+        "unpaired_images": sorted(images[stem][0] for stem in images.keys() - labels.keys()),
+        "unpaired_labels": sorted(labels[stem][0] for stem in labels.keys() - images.keys()),
+        "empty_labels": sorted(empty_labels),
+        "invalid_labels": sorted(invalid_labels, key=lambda e: e["path"]),
+        "undecodable_images": sorted(undecodable_images, key=lambda e: e["path"]),
+        "class_counts": {str(cls): count for cls, count in sorted(class_counts.items())},
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    report["ok"] = bool(paired) and not invalid_labels and not undecodable_images
+    return report
+
+
+def log_report(report, max_listed=10):
+    """📋 Summarizes a report in the training log"""
+    logger.info(f"📊 {report['images']} images, {report['labels']} labels, {report['paired']} paired "
+                f"({report['checked']} checked, {report['cached']} from cache) in {report['elapsed_s']}s")
+    for key, icon in (("unpaired_images", "⚠️"), ("unpaired_labels", "⚠️"),
+                      ("invalid_labels", "❌"), ("undecodable_images", "❌")):
+        problems = report[key]
+        if not problems:
+            continue
+        logger.log(logging.ERROR if icon == "❌" else logging.WARNING,
+                   f"{icon} {len(problems)} {key.replace('_', ' ')}")
+        for problem in problems[:max_listed]:
+            if isinstance(problem, dict):
+                logger.info(f"   {problem['path']}: {'; '.join(problem['errors'][:3])}")
+            else:
+                logger.info(f"   {problem}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🔍 Validate a YOLO jersey dataset')
+    parser.add_argument('data', help='Path to dataset.yaml')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--no-cache', action='store_true', help='Re-check every file')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = validate_yolo_dataset(args.data, args.workers, use_cache=not args.no_cache)
+    log_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    logger.info("✅ Dataset validation passed" if report["ok"] else "❌ Dataset validation failed")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
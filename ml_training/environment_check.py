@@ -0,0 +1,162 @@
+"""
+🩺 Training Environment Check
+
+Reports which packages each ml_training command needs and whether they are
+installed, without importing them (importlib.util.find_spec), so the check
+takes milliseconds even when TensorFlow or torch are present. Installed
+versions are compared with the pins in requirements.txt.
+
+Nothing is installed automatically: a missing package is reported together
+with the pip command that installs it.
+
+Usage:
+    python environment_check.py                  # every command
+    python environment_check.py train-yolo export
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import re
+from importlib import metadata
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+REQUIREMENTS_FILE = Path(__file__).parent / "requirements.txt"
+
+# Import names per command; a tuple means any one of them will do
+COMMAND_REQUIREMENTS = {
+    "setup-dirs": (),
+    "validate": ("yaml", "PIL"),
+    "train-keras": ("tensorflow", "numpy", "PIL"),
+    "train-yolo": ("ultralytics", "torch", "torchvision", "yaml", "cv2", "numpy"),
+    "export": ("ultralytics", "onnxruntime", "numpy", "PIL"),
+    "benchmark": (("tensorflow", "tflite_runtime"), "numpy"),
+}
+
+# Import name -> pip distribution, where they differ
+DISTRIBUTIONS = {
+    "yaml": "PyYAML",
+    "PIL": "Pillow",
+    "cv2": "opencv-python",
+    "tflite_runtime": "tflite-runtime",
+}
+
+
+def requirement_pins(path=REQUIREMENTS_FILE):
+    """{distribution (lower case): pinned version} from `name==version` lines"""
+    pins = {}
+    if not Path(path).exists():
+        return pins
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        match = re.match(r"\s*([A-Za-z0-9_.\-]+)\s*==\s*([^\s#;]+)", line)
+        if match:
+            pins[match.group(1).lower()] = match.group(2)
+    return pins
+
+
+def check_module(module, pins=None):
+    """Whether an import name is available, its installed distribution version and the pinned one"""
+    distribution = DISTRIBUTIONS.get(module, module)
+    installed = importlib.util.find_spec(module) is not None
+    try:
+        version = metadata.version(distribution) if installed else None
+    except metadata.PackageNotFoundError:
+        version = None
+    pinned = (pins or {}).get(distribution.lower())
+    return {"module": module, "distribution": distribution, "installed": installed, "version": version,
+            "pinned": pinned, "mismatch": bool(installed and version and pinned and version != pinned)}
+
+
+def missing_for(command, pins=None):
+    """Requirement entries of a command that aren't satisfied (alternatives count as one entry)"""
+    missing = []
+    for requirement in COMMAND_REQUIREMENTS[command]:
+        alternatives = requirement if isinstance(requirement, tuple) else (requirement,)
+        if not any(check_module(module, pins)["installed"] for module in alternatives):
+            missing.append(alternatives)
+    return missing
+
+
+def install_hint(missing, pins=None):
+    """pip command for the first alternative of every missing requirement, pinned where requirements.txt pins it"""
+    pins = requirement_pins() if pins is None else pins
+    specs = []
+    for alternatives in missing:
+        distribution = DISTRIBUTIONS.get(alternatives[0], alternatives[0])
+        pinned = pins.get(distribution.lower())
+        specs.append(f"{distribution}=={pinned}" if pinned else distribution)
+    return "pip install " + " ".join(specs)
+
+
+def require(command):
+    """
+    Logs what's missing for a command and how to install it; returns False if
+    it can't run. Callers exit instead of installing packages at runtime.
+    """
+    pins = requirement_pins()
+    missing = missing_for(command, pins)
+    if not missing:
+        return True
+    names = ", ".join(" or ".join(alternatives) for alternatives in missing)
+    logger.error(f"❌ '{command}' needs {names}, which isn't installed")
+    logger.error(f"   Install with: {install_hint(missing, pins)}  (or pip install -r requirements.txt)")
+    return False
+
+
+def check_environment(commands=None):
+    """🩺 Per-command readiness plus per-package versions"""
+    pins = requirement_pins()
+    commands = list(commands or COMMAND_REQUIREMENTS)
+    modules = sorted({module for command in commands for requirement in COMMAND_REQUIREMENTS[command]
+                      for module in (requirement if isinstance(requirement, tuple) else (requirement,))})
+    report = {"commands": {}, "packages": [check_module(module, pins) for module in modules]}
+    for command in commands:
+        missing = missing_for(command, pins)
+        report["commands"][command] = {"ok": not missing,
+                                       "missing": [" or ".join(alternatives) for alternatives in missing],
+                                       "install": install_hint(missing, pins) if missing else None}
+    return report
+
+
+def report_lines(report):
+    lines = []
+    for command, status in report["commands"].items():
+        lines.append(f"{'✅' if status['ok'] else '❌'} {command:<12} "
+                     + ("ready" if status["ok"] else f"missing {', '.join(status['missing'])}: {status['install']}"))
+    for package in report["packages"]:
+        if package["mismatch"]:
+            lines.append(f"⚠️ {package['distribution']} {package['version']} installed, "
+                         f"requirements.txt pins {package['pinned']}")
+    return lines
+
+
+def add_arguments(parser):
+    """Options shared by this script and `jersey_cli.py check-env`"""
+    parser.add_argument('commands', nargs='*',
+                        help=f"Commands to check (default: all of {', '.join(COMMAND_REQUIREMENTS)})")
+    parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a summary')
+
+
+def run(args):
+    unknown = [command for command in args.commands if command not in COMMAND_REQUIREMENTS]
+    if unknown:
+        logger.error(f"❌ Unknown command(s): {', '.join(unknown)}")
+        return 2
+
+    report = check_environment(args.commands)
+    print(json.dumps(report, indent=2) if args.json else "\n".join(report_lines(report)))
+    return 0 if all(status["ok"] for status in report["commands"].values()) else 1
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🩺 Check which ml_training commands can run here')
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,402 @@
+"""
+🧪 Jersey Detector Evaluation
+
+Runs a trained model (TFLite, ONNX or Keras) over a validation set and reports
+mAP@0.5, mAP@0.5:0.95 and jersey-number accuracy broken down by
+jersey_number, lighting_condition, distance and angle, so we can see where
+the >80% accuracy target is (and isn't) met.
+
+TFLite and ONNX models are evaluated by a pool of worker processes; each
+worker matches its own predictions against ground truth and only sends back
+small match records. The parent accumulates them into fixed-size score
+histograms and counters, so memory doesn't grow with the dataset.
+
+Usage:
+    python evaluate_model.py --model models/jersey_detector.tflite                  # val split of data/
+    python evaluate_model.py --model jersey_detector.tflite --test-data ./test_set  # every sample in test_set
+    python evaluate_model.py --model best.tflite --shards data/shards --workers 8 --output eval.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from jersey_annotations import CONDITION_FIELDS, NUM_CLASSES, iter_samples, read_image_bytes, yolo_box
+from postprocess import box_iou, decode_batch, decode_yolov8_batch, split_by_image, xywh_to_xyxy
+from training_config import DATA_DIR, MODEL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+SCORE_BINS = 500
+ACCURACY_IOU = 0.5
+CHUNK_SIZE = 32
+
+
+# 📋 Samples ---------------------------------------------------------------
+
+def load_image(ref, width, height):
+    """Decode + bilinear resize to the model input, like the app's ResizeOp"""
+    with Image.open(BytesIO(read_image_bytes(ref))) as img:
+        return np.asarray(img.convert("RGB").resize((width, height), Image.Resampling.BILINEAR), dtype=np.float32)
+
+
+# 🎯 Matching --------------------------------------------------------------
+
+def match_image(detections, annotation):
+    """
+    Matches one image's detections to its ground truth.
+    Returns a compact record: per-detection (score, class, tp flags per IoU
+    threshold), the ground-truth classes and whether the number was read correctly.
+    """
+    gt_boxes = xywh_to_xyxy(np.array([yolo_box(annotation)], dtype=np.float32))
+    gt_classes = np.array([annotation["jersey_number"]])
+
+    boxes, scores, classes = detections["boxes"], detections["scores"], detections["classes"]
+    iou = box_iou(boxes, gt_boxes) if len(boxes) else np.zeros((0, len(gt_boxes)))
+    same_class = classes[:, None] == gt_classes[None, :]
+
+    tp = np.zeros((len(boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        matched = np.zeros(len(gt_boxes), dtype=bool)
+        for d in range(len(boxes)):  # detections arrive sorted by score
+            candidates = np.where(same_class[d] & ~matched & (iou[d] >= threshold), iou[d], -1.0)
+            g = int(candidates.argmax())
+            if candidates[g] >= 0:
+                matched[g] = True
+                tp[d, t] = True
+
+    # Number read correctly: best-scoring detection that overlaps the jersey has the right number
+    overlapping = np.nonzero(iou.max(axis=1) >= ACCURACY_IOU)[0] if len(boxes) else []
+    localized = len(overlapping) > 0
+    correct = localized and int(classes[overlapping[0]]) == int(gt_classes[0])
+
+    return {
+        "scores": scores.astype(np.float32),
+        "classes": classes.astype(np.int16),
+        "tp": tp,
+        "gt_classes": gt_classes,
+        "localized": localized,
+        "correct": correct,
+        "conditions": {"jersey_number": annotation["jersey_number"],
+                       **{field: annotation["metadata"][field] for field in CONDITION_FIELDS}},
+    }
+
+
+class EvaluationAccumulator:
+    """
+    Fixed-size running totals: TP/FP score histograms per class and IoU threshold
+    for mAP, plus correct/total counters per capture condition.
+    """
+
+    def __init__(self, num_classes=NUM_CLASSES):
+        self.num_classes = num_classes
+        self.tp_hist = np.zeros((num_classes, len(IOU_THRESHOLDS), SCORE_BINS), dtype=np.int64)
+        self.fp_hist = np.zeros_like(self.tp_hist)
+        self.gt_counts = np.zeros(num_classes, dtype=np.int64)
+        self.images = 0
+        self.localized = 0
+        self.correct = 0
+        self.breakdown = {field: defaultdict(lambda: [0, 0])
+                          for field in ("jersey_number",) + CONDITION_FIELDS}
+
+    def add(self, record):
+        self.images += 1
+        self.localized += record["localized"]
+        self.correct += record["correct"]
+        np.add.at(self.gt_counts, record["gt_classes"], 1)
+
+        classes = record["classes"].astype(np.int64)
+        in_range = (classes >= 0) & (classes < self.num_classes)
+        bins = np.minimum((record["scores"] * SCORE_BINS).astype(np.int64), SCORE_BINS - 1)
+        for t in range(len(IOU_THRESHOLDS)):
+            tp = record["tp"][:, t] & in_range
+            fp = ~record["tp"][:, t] & in_range
+            np.add.at(self.tp_hist, (classes[tp], t, bins[tp]), 1)
+            np.add.at(self.fp_hist, (classes[fp], t, bins[fp]), 1)
+
+        for field, value in record["conditions"].items():
+            counts = self.breakdown[field][value]
+            counts[0] += record["correct"]
+            counts[1] += 1
+
+    def average_precision(self):
+        """AP per (class, IoU threshold) from the histograms, sweeping the score threshold high -> low"""
+        tp = np.cumsum(self.tp_hist[..., ::-1], axis=-1)
+        fp = np.cumsum(self.fp_hist[..., ::-1], axis=-1)
+        gt = self.gt_counts[:, None, None]
+        recall = np.where(gt > 0, tp / np.maximum(gt, 1), 0.0)
+        precision = tp / np.maximum(tp + fp, 1)
+        # Precision envelope (monotonically decreasing as recall grows)
+        precision = np.maximum.accumulate(precision[..., ::-1], axis=-1)[..., ::-1]
+        recall_steps = np.diff(recall, axis=-1, prepend=0.0)
+        return (precision * recall_steps).sum(axis=-1)  # (classes, thresholds)
+
+    def report(self):
+        ap = self.average_precision()
+        present = self.gt_counts > 0
+
+        def rate(correct, total):
+            return round(correct / total, 4) if total else None
+
+        breakdown = {}
+        for field, values in self.breakdown.items():
+            breakdown[field] = {str(value): {"accuracy": rate(c, n), "count": n}
+                                for value, (c, n) in sorted(values.items(), key=lambda kv: str(kv[0]))}
+
+        accuracy = rate(self.correct, self.images)
+        return {
+            "images": self.images,
+            "map50": round(float(ap[present, 0].mean()), 4) if present.any() else None,
+            "map50_95": round(float(ap[present].mean()), 4) if present.any() else None,
+            "localization_rate": rate(self.localized, self.images),
+            "accuracy": accuracy,
+            "target_met": accuracy is not None and accuracy > 0.8,
+            "ap50_by_number": {str(c): round(float(ap[c, 0]), 4) for c in np.nonzero(present)[0]},
+            "accuracy_by": breakdown,
+        }
+
+
+# 🧠 Model runners ---------------------------------------------------------
+
+def _quantize(values, detail):
+    dtype = np.dtype(detail["dtype"])
+    if dtype.kind == "f":
+        return values.astype(dtype)
+    scale, zero_point = detail["quantization"]
+    if scale:
+        values = values / scale + zero_point
+    info = np.iinfo(dtype)
+    return np.clip(np.round(values), info.min, info.max).astype(dtype)
+
+
+def _dequantize(values, detail):
+    scale, zero_point = detail["quantization"]
+    if np.dtype(detail["dtype"]).kind in "iu" and scale:
+        return (values.astype(np.float32) - zero_point) * scale
+    return values.astype(np.float32)
+
+
+class TFLiteRunner:
+    """Runs a .tflite model one image at a time and decodes outputs per batch"""
+
+    def __init__(self, model_path, num_threads=1, **decode_args):
+        from benchmark_tflite import load_interpreter
+
+        self.interpreter = load_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.outputs = self.interpreter.get_output_details()
+        _, self.height, self.width, _ = self.input["shape"]
+        self.decode_args = decode_args
+        # One dense output = ultralytics YOLOv8 export; three outputs = Keras detector head
+        self.yolov8 = len(self.outputs) == 1
+        # YOLOv8 models take 0-1 input (int8 exports quantize that range), the Keras detector raw 0-255 pixels
+        self.input_scale = 1 / 255.0 if self.yolov8 else 1.0
+
+    def predict(self, images):
+        raw = []
+        for image in images:
+            self.interpreter.set_tensor(self.input["index"], _quantize(image[None] * self.input_scale, self.input))
+            self.interpreter.invoke()
+            raw.append([_dequantize(self.interpreter.get_tensor(o["index"]), o) for o in self.outputs])
+
+        if self.yolov8:
+            output = np.concatenate([r[0] for r in raw])
+            pixel_boxes = float(np.abs(output[:, :4] if output.shape[1] < output.shape[2] else output[..., :4]).max()) > 2
+            return decode_yolov8_batch(output, image_size=self.width if pixel_boxes else None, **self.decode_args)
+
+        # Keras head: tell boxes / confidence / classes apart by shape
+        by_rank = {}
+        for i, o in enumerate(self.outputs):
+            shape = o["shape"]
+            key = "confidence" if len(shape) == 2 else ("boxes" if shape[-1] == 4 else "classes")
+            by_rank[key] = np.concatenate([r[i] for r in raw])
+        return decode_batch(by_rank["boxes"], by_rank["confidence"], by_rank["classes"], **self.decode_args)
+
+
+class OnnxRunner:
+    """Runs an ultralytics .onnx export with onnxruntime (NCHW float input in 0-1, pixel-space boxes)"""
+
+    def __init__(self, model_path, num_threads=1, **decode_args):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0]
+        _, _, self.height, self.width = self.input.shape
+        self.decode_args = decode_args
+
+    def predict(self, images):
+        # Exports have a static batch of 1
+        outputs = [self.session.run(None, {self.input.name: (image.transpose(2, 0, 1)[None] / 255.0)
+                                           .astype(np.float32)})[0]
+                   for image in images]
+        return decode_yolov8_batch(np.concatenate(outputs), image_size=self.width, **self.decode_args)
+
+
+_worker_runner = None
+
+
+def make_runner(model_path, num_threads=1, **decode_args):
+    """TFLiteRunner or OnnxRunner depending on the file type"""
+    runner_cls = OnnxRunner if str(model_path).endswith(".onnx") else TFLiteRunner
+    return runner_cls(model_path, num_threads, **decode_args)
+
+
+def _init_worker(model_path, num_threads, decode_args):
+    global _worker_runner
+    _worker_runner = make_runner(model_path, num_threads, **decode_args)
+
+
+def _evaluate_chunk(chunk):
+    """Worker entry point: predicts a chunk and returns only the match records"""
+    runner = _worker_runner
+    images, annotations, failures = [], [], []
+    for ref, annotation in chunk:
+        try:
+            images.append(load_image(ref, runner.width, runner.height))
+            annotations.append(annotation)
+        except (OSError, ValueError) as e:
+            failures.append({"image": annotation["image_path"], "error": str(e)})
+    if not images:
+        return [], failures
+    per_image = split_by_image(runner.predict(images), len(images))
+    return [match_image(d, a) for d, a in zip(per_image, annotations)], failures
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def evaluate_tflite(model_path, samples, workers=None, decode_args=None, chunk_size=CHUNK_SIZE):
+    """Pool of TFLite interpreter (or onnxruntime, for .onnx) worker processes"""
+    accumulator = EvaluationAccumulator()
+    failures = []
+    workers = max(1, workers or os.cpu_count() or 1)
+    decode_args = decode_args or {}
+
+    def collect(result):
+        records, chunk_failures = result
+        for record in records:
+            accumulator.add(record)
+        failures.extend(chunk_failures)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(str(model_path), 1, decode_args)) as executor:
+        in_flight = set()
+        for chunk in _chunks(samples, chunk_size):
+            in_flight.add(executor.submit(_evaluate_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        for future in wait(in_flight).done:
+            collect(future.result())
+    return accumulator, failures
+
+
+def evaluate_keras(model_path, samples, decode_args=None, chunk_size=CHUNK_SIZE):
+    """Keras models run batched in-process; TensorFlow already uses every core"""
+    import tensorflow as tf
+    from grid_head import CUSTOM_OBJECTS
+
+    model = tf.keras.models.load_model(model_path, compile=False, custom_objects=CUSTOM_OBJECTS)
+    size = MODEL_CONFIG["input_size"]
+    accumulator = EvaluationAccumulator()
+    failures = []
+    for chunk in _chunks(samples, chunk_size):
+        images, annotations = [], []
+        for ref, annotation in chunk:
+            try:
+                images.append(load_image(ref, size, size))
+                annotations.append(annotation)
+            except (OSError, ValueError) as e:
+                failures.append({"image": annotation["image_path"], "error": str(e)})
+        if not images:
+            continue
+        boxes, confidence, classes = model.predict(np.stack(images), verbose=0)
+        per_image = split_by_image(decode_batch(boxes, confidence, classes, **(decode_args or {})), len(images))
+        for detections, annotation in zip(per_image, annotations):
+            accumulator.add(match_image(detections, annotation))
+    return accumulator, failures
+
+
+def evaluate_model(model_path, data_dir=DATA_DIR, shards_dir=None, split="val", workers=None,
+                   confidence_threshold=0.001, limit=None):
+    """
+    🧪 Evaluates a .tflite, .onnx or Keras model and returns the report dict.
+    A low confidence threshold is used by default so mAP sees the full
+    precision/recall curve; accuracy uses the best-scoring detection.
+    limit evaluates only the first N samples of the split.
+    """
+    decode_args = {"confidence_threshold": confidence_threshold,
+                   "nms_threshold": MODEL_CONFIG["nms_threshold"],
+                   "max_detections": MODEL_CONFIG["max_detections"]}
+    samples = iter_samples(data_dir, shards_dir, split)
+    if limit:
+        samples = itertools.islice(samples, limit)
+
+    started = time.perf_counter()
+    if str(model_path).endswith((".tflite", ".onnx")):
+        accumulator, failures = evaluate_tflite(model_path, samples, workers, decode_args)
+    else:
+        accumulator, failures = evaluate_keras(model_path, samples, decode_args)
+    elapsed = time.perf_counter() - started
+
+    report = accumulator.report()
+    report.update({
+        "model": str(model_path),
+        "dataset": str(shards_dir or data_dir),
+        "split": split,
+        "failed_images": failures,
+        "wall_time_s": round(elapsed, 3),
+        "images_per_sec": round(accumulator.images / elapsed, 2) if elapsed > 0 else None,
+    })
+    return report
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🧪 Evaluate a jersey detector (mAP + per-condition accuracy)')
+    parser.add_argument('--model', required=True, help='.tflite, .onnx or Keras model')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--test-data', help='Dedicated test set directory; every sample is evaluated')
+    parser.add_argument('--shards', help='Packed shards root (evaluates its val split)')
+    parser.add_argument('--split', choices=['val', 'train', 'all'], default='val', help='Which samples to use')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Interpreter worker processes')
+    parser.add_argument('--conf', type=float, default=0.001, help='Confidence threshold before NMS')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    data_dir, split = (args.test_data, "all") if args.test_data else (args.data_path, args.split)
+    report = evaluate_model(args.model, data_dir, args.shards, split, args.workers, args.conf)
+
+    logger.info(f"📊 mAP50: {report['map50']}  mAP50-95: {report['map50_95']}  accuracy: {report['accuracy']}")
+    logger.info(f"⏱️ {report['images']} images in {report['wall_time_s']}s ({report['images_per_sec']} images/sec)")
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+📐 Export Matrix for the YOLOv8 Jersey Detector
+
+Exports one trained checkpoint in every shippable variant and measures each
+one, so the file copied to app/src/main/assets/model.tflite is picked from
+data rather than guesswork:
+
+    formats   tflite float32, float16, dynamic-range int8, full int8; onnx float32
+    sizes     320, 416, 640 (any --imgsz list)
+
+Per variant: file size, CPU latency (TFLite interpreter or onnxruntime, via
+benchmark_tflite.py's timing), and mAP / number accuracy on a held-out subset
+of the validation split (evaluate_model.py). Variants that no other variant
+beats on size, latency and mAP50-95 at once are marked as the Pareto front.
+
+Usage:
+    python export_matrix.py runs/train/jersey_detector/weights/best.pt --data ./yolo_export/dataset.yaml
+    python export_matrix.py best.pt --data dataset.yaml --imgsz 320 416 --eval-samples 300 --output matrix.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from training_config import DATA_DIR, MODELS_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_SIZES = (320, 416, 640)
+DEFAULT_THREADS = 4  # NumberLocator runs the interpreter with 4 threads
+DEFAULT_EVAL_SAMPLES = 500
+DEFAULT_RUNS = 50
+DEFAULT_WARMUP = 5
+
+# File name endings onnx2tf / ultralytics give each TFLite variant inside <stem>_saved_model/.
+# Older ultralytics releases rename the dynamic-range model to *_int8.tflite.
+TFLITE_VARIANTS = {
+    "float32": ("_float32.tflite",),
+    "float16": ("_float16.tflite",),
+    "dynamic_int8": ("_dynamic_range_quant.tflite", "_int8.tflite"),
+    "int8": ("_full_integer_quant.tflite",),
+}
+
+
+def _find_variant(saved_model_dir, endings):
+    for ending in endings:
+        matches = sorted(Path(saved_model_dir).glob(f"*{ending}"))
+        if matches:
+            return matches[0]
+    return None
+
+
+def export_variants(weights, data_yaml, image_sizes=DEFAULT_IMAGE_SIZES, output_dir=MODELS_DIR / "matrix"):
+    """
+    📤 Runs the ultralytics exports and copies every variant to
+    output_dir/<stem>_<imgsz>_<variant>.<ext>. Variants already in output_dir are
+    kept, so an interrupted matrix resumes where it stopped.
+    """
+    from ultralytics import YOLO
+
+    weights = Path(weights)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    saved_model_dir = weights.with_name(f"{weights.stem}_saved_model")
+
+    def target(imgsz, variant, suffix):
+        return output_dir / f"{weights.stem}_{imgsz}_{variant}{suffix}"
+
+    variants = []
+    for imgsz in image_sizes:
+        # float32 + float16 come out of one export; int8 calibration needs the dataset
+        for variants_of_run, export_args in ((("float32", "float16"), {}),
+                                             (("dynamic_int8", "int8"), {"int8": True, "data": str(data_yaml)})):
+            targets = {v: target(imgsz, v, ".tflite") for v in variants_of_run}
+            if not all(path.exists() for path in targets.values()):
+                logger.info(f"📤 Exporting tflite {'/'.join(variants_of_run)} at {imgsz}px")
+                shutil.rmtree(saved_model_dir, ignore_errors=True)
+                YOLO(str(weights)).export(format="tflite", imgsz=imgsz, **export_args)
+                for variant, path in targets.items():
+                    exported = _find_variant(saved_model_dir, TFLITE_VARIANTS[variant])
+                    if exported is None:
+                        logger.warning(f"⚠️ No {variant} file in {saved_model_dir}")
+                        continue
+                    shutil.copy2(exported, path)
+            variants.extend({"variant": v, "format": "tflite", "imgsz": imgsz, "path": str(p)}
+                            for v, p in targets.items() if p.exists())
+
+        onnx_path = target(imgsz, "float32", ".onnx")
+        if not onnx_path.exists():
+            logger.info(f"📤 Exporting onnx at {imgsz}px")
+            shutil.copy2(YOLO(str(weights)).export(format="onnx", imgsz=imgsz), onnx_path)
+        variants.append({"variant": "float32", "format": "onnx", "imgsz": imgsz, "path": str(onnx_path)})
+    return variants
+
+
+def benchmark_onnx(model_path, num_threads=DEFAULT_THREADS, warmup=DEFAULT_WARMUP, runs=DEFAULT_RUNS):
+    """onnxruntime counterpart of benchmark_tflite.benchmark_config (random input, steady-state percentiles)"""
+    import numpy as np
+    import onnxruntime as ort
+    from benchmark_tflite import percentiles_ms
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+    model_input = session.get_inputs()[0]
+    feed = {model_input.name: np.random.default_rng(0).random(model_input.shape, dtype=np.float32)}
+
+    for _ in range(warmup):
+        session.run(None, feed)
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        session.run(None, feed)
+        latencies.append(time.perf_counter() - started)
+    return percentiles_ms(latencies)
+
+
+def measure_variant(entry, data_dir=DATA_DIR, shards_dir=None, eval_samples=DEFAULT_EVAL_SAMPLES,
+                    threads=DEFAULT_THREADS, workers=None, runs=DEFAULT_RUNS):
+    """Adds size, latency and accuracy columns to one matrix row"""
+    from evaluate_model import evaluate_model
+
+    path = Path(entry["path"])
+    entry["size_mb"] = round(path.stat().st_size / 1024 ** 2, 2)
+
+    if entry["format"] == "onnx":
+        latency = benchmark_onnx(path, threads, runs=runs)
+    else:
+        from benchmark_tflite import benchmark_model
+
+        result = benchmark_model(path, threads=[threads], warmup=DEFAULT_WARMUP, runs=runs)["results"][0]
+        if "error" in result:
+            entry["error"] = result["error"]
+            return entry
+        latency = result["steady_state"]
+    entry["p50_ms"], entry["p95_ms"] = latency["p50"], latency["p95"]
+
+    report = evaluate_model(path, data_dir, shards_dir, "val", workers, limit=eval_samples)
+    entry.update({"map50": report["map50"], "map50_95": report["map50_95"], "accuracy": report["accuracy"],
+                  "eval_images": report["images"]})
+    logger.info(f"📏 {path.name}: {entry['size_mb']} MB, p50 {entry['p50_ms']} ms, "
+                f"mAP50-95 {entry['map50_95']}, accuracy {entry['accuracy']}")
+    return entry
+
+
+def pareto_front(rows):
+    """Marks rows no other row beats on size, p50 latency and mAP50-95 simultaneously"""
+    measured = [r for r in rows if "error" not in r and r.get("map50_95") is not None]
+    for row in rows:
+        row["pareto"] = False
+    for row in measured:
+        row["pareto"] = not any(
+            other is not row
+            and other["size_mb"] <= row["size_mb"]
+            and other["p50_ms"] <= row["p50_ms"]
+            and other["map50_95"] >= row["map50_95"]
+            and (other["size_mb"], other["p50_ms"], -other["map50_95"])
+            != (row["size_mb"], row["p50_ms"], -row["map50_95"])
+            for other in measured
+        )
+    return rows
+
+
+def recommend(rows, max_size_mb=50.0, max_latency_ms=100.0):
+    """Most accurate Pareto variant inside the README's mobile budgets (<50MB, <100ms)"""
+    candidates = [r for r in rows if r.get("pareto") and r["format"] == "tflite"
+                  and r["size_mb"] <= max_size_mb and r["p50_ms"] <= max_latency_ms]
+    return max(candidates, key=lambda r: (r["map50_95"], -r["p50_ms"]), default=None)
+
+
+def matrix_table(rows):
+    header = (f"{'variant':<22} {'size MB':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'mAP50':>7} {'mAP50-95':>9} {'acc':>7}  pareto")
+    lines = [header, "-" * len(header)]
+    for r in sorted(rows, key=lambda r: (r["imgsz"], r["format"], r["variant"])):
+        name = f"{r['format']} {r['variant']} {r['imgsz']}"
+        if "error" in r:
+            lines.append(f"{name:<22} {r['error']}")
+            continue
+        lines.append(f"{name:<22} {r['size_mb']:>8.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                     f"{r['map50'] or 0:>7.4f} {r['map50_95'] or 0:>9.4f} {r['accuracy'] or 0:>7.4f}  "
+                     f"{'*' if r['pareto'] else ''}")
+    return lines
+
+
+def run_export_matrix(weights, data_yaml, image_sizes=DEFAULT_IMAGE_SIZES, output_dir=MODELS_DIR / "matrix",
+                      data_dir=DATA_DIR, shards_dir=None, eval_samples=DEFAULT_EVAL_SAMPLES,
+                      threads=DEFAULT_THREADS, workers=None, runs=DEFAULT_RUNS):
+    """🚀 Export, benchmark and evaluate every variant; returns the matrix report"""
+    rows = export_variants(weights, data_yaml, image_sizes, output_dir)
+    for row in rows:
+        measure_variant(row, data_dir, shards_dir, eval_samples, threads, workers, runs)
+    pareto_front(rows)
+    best = recommend(rows)
+
+    for line in matrix_table(rows):
+        logger.info(line)
+    if best:
+        logger.info(f"📱 Recommended for app/src/main/assets/model.tflite: {best['path']}")
+
+    report = {"weights": str(weights), "threads": threads, "eval_samples": eval_samples,
+              "rows": rows, "recommended": best["path"] if best else None}
+    with open(Path(output_dir) / "matrix.json", "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def add_arguments(parser):
+    """Options shared by this script and `jersey_cli.py export`"""
+    parser.add_argument('weights', help='Trained ultralytics checkpoint (e.g. weights/best.pt)')
+    parser.add_argument('--data', required=True, help='dataset.yaml (int8 calibration images)')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=list(DEFAULT_IMAGE_SIZES), help='Input sizes')
+    parser.add_argument('--output-dir', default=str(MODELS_DIR / "matrix"), help='Where variants are written')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Annotations/images for the accuracy check')
+    parser.add_argument('--shards', help='Packed shards root for the accuracy check (overrides --data-path)')
+    parser.add_argument('--eval-samples', type=int, default=DEFAULT_EVAL_SAMPLES, help='Held-out images per variant')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='Inference threads for latency')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Timed invocations per variant')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Evaluation worker processes')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+
+
+def run(args):
+    report = run_export_matrix(args.weights, args.data, args.imgsz, args.output_dir, args.data_path, args.shards,
+                               args.eval_samples, args.threads, args.workers, args.runs)
+    print("\n".join(matrix_table(report["rows"])))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='📐 Export a checkpoint in every variant and compare them')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
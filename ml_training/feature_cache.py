@@ -0,0 +1,283 @@
+"""
+🧊 Frozen-Backbone Feature Cache
+
+Head-only training (train_jersey_detector.py --head-only) keeps the ImageNet
+MobileNetV3Large backbone frozen, so its output for a given input never
+changes. The backbone therefore runs once per (sample, augmentation variant)
+and its feature maps are kept in a memory-mapped float16 store; the detection
+head then trains from the store in minutes on CPU, and a grown dataset only
+needs features for its new images.
+
+Store layout (data/features):
+    features.f16  fixed-size slots of one backbone feature map (13x13x960 at 416px) as float16 (np.memmap)
+    index.npy     one INDEX_DTYPE row per slot (memory-mapped, updated in place)
+    meta.json     format version, feature shape, slot count, backbone version
+
+An entry is addressed by (sample_key, variant). The sample key hashes the
+image bytes plus its label (the augmentation's geometry depends on the box).
+Variant 0 is the image as-is; variants 1..N-1 are augment_cache.render_variant
+draws, so boxes move with the geometry. The backbone version hashes the
+backbone weights, input size and augmentation config; when it changes every
+entry is stale. Slots are sized from a disk budget and, like augment_cache.py,
+the least recently used slot is reused when the store is full.
+
+Usage:
+    python feature_cache.py --variants 4 --budget-gb 5      # extract train + val features from data/
+    python feature_cache.py --stats
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from augment_cache import AUGMENT_CONFIG, SlotStore, config_hash, decode_resized, render_variant
+from jersey_annotations import iter_samples, read_image_bytes, yolo_box
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+FEATURES_FILE = "features.f16"
+DEFAULT_BUDGET_GB = 5.0
+DEFAULT_VARIANTS = 4
+BATCH_SIZE = 32
+
+INDEX_DTYPE = np.dtype([
+    ("sample_key", "<u8"),
+    ("variant", "<u4"),
+    ("last_used", "<u8"),       # LRU clock
+    ("jersey_number", "<i2"),
+    ("bbox", "<f4", (4,)),      # YOLO center_x, center_y, width, height of this variant
+    ("valid", "?"),
+])
+
+
+def sample_key(image_bytes, annotation):
+    """Image content + label: the same photo annotated with another box is another sample"""
+    digest = hashlib.blake2b(image_bytes, digest_size=8)
+    label = [annotation["jersey_number"], [round(float(v), 5) for v in yolo_box(annotation)]]
+    digest.update(json.dumps(label).encode("utf-8"))
+    return int.from_bytes(digest.digest(), "little")
+
+
+def backbone_version(backbone, input_size, augment_config=AUGMENT_CONFIG):
+    """Changes with the backbone weights, the input size or the augmentation settings"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{backbone.name}:{input_size}:{config_hash(augment_config, input_size)}".encode("utf-8"))
+    for weight in backbone.weights:
+        digest.update(weight.numpy().tobytes())
+    return digest.hexdigest()
+
+
+# 📦 Store ------------------------------------------------------------------
+
+class FeatureStore(SlotStore):
+    """
+    Slot store for backbone feature maps, addressed by (sample_key, variant).
+    Features and index are both memory-mapped; lookups go through an in-memory dict.
+    """
+
+    KIND = "feature"
+    SCRIPT = "feature_cache.py"
+    STORE_VERSION = STORE_VERSION
+    PAYLOAD_FILE = FEATURES_FILE
+    PAYLOAD_DTYPE = np.float16
+    INDEX_DTYPE = INDEX_DTYPE
+    KEY_FIELDS = ("sample_key", "variant")
+    VERSION_FIELD = "backbone_version"
+
+    def __init__(self, store_dir, feature_shape, version, budget_bytes=int(DEFAULT_BUDGET_GB * 1024 ** 3)):
+        self.feature_shape = tuple(int(d) for d in feature_shape)
+        self.version = version
+        super().__init__(store_dir, self.feature_shape, budget_bytes, {"feature_shape": list(self.feature_shape)},
+                         {"backbone_version": version})
+        self.features = self.payload
+
+    @classmethod
+    def open(cls, store_dir):
+        """Opens an existing store with the shape, capacity and version it was created with"""
+        meta = cls.read_meta(store_dir)
+        budget_bytes = meta["capacity"] * cls.slot_size(meta["feature_shape"])
+        return cls(store_dir, meta["feature_shape"], meta["backbone_version"], budget_bytes)
+
+    def has(self, key, variant):
+        """True if cached; also marks the entry as recently used"""
+        slot = self.slots.get((key, variant))
+        if slot is None:
+            return False
+        self._touch(slot)
+        return True
+
+    def put(self, key, variant, jersey_number, features, box):
+        """Stores one feature map; returns True if an older entry had to be evicted"""
+        return self._put((key, variant), features, (key, variant, 0, jersey_number, box, True))
+
+    def slot_table(self, keys, variants):
+        """(samples, variants) slot table for the keys that have every variant cached"""
+        rows = []
+        for key in keys:
+            row = [self.slots.get((key, v)) for v in range(variants)]
+            if None not in row:
+                rows.append(row)
+        return np.array(rows, dtype=np.int64).reshape(-1, variants)
+
+    def stats(self):
+        return {**super().stats(), "feature_shape": list(self.feature_shape), "backbone_version": self.version}
+
+
+# 🔥 Extraction -------------------------------------------------------------
+
+def _render(job, input_size):
+    """Thread pool entry point: decodes a source once and renders its missing variants"""
+    image_bytes, annotation, key, missing = job
+    image = decode_resized(image_bytes, input_size)
+    box = np.asarray(yolo_box(annotation), dtype=np.float32)
+    outputs = []
+    for variant in missing:
+        pixels, variant_box = (image, box) if variant == 0 else render_variant(image, box, key, variant)
+        outputs.append((key, variant, annotation["jersey_number"], pixels, variant_box))
+    return outputs
+
+
+def populate_features(store, backbone, input_size, data_dir=None, shards_dir=None, split="train",
+                      variants=DEFAULT_VARIANTS, batch_size=BATCH_SIZE, workers=None):
+    """
+    🚀 Runs the frozen backbone over every (sample, variant) the store doesn't have.
+    Decoding and augmentation run in a thread pool, the backbone in batches.
+    Returns a summary including the split's sample keys (in dataset order).
+    Samples that left the dataset aren't dropped here (the store is shared by
+    both splits); they age out through the LRU.
+    """
+    import tensorflow as tf
+
+    extract = tf.function(lambda images: backbone(images, training=False), reduce_retracing=True)
+    started = time.perf_counter()
+    keys = []
+    reused = extracted = evicted = 0
+    pending, batch = [], []
+
+    def run_batch(items):
+        nonlocal extracted, evicted
+        images = tf.convert_to_tensor(np.stack([pixels for _k, _v, _n, pixels, _b in items]), dtype=tf.float32)
+        features = extract(images).numpy().astype(np.float16)
+        for (key, variant, number, _pixels, box), feature_map in zip(items, features):
+            evicted += store.put(key, variant, number, feature_map, box)
+        extracted += len(items)
+
+    def render_pending(executor):
+        for outputs in executor.map(lambda job: _render(job, input_size), pending):
+            batch.extend(outputs)
+            while len(batch) >= batch_size:
+                run_batch(batch[:batch_size])
+                del batch[:batch_size]
+        pending.clear()
+
+    with ThreadPoolExecutor(max(1, workers or os.cpu_count() or 1)) as executor:
+        for ref, annotation in iter_samples(data_dir, shards_dir, split):
+            try:
+                image_bytes = read_image_bytes(ref)
+            except OSError:
+                continue
+            key = sample_key(image_bytes, annotation)
+            keys.append(key)
+            missing = [v for v in range(variants) if not store.has(key, v)]
+            reused += variants - len(missing)
+            if missing:
+                pending.append((image_bytes, annotation, key, missing))
+            if len(pending) >= batch_size:
+                render_pending(executor)
+        render_pending(executor)
+    if batch:
+        run_batch(batch)
+    store.flush()
+
+    return {"split": split, "samples": len(keys), "variants": variants, "extracted": extracted, "reused": reused,
+            "evicted": evicted, "seconds": round(time.perf_counter() - started, 2), "keys": keys}
+
+
+def to_tf_dataset(store, keys, variants, config, shuffle=True):
+    """
+    📊 tf.data source of (features, detection targets) batches; each epoch reads one
+    random cached variant per sample. Features leave the store as float16 and are
+    widened to float32 per batch.
+    """
+    import tensorflow as tf
+
+    from jersey_tf_data import make_targets
+
+    table = store.slot_table(keys, variants)
+    if len(table) < len(keys):
+        logger.warning(f"⚠️ {len(keys) - len(table)} of {len(keys)} samples are missing cached variants "
+                       f"(store too small for the budget?)")
+    if not len(table):
+        raise ValueError(f"No sample has all {variants} variants in {store.store_dir}; extract features first")
+
+    def read_slot(slot):
+        slot = int(slot)
+        row = store.index[slot]
+        return np.asarray(store.features[slot]), np.int32(row["jersey_number"]), row["bbox"].astype(np.float32)
+
+    def load(slots):
+        pick = tf.random.uniform((), 0, variants, dtype=tf.int32)
+        features, number, box = tf.numpy_function(read_slot, [slots[pick]], [tf.float16, tf.int32, tf.float32])
+        features.set_shape(store.feature_shape)
+        number.set_shape(())
+        box.set_shape((4,))
+        return features, number, box
+
+    ds = tf.data.Dataset.from_tensor_slices(table)
+    if shuffle:
+        ds = ds.shuffle(len(table), reshuffle_each_iteration=True)
+    ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    ds = ds.batch(config["batch_size"], drop_remainder=shuffle and len(table) >= config["batch_size"])
+    ds = ds.map(lambda features, numbers, boxes: (tf.cast(features, tf.float32),
+                                                  make_targets(numbers, boxes, config)),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def open_for_backbone(backbone, input_size, store_dir, budget_gb=DEFAULT_BUDGET_GB):
+    """The store matching this backbone (entries from another backbone version are invalidated)"""
+    return FeatureStore(store_dir, backbone.output_shape[1:], backbone_version(backbone, input_size),
+                        int(budget_gb * 1024 ** 3))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from training_config import DATA_DIR, FEATURES_DIR, MODEL_CONFIG
+
+    parser = argparse.ArgumentParser(description='🧊 Cache frozen-backbone features for head-only training')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', help='Packed shards root (overrides --data-path)')
+    parser.add_argument('--store', default=str(FEATURES_DIR), help='Feature store directory')
+    parser.add_argument('--variants', type=int, default=DEFAULT_VARIANTS,
+                        help='Variants per training image (variant 0 = unaugmented)')
+    parser.add_argument('--budget-gb', type=float, default=DEFAULT_BUDGET_GB, help='Disk budget for the store')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Backbone batch size')
+    parser.add_argument('--stats', action='store_true', help='Only print store statistics')
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(FeatureStore.open(args.store).stats(), indent=2))
+        return
+
+    from train_jersey_detector import create_backbone
+
+    backbone = create_backbone()
+    store = open_for_backbone(backbone, MODEL_CONFIG["input_size"], args.store, args.budget_gb)
+    report = {"store": store.stats()}
+    for split, variants in (("train", args.variants), ("val", 1)):
+        summary = populate_features(store, backbone, MODEL_CONFIG["input_size"], args.data_path, args.shards,
+                                    split, variants, args.batch_size)
+        summary.pop("keys")
+        report[split] = summary
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
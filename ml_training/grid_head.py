@@ -0,0 +1,237 @@
+"""
+🔢 Grid Detection Head with Digit-Decomposed Classes
+
+Alternative to the dense head of create_yolo_model() (GlobalAveragePooling ->
+Dense(512) -> max_detections x 100 softmax). The grid head stays convolutional
+on the 13x13 backbone feature map (416px input, stride 32) and is anchor-free:
+every cell predicts
+
+    objectness   1 sigmoid
+    box          center offset inside the cell + width/height (sigmoids), normalized to the image
+    tens digit   11 logits: blank, 0-9
+    ones digit   10 logits: 0-9
+
+Numbers are composed in-graph as p(n) = p(tens) * p(ones), with blank and "0"
+both giving the single-digit numbers 0-9 (the 0-99 label space folds 07 into 7).
+For 10-99, categorical cross-entropy on the composed distribution is exactly the
+sum of the two digit cross-entropies, so a rare number like 83 learns from every
+8x and x3; for 0-9 the tens term is -log(p(blank) + p("0")).
+
+The model keeps the dense head's output contract, with one slot per cell:
+boxes (B, 169, 4) as YOLO center/size, confidence (B, 169), classes (B, 169, 100),
+so postprocess.decode_batch, evaluate_model.py and the int8 TFLite export work
+unchanged. Targets put the ground truth in the cell holding the box center
+(jersey_tf_data.make_targets with MODEL_CONFIG["head"] = "grid").
+
+Head comparison (parameters, multiply-accumulates and TFLite CPU latency on
+random backbone features):
+    python grid_head.py --threads 1 4
+    python grid_head.py --full          # whole models incl. the backbone (downloads ImageNet weights)
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from training_config import MODEL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+BACKBONE_STRIDE = 32  # MobileNetV3Large output stride
+BACKBONE_CHANNELS = 960
+GRID_CHANNELS = 32
+TENS_CLASSES = 11     # blank, 0-9
+ONES_CLASSES = 10
+# Objectness bias so the initial score is ~1 / cells instead of 0.5 everywhere
+OBJECTNESS_PRIOR_BIAS = -5.0
+
+
+def grid_size(config=MODEL_CONFIG):
+    return config["input_size"] // BACKBONE_STRIDE
+
+
+@tf.keras.utils.register_keras_serializable(package="jersey")
+class GridBoxes(tf.keras.layers.Layer):
+    """Raw (B, G, G, 4) cell outputs -> (B, G*G, 4) YOLO boxes normalized to the image"""
+
+    def call(self, raw):
+        grid = tf.shape(raw)[1]
+        steps = tf.cast(tf.range(grid), raw.dtype)
+        cols, rows = tf.meshgrid(steps, steps)
+        offsets = tf.stack([cols, rows], axis=-1)[tf.newaxis]  # (1, G, G, 2)
+        size = tf.cast(grid, raw.dtype)
+        raw = tf.sigmoid(raw)
+        boxes = tf.concat([(offsets + raw[..., :2]) / size, raw[..., 2:]], axis=-1)
+        return tf.reshape(boxes, (tf.shape(raw)[0], grid * grid, 4))
+
+
+@tf.keras.utils.register_keras_serializable(package="jersey")
+class DigitClasses(tf.keras.layers.Layer):
+    """Tens (B, G, G, 11) and ones (B, G, G, 10) logits -> (B, G*G, 100) number probabilities"""
+
+    def call(self, inputs):
+        tens_logits, ones_logits = inputs
+        cells = tf.shape(tens_logits)[1] * tf.shape(tens_logits)[2]
+        batch = tf.shape(tens_logits)[0]
+        tens = tf.reshape(tf.nn.softmax(tens_logits, axis=-1), (batch, cells, TENS_CLASSES))
+        ones = tf.reshape(tf.nn.softmax(ones_logits, axis=-1), (batch, cells, ONES_CLASSES))
+        single = (tens[..., 0] + tens[..., 1])[..., tf.newaxis] * ones            # 0-9
+        double = tens[..., 2:, tf.newaxis] * ones[..., tf.newaxis, :]              # 10-99
+        return tf.concat([single, tf.reshape(double, (batch, cells, 90))], axis=-1)
+
+
+CUSTOM_OBJECTS = {"GridBoxes": GridBoxes, "DigitClasses": DigitClasses}
+
+
+def grid_detection_head(features, config=MODEL_CONFIG):
+    """
+    🎯 Grid head on a (G, G, C) backbone feature map; returns [boxes, confidence, classes].
+    Weighted layers are named so head-only and full models share weights by name.
+    """
+    if config["num_classes"] != 100:
+        raise ValueError("The digit-decomposed head covers jersey numbers 0-99 only")
+    grid = grid_size(config)
+
+    x = tf.keras.layers.Conv2D(GRID_CHANNELS, 1, activation='relu', name='grid_reduce')(features)
+    x = tf.keras.layers.SeparableConv2D(GRID_CHANNELS, 3, padding='same', activation='relu',
+                                        name='grid_context')(x)
+    objectness = tf.keras.layers.Conv2D(1, 1, activation='sigmoid', name='grid_objectness',
+                                        bias_initializer=tf.keras.initializers.Constant(OBJECTNESS_PRIOR_BIAS))(x)
+    box_raw = tf.keras.layers.Conv2D(4, 1, name='grid_box')(x)
+    tens = tf.keras.layers.Conv2D(TENS_CLASSES, 1, name='grid_tens')(x)
+    ones = tf.keras.layers.Conv2D(ONES_CLASSES, 1, name='grid_ones')(x)
+
+    # Same output names as the dense head (loss dict in compile_model, tf.data targets)
+    boxes = GridBoxes(name='boxes')(box_raw)
+    confidence = tf.keras.layers.Reshape((grid * grid,), name='confidence')(objectness)
+    classes = DigitClasses(name='classes')([tens, ones])
+    return [boxes, confidence, classes]
+
+
+def make_grid_targets(numbers, boxes, config=MODEL_CONFIG):
+    """
+    🎯 Anchor-free targets: the cell holding the box center gets the box, confidence 1
+    and a one-hot number; every other cell is empty.
+    """
+    grid = grid_size(config)
+    cols = tf.clip_by_value(tf.cast(tf.floor(boxes[:, 0] * grid), tf.int32), 0, grid - 1)
+    rows = tf.clip_by_value(tf.cast(tf.floor(boxes[:, 1] * grid), tf.int32), 0, grid - 1)
+    confidence = tf.one_hot(rows * grid + cols, grid * grid)
+    box_targets = confidence[:, :, tf.newaxis] * boxes[:, tf.newaxis, :]
+    class_targets = confidence[:, :, tf.newaxis] * tf.one_hot(numbers, config["num_classes"])[:, tf.newaxis, :]
+    return {"boxes": box_targets, "confidence": confidence, "classes": class_targets}
+
+
+def grid_box_loss(y_true, y_pred):
+    """
+    Squared box error averaged over the cells that hold a box. With one positive
+    among 169 cells, a plain mean would let the empty cells drown the gradient.
+    """
+    positive = tf.cast(tf.reduce_any(y_true > 0, axis=-1), y_pred.dtype)
+    error = tf.reduce_sum(tf.square(y_true - y_pred), axis=-1) * positive
+    return tf.reduce_sum(error, axis=-1) / tf.maximum(tf.reduce_sum(positive, axis=-1), 1.0)
+
+
+def grid_class_loss(y_true, y_pred):
+    """
+    Number crossentropy averaged over the cells that hold a box, for the same
+    reason; empty cells have all-zero targets and contribute 0.
+    """
+    positive = tf.reduce_sum(y_true, axis=-1)
+    cross_entropy = tf.keras.losses.categorical_crossentropy(y_true, y_pred)
+    return tf.reduce_sum(cross_entropy, axis=-1) / tf.maximum(tf.reduce_sum(positive, axis=-1), 1.0)
+
+
+# ⏱️ Head comparison ---------------------------------------------------------
+
+def multiply_accumulates(model):
+    """MACs of the Dense / Conv2D / SeparableConv2D layers (activations and reshapes are negligible)"""
+    total = 0
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.Model):
+            total += multiply_accumulates(layer)
+        elif isinstance(layer, tf.keras.layers.Dense):
+            total += int(np.prod(layer.kernel.shape))
+        elif isinstance(layer, tf.keras.layers.SeparableConv2D):
+            _, height, width, _ = layer.output.shape
+            total += height * width * (int(np.prod(layer.depthwise_kernel.shape))
+                                       + int(np.prod(layer.pointwise_kernel.shape)))
+        elif isinstance(layer, tf.keras.layers.DepthwiseConv2D):
+            _, height, width, _ = layer.output.shape
+            # Keras 2 calls it depthwise_kernel, Keras 3 kernel
+            kernel = layer.depthwise_kernel if hasattr(layer, "depthwise_kernel") else layer.kernel
+            total += height * width * int(np.prod(kernel.shape))
+        elif isinstance(layer, tf.keras.layers.Conv2D):
+            _, height, width, _ = layer.output.shape
+            total += height * width * int(np.prod(layer.kernel.shape))
+    return int(total)
+
+
+def _tflite_latency(model, name, threads, runs):
+    """Float32 TFLite conversion + benchmark_tflite steady-state p50 per thread count"""
+    from benchmark_tflite import benchmark_model
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"{name}.tflite"
+        path.write_bytes(converter.convert())
+        report = benchmark_model(path, threads=threads, runs=runs, isolate=False)
+        size = path.stat().st_size
+    return size, {r["threads"]: r["steady_state"]["p50"] for r in report["results"] if "error" not in r}
+
+
+def compare_heads(threads=(1, 4), runs=100, full=False):
+    """
+    📊 Parameter count, MACs, TFLite size and CPU p50 latency of the dense and grid heads.
+    Head-only models take random backbone features; full=True times whole models.
+    """
+    from train_jersey_detector import create_backbone, create_head_model, create_yolo_model
+
+    feature_shape = (grid_size(), grid_size(), BACKBONE_CHANNELS)
+    rows = []
+    for head in ("dense", "grid"):
+        model = create_yolo_model(head) if full else create_head_model(feature_shape, head)
+        size, latency = _tflite_latency(model, f"{head}_head", list(threads), runs)
+        rows.append({"head": head, "scope": "full model" if full else "head only",
+                     "parameters": int(model.count_params()), "macs": multiply_accumulates(model),
+                     "tflite_kb": round(size / 1024, 1), "p50_ms": latency})
+    if full:
+        backbone = create_backbone()
+        for row in rows:
+            row["head_parameters"] = row["parameters"] - int(backbone.count_params())
+    return rows
+
+
+def comparison_table(rows):
+    threads = sorted({t for row in rows for t in row["p50_ms"]})
+    header = f"{'head':<6} {'params':>10} {'MACs':>12} {'tflite KB':>10} " + " ".join(
+        f"{f'p50 {t}T ms':>11}" for t in threads)
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(f"{row['head']:<6} {row['parameters']:>10,} {row['macs']:>12,} {row['tflite_kb']:>10.1f} "
+                     + " ".join(f"{row['p50_ms'].get(t, float('nan')):>11.3f}" for t in threads))
+    return lines
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🔢 Compare the dense and grid detection heads')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4], help='Interpreter thread counts')
+    parser.add_argument('--runs', type=int, default=100, help='Timed invocations per thread count')
+    parser.add_argument('--full', action='store_true', help='Benchmark whole models including the backbone')
+    parser.add_argument('--output', help='Write the JSON rows to this file')
+    args = parser.parse_args()
+
+    rows = compare_heads(args.threads, args.runs, args.full)
+    print("\n".join(comparison_table(rows)))
+    if args.output:
+        Path(args.output).write_text(json.dumps(rows, indent=2) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+🏷️ Jersey Annotation Helpers
+
+Reads the annotation JSON written by the app's JerseyDatasetCollector
+(JerseyAnnotation / BoundingBox / CaptureMetadata) so every training tool
+parses, normalizes and splits samples the same way.
+"""
+
+import json
+import os
+import zlib
+from pathlib import Path
+
+NUM_CLASSES = 100  # Jersey numbers 0-99
+
+# Mirrors the defaults of the Kotlin CaptureMetadata data class
+CAPTURE_METADATA_DEFAULTS = {
+    "capture_mode": "manual",
+    "confidence": 1.0,
+    "detection_source": "manual",
+    "lighting_condition": "unknown",
+    "distance": "medium",
+    "angle": "front",
+}
+
+# Capture conditions used for balancing and per-condition reporting
+CONDITION_FIELDS = ("lighting_condition", "distance", "angle")
+
+
+def iter_annotation_files(annotations_dir):
+    """Streams annotation JSON paths without listing the whole directory up front"""
+    with os.scandir(annotations_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                yield Path(entry.path)
+
+
+def normalize_annotation(annotation):
+    """Fills in CaptureMetadata defaults the same way Gson does on the app side"""
+    annotation["metadata"] = {**CAPTURE_METADATA_DEFAULTS, **(annotation.get("metadata") or {})}
+    return annotation
+
+
+def load_annotation(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return normalize_annotation(json.load(f))
+
+
+def yolo_box(annotation):
+    """
+    Converts the pixel-space BoundingBox to YOLO (center_x, center_y, width, height),
+    normalized to [0, 1]. Same math as JerseyDatasetCollector.createYOLOAnnotation,
+    plus clipping so boxes that spill past the frame stay valid.
+    """
+    bbox = annotation["bounding_box"]
+    image_w = float(annotation["image_width"])
+    image_h = float(annotation["image_height"])
+
+    x0 = min(max(bbox["x"], 0.0), image_w)
+    y0 = min(max(bbox["y"], 0.0), image_h)
+    x1 = min(max(bbox["x"] + bbox["width"], 0.0), image_w)
+    y1 = min(max(bbox["y"] + bbox["height"], 0.0), image_h)
+
+    return (
+        (x0 + x1) / 2 / image_w,
+        (y0 + y1) / 2 / image_h,
+        (x1 - x0) / image_w,
+        (y1 - y0) / image_h,
+    )
+
+
+def is_validation_sample(image_path, val_fraction=0.2):
+    """
+    Deterministic train/val split keyed on the image name, so re-exports and
+    caches keep every sample on the same side of the split.
+    """
+    bucket = zlib.crc32(Path(image_path).name.encode("utf-8")) % 10_000
+    return bucket < val_fraction * 10_000
+
+
+def yolo_label_line(annotation):
+    """One `class cx cy w h` line, the format JerseyDatasetCollector.exportToYOLOFormat writes"""
+    cx, cy, w, h = yolo_box(annotation)
+    return f"{annotation['jersey_number']} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}"
+
+
+def write_yolo_dataset_yaml(output_dir, train="images", val="images"):
+    """dataset.yaml matching the app's export (images/ + labels/ side by side, 100 classes)"""
+    lines = [
+        "# Jersey Number Detection Dataset",
+        f"path: {Path(output_dir).resolve().as_posix()}",
+        f"train: {train}",
+        f"val: {val}",
+        "",
+        "# Classes (jersey numbers 0-99)",
+        f"nc: {NUM_CLASSES}",
+        f"names: {list(range(NUM_CLASSES))}",
+    ]
+    (Path(output_dir) / "dataset.yaml").write_text("\n".join(lines) + "\n")
+
+
+def iter_samples(data_dir=None, shards_dir=None, split="val", val_fraction=0.2):
+    """
+    Yields (ref, annotation) for loose files or packed shards, where ref is
+    ("file", image_path) or ("shard", shard_dir, sample_id); see read_image_bytes.
+    split="all" uses every sample (e.g. a dedicated test set).
+    """
+    if shards_dir:
+        from jersey_shards import ShardReader
+
+        for name in (("train", "val") if split == "all" else (split,)):
+            shard_split = Path(shards_dir) / name
+            reader = ShardReader(shard_split)
+            for sample_id in range(len(reader)):
+                yield ("shard", str(shard_split), sample_id), reader.annotation(sample_id)
+        return
+
+    data_dir = Path(data_dir)
+    for annotation_file in iter_annotation_files(data_dir / "annotations"):
+        try:
+            annotation = load_annotation(annotation_file)
+        except (OSError, ValueError):
+            continue
+        if split != "all" and is_validation_sample(annotation["image_path"], val_fraction) != (split == "val"):
+            continue
+        yield ("file", str(data_dir / "images" / annotation["image_path"])), annotation
+
+
+_shard_readers = {}
+
+
+def read_image_bytes(ref):
+    """Encoded image bytes for a ref from iter_samples (shard readers are opened once per process)"""
+    if ref[0] == "file":
+        return Path(ref[1]).read_bytes()
+    from jersey_shards import ShardReader
+
+    reader = _shard_readers.get(ref[1])
+    if reader is None:
+        reader = _shard_readers[ref[1]] = ShardReader(ref[1])
+    return reader.image_bytes(ref[2])
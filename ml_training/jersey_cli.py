@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+🧰 Jersey ML Command Line
+
+One entry point for the ml_training tools:
+
+    setup-dirs    data/ and models/ folders plus the dataset collection guide
+    check-env     which commands can run here (nothing is installed automatically)
+    validate      check a dataset.yaml (loose YOLO files or packed shards)
+    train-keras   Keras / TensorFlow detector (train_jersey_detector.py)
+    train-yolo    ultralytics YOLOv8 detector (train_jersey_detector_enhanced.py)
+    export        export matrix of a YOLOv8 checkpoint (export_matrix.py)
+    benchmark     TFLite CPU latency (benchmark_tflite.py)
+    startup       how long `--help` and `validate` take from a cold interpreter
+
+Only the standard library is loaded at start-up. A sub-command imports its
+module when it runs, and TensorFlow / torch / ultralytics only load once the
+work starts, after environment_check.py confirmed they're installed.
+
+Usage:
+    python jersey_cli.py --help
+    python jersey_cli.py validate ./yolo_export/dataset.yaml
+    python jersey_cli.py train-yolo --data ./yolo_export/dataset.yaml --time-budget 2h
+    python jersey_cli.py startup --runs 10
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROG = "jersey_cli.py"
+STARTUP_BUDGET_MS = 300
+STARTUP_RUNS = 10
+
+
+def _load(module_name, command):
+    """Imports a tool module; a missing package turns into the environment check's install hint"""
+    from environment_check import require
+
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        if require(command):
+            raise
+        raise SystemExit(1)
+
+
+def _run_tool(command, module_name, argv, check_env=True):
+    """Parses argv with the module's add_arguments, checks the environment, then calls its run()"""
+    from environment_check import require
+
+    module = _load(module_name, command)
+    parser = argparse.ArgumentParser(prog=f"{PROG} {command}", description=COMMANDS[command][0])
+    module.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if check_env and not require(command):
+        return 1
+    result = module.run(args)
+    return result if isinstance(result, int) else 0
+
+
+# 🧰 Sub-commands ------------------------------------------------------------
+
+def _setup_dirs(argv):
+    argparse.ArgumentParser(prog=f"{PROG} setup-dirs", description=COMMANDS["setup-dirs"][0]).parse_args(argv)
+    from train_jersey_detector import create_dataset_collection_guide, setup_directories
+
+    setup_directories()
+    create_dataset_collection_guide()
+    return 0
+
+
+def _check_env(argv):
+    return _run_tool("check-env", "environment_check", argv, check_env=False)
+
+
+def _validate(argv):
+    parser = argparse.ArgumentParser(prog=f"{PROG} validate", description=COMMANDS["validate"][0])
+    parser.add_argument('data', help='Path to dataset.yaml')
+    parser.add_argument('--shards', action='store_true', help='dataset.yaml was written by jersey_shards.py pack')
+    args = parser.parse_args(argv)
+
+    from environment_check import require
+
+    if not require("validate"):
+        return 1
+    from train_jersey_detector_enhanced import validate_dataset
+
+    return 0 if validate_dataset(args.data, shards=args.shards) else 1
+
+
+def _train_keras(argv):
+    return _run_tool("train-keras", "train_jersey_detector", argv)
+
+
+def _train_yolo(argv):
+    # run() performs the environment check itself
+    return _run_tool("train-yolo", "train_jersey_detector_enhanced", argv, check_env=False)
+
+
+def _export(argv):
+    return _run_tool("export", "export_matrix", argv)
+
+
+def _benchmark(argv):
+    return _run_tool("benchmark", "benchmark_tflite", argv)
+
+
+# ⏱️ Start-up benchmark -------------------------------------------------------
+
+def _png(width=8, height=8):
+    """A tiny gray RGB PNG built with zlib, so the benchmark needs no imaging library"""
+    raw = b"".join(b"\x00" + b"\x80\x80\x80" * width for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def _tiny_dataset(root):
+    """One image + label + dataset.yaml: validate's cost is then start-up, not dataset size"""
+    from jersey_annotations import write_yolo_dataset_yaml
+
+    (root / "images").mkdir()
+    (root / "labels").mkdir()
+    (root / "images" / "sample.png").write_bytes(_png())
+    (root / "labels" / "sample.txt").write_text("7 0.5 0.5 0.25 0.25\n")
+    write_yolo_dataset_yaml(root)
+    return root / "dataset.yaml"
+
+
+def _slowest_imports(command, top=5):
+    """Top-level imports by cumulative time, from one `python -X importtime` run"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", *command[1:]], capture_output=True, text=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):  # nested imports are indented
+            imports.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda entry: -entry["ms"])[:top]
+
+
+def _time_command(command, runs):
+    times, completed = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(command, capture_output=True, text=True)
+        times.append((time.perf_counter() - started) * 1000)
+    return times, completed
+
+
+def startup_benchmark(runs=STARTUP_RUNS, budget_ms=STARTUP_BUDGET_MS):
+    """⏱️ Wall time of `--help` and `validate` in fresh interpreters, plus a bare `python -c pass` baseline"""
+    script = str(Path(__file__).resolve())
+    report = {"python": sys.version.split()[0], "runs": runs, "budget_ms": budget_ms, "cases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_yaml = _tiny_dataset(Path(tmp))
+        cases = {
+            "python -c pass": [sys.executable, "-c", "pass"],
+            "--help": [sys.executable, script, "--help"],
+            "validate": [sys.executable, script, "validate", str(data_yaml)],
+        }
+        for name, command in cases.items():
+            times, completed = _time_command(command, runs)
+            case = {"median_ms": round(statistics.median(times), 1), "min_ms": round(min(times), 1),
+                    "max_ms": round(max(times), 1), "exit_code": completed.returncode}
+            if name != "python -c pass":
+                case["ok"] = completed.returncode == 0 and case["median_ms"] <= budget_ms
+                case["slowest_imports"] = _slowest_imports(command)
+            if completed.returncode != 0:
+                case["stderr"] = completed.stderr.strip().splitlines()[-3:]
+            report["cases"][name] = case
+    report["ok"] = all(case.get("ok", True) for case in report["cases"].values())
+    return report
+
+
+def _startup(argv):
+    parser = argparse.ArgumentParser(prog=f"{PROG} startup", description=COMMANDS["startup"][0])
+    parser.add_argument('--runs', type=int, default=STARTUP_RUNS, help='Timed runs per case')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS, help='Median wall-time budget')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = startup_benchmark(args.runs, args.budget_ms)
+    for name, case in report["cases"].items():
+        verdict = "" if "ok" not in case else ("  ✅" if case["ok"] else "  ❌")
+        logger.info(f"⏱️ {name:<16} median {case['median_ms']:>7.1f} ms  "
+                    f"(min {case['min_ms']:.1f}, max {case['max_ms']:.1f}){verdict}")
+        for entry in case.get("slowest_imports", []):
+            logger.info(f"      {entry['ms']:>7.1f} ms  import {entry['module']}")
+        for line in case.get("stderr", []):
+            logger.info(f"      {line}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    return 0 if report["ok"] else 1
+
+
+COMMANDS = {
+    "setup-dirs": ("Create data/ and models/ folders and the dataset collection guide", _setup_dirs),
+    "check-env": ("Report missing or mismatched packages per command (installs nothing)", _check_env),
+    "validate": ("Validate a dataset.yaml before training", _validate),
+    "train-keras": ("Train the Keras / TensorFlow detector and convert it to TFLite", _train_keras),
+    "train-yolo": ("Train the ultralytics YOLOv8 detector and export it", _train_yolo),
+    "export": ("Export a YOLOv8 checkpoint in every variant and compare size / latency / mAP", _export),
+    "benchmark": ("CPU latency benchmark of a .tflite model", _benchmark),
+    "startup": (f"Check --help and validate start in under {STARTUP_BUDGET_MS} ms", _startup),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]][1](argv[1:])
+
+    parser = argparse.ArgumentParser(prog=PROG, description='🧰 Jersey number detector training tools',
+                                     epilog="Run 'python jersey_cli.py <command> --help' for a command's options.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (help_text, _run) in COMMANDS.items():
+        commands.add_parser(name, help=help_text)
+    parser.parse_args(argv)  # --help, or a usage error for an unknown command
+    return 2
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
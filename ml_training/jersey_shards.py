@@ -0,0 +1,280 @@
+"""
+📦 Packed Training Shards for the Jersey Dataset
+
+Packs the app's loose JPEG + per-image annotation JSON files into a few large
+shard files plus a fixed-size NumPy index, so an epoch becomes a handful of
+sequential reads instead of tens of thousands of small-file opens.
+
+Layout of a packed split (e.g. data/shards/train):
+    shard-00000.bin   image bytes followed by annotation JSON, back to back
+    shard-00001.bin   ...
+    index.npy         one INDEX_DTYPE row per sample (sample id = row number)
+    shards.json       format version and counts
+
+Both files are read through np.memmap, so random access by sample id only
+touches the pages for that sample.
+
+Usage:
+    python jersey_shards.py pack --annotations data/annotations --images data/images --output data/shards
+    python jersey_shards.py info data/shards/train
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from jersey_annotations import (
+    NUM_CLASSES,
+    iter_annotation_files,
+    is_validation_sample,
+    load_annotation,
+    yolo_box,
+)
+
+logger = logging.getLogger(__name__)
+
+SHARD_FORMAT_VERSION = 1
+INDEX_FILE = "index.npy"
+META_FILE = "shards.json"
+DEFAULT_SHARD_SIZE_MB = 256
+
+INDEX_DTYPE = np.dtype([
+    ("shard", "<u4"),
+    ("offset", "<u8"),             # byte offset of the image inside the shard
+    ("image_len", "<u4"),
+    ("annotation_len", "<u4"),     # annotation JSON follows the image bytes
+    ("jersey_number", "<i2"),
+    ("image_width", "<u4"),
+    ("image_height", "<u4"),
+    ("bbox", "<f4", (4,)),         # YOLO center_x, center_y, width, height (normalized)
+])
+
+
+def shard_path(shard_dir, shard_id):
+    return Path(shard_dir) / f"shard-{shard_id:05d}.bin"
+
+
+class ShardWriter:
+    """Appends samples to size-capped shard files and collects their index rows"""
+
+    def __init__(self, shard_dir, shard_size_mb=DEFAULT_SHARD_SIZE_MB):
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.max_shard_bytes = shard_size_mb * 1024 * 1024
+        self.rows = []
+        self.shard_id = -1
+        self.offset = 0
+        self._file = None
+
+    def _roll(self):
+        if self._file:
+            self._file.close()
+        self.shard_id += 1
+        self.offset = 0
+        self._file = open(shard_path(self.shard_dir, self.shard_id), "wb")
+
+    def add(self, image_bytes, annotation):
+        annotation_bytes = json.dumps(annotation, separators=(",", ":")).encode("utf-8")
+        record_len = len(image_bytes) + len(annotation_bytes)
+        if self._file is None or (self.offset and self.offset + record_len > self.max_shard_bytes):
+            self._roll()
+
+        self._file.write(image_bytes)
+        self._file.write(annotation_bytes)
+        self.rows.append((
+            self.shard_id,
+            self.offset,
+            len(image_bytes),
+            len(annotation_bytes),
+            annotation["jersey_number"],
+            annotation["image_width"],
+            annotation["image_height"],
+            yolo_box(annotation),
+        ))
+        self.offset += record_len
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        index = np.array(self.rows, dtype=INDEX_DTYPE)
+        np.save(self.shard_dir / INDEX_FILE, index)
+        with open(self.shard_dir / META_FILE, "w") as f:
+            json.dump({
+                "version": SHARD_FORMAT_VERSION,
+                "num_samples": len(index),
+                "num_shards": self.shard_id + 1,
+                "num_classes": NUM_CLASSES,
+            }, f, indent=2)
+        return len(index)
+
+
+class ShardReader:
+    """
+    Random and sequential access to a packed split.
+    Memory maps are opened lazily and dropped on pickling, so a reader can be
+    handed to DataLoader workers and each process maps the files itself.
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / META_FILE) as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != SHARD_FORMAT_VERSION:
+            raise ValueError(f"Unsupported shard format version {self.meta['version']} in {shard_dir}")
+        self._index = None
+        self._shards = {}
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = np.load(self.shard_dir / INDEX_FILE, mmap_mode="r")
+        return self._index
+
+    def _shard(self, shard_id):
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard = np.memmap(shard_path(self.shard_dir, shard_id), dtype=np.uint8, mode="r")
+            self._shards[shard_id] = shard
+        return shard
+
+    def __len__(self):
+        return self.meta["num_samples"]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_index"] = None
+        state["_shards"] = {}
+        return state
+
+    def image_bytes(self, sample_id):
+        row = self.index[sample_id]
+        start = int(row["offset"])
+        return self._shard(int(row["shard"]))[start:start + int(row["image_len"])].tobytes()
+
+    def annotation(self, sample_id):
+        row = self.index[sample_id]
+        start = int(row["offset"]) + int(row["image_len"])
+        raw = self._shard(int(row["shard"]))[start:start + int(row["annotation_len"])]
+        return json.loads(raw.tobytes())
+
+    def __getitem__(self, sample_id):
+        """Returns (encoded image bytes, annotation dict) for one sample"""
+        return self.image_bytes(sample_id), self.annotation(sample_id)
+
+    def __iter__(self):
+        # Rows are written in shard/offset order, so this is one sequential pass per shard
+        for sample_id in range(len(self)):
+            yield self[sample_id]
+
+
+def to_tf_dataset(shard_dir, sampler=None):
+    """
+    📊 tf.data source for the Keras trainer.
+    Yields (encoded_image, jersey_number, bbox) in shard order, or in the order a
+    sampler (e.g. balanced_sampler.BalancedSampler) draws sample ids each epoch;
+    decoding is left to the caller so it can run with num_parallel_calls.
+    """
+    import tensorflow as tf
+
+    reader = ShardReader(shard_dir)
+
+    def generate():
+        index = reader.index
+        for sample_id in (sampler if sampler is not None else range(len(reader))):
+            row = index[sample_id]
+            yield reader.image_bytes(sample_id), int(row["jersey_number"]), row["bbox"]
+
+    return tf.data.Dataset.from_generator(
+        generate,
+        output_signature=(
+            tf.TensorSpec(shape=(), dtype=tf.string),
+            tf.TensorSpec(shape=(), dtype=tf.int32),
+            tf.TensorSpec(shape=(4,), dtype=tf.float32),
+        ),
+    )
+
+
+def write_dataset_yaml(output_dir, splits):
+    """dataset.yaml so the ultralytics trainer can be pointed at the shards with --shards"""
+    lines = [
+        "# Jersey Number Detection Dataset (packed shards)",
+        f"path: {Path(output_dir).resolve().as_posix()}",
+        f"train: {splits[0]}",
+        f"val: {splits[-1]}",
+        "format: jersey-shards",
+        "",
+        "# Classes (jersey numbers 0-99)",
+        f"nc: {NUM_CLASSES}",
+        f"names: {list(range(NUM_CLASSES))}",
+    ]
+    (Path(output_dir) / "dataset.yaml").write_text("\n".join(lines) + "\n")
+
+
+def pack_dataset(annotations_dir, images_dir, output_dir, val_fraction=0.2, shard_size_mb=DEFAULT_SHARD_SIZE_MB):
+    """
+    📦 Packs annotations + images into train/val shard sets.
+    Samples whose image is missing or whose annotation can't be parsed are skipped
+    and counted. Returns {"train": n, "val": n, "skipped": n}.
+    """
+    images_dir = Path(images_dir)
+    writers = {"train": ShardWriter(Path(output_dir) / "train", shard_size_mb),
+               "val": ShardWriter(Path(output_dir) / "val", shard_size_mb)}
+    skipped = 0
+
+    for annotation_file in iter_annotation_files(annotations_dir):
+        try:
+            annotation = load_annotation(annotation_file)
+            image_bytes = (images_dir / annotation["image_path"]).read_bytes()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Skipping {annotation_file.name}: {e}")
+            skipped += 1
+            continue
+
+        split = "val" if is_validation_sample(annotation["image_path"], val_fraction) else "train"
+        writers[split].add(image_bytes, annotation)
+
+    counts = {split: writer.close() for split, writer in writers.items()}
+    write_dataset_yaml(output_dir, ["train", "val"])
+    counts["skipped"] = skipped
+    logger.info(f"📦 Packed {counts['train']} train / {counts['val']} val samples into {output_dir} "
+                f"({skipped} skipped)")
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    base_dir = Path(__file__).parent
+
+    parser = argparse.ArgumentParser(description='📦 Pack the jersey dataset into memory-mappable shards')
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack = sub.add_parser("pack", help="Pack annotation JSON + images into shards")
+    pack.add_argument('--annotations', default=str(base_dir / "data" / "annotations"), help='Annotation JSON dir')
+    pack.add_argument('--images', default=str(base_dir / "data" / "images"), help='Images dir')
+    pack.add_argument('--output', default=str(base_dir / "data" / "shards"), help='Output dir')
+    pack.add_argument('--val-fraction', type=float, default=0.2, help='Fraction of samples for validation')
+    pack.add_argument('--shard-size-mb', type=int, default=DEFAULT_SHARD_SIZE_MB, help='Target shard size')
+
+    info = sub.add_parser("info", help="Print a summary of a packed split")
+    info.add_argument('shard_dir', help='Packed split directory (e.g. data/shards/train)')
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        print(json.dumps(pack_dataset(args.annotations, args.images, args.output,
+                                      args.val_fraction, args.shard_size_mb), indent=2))
+    else:
+        reader = ShardReader(args.shard_dir)
+        numbers = np.bincount(reader.index["jersey_number"], minlength=NUM_CLASSES)
+        print(json.dumps({
+            **reader.meta,
+            "image_bytes": int(reader.index["image_len"].sum()),
+            "numbers_present": int((numbers > 0).sum()),
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
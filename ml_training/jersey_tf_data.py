@@ -0,0 +1,326 @@
+"""
+📊 tf.data Input Pipeline for the Keras Jersey Detector
+
+Reads the app's annotation JSON (or packed shards from jersey_shards.py) and
+feeds train_jersey_detector.py's model:
+
+    records -> parallel decode + resize -> file cache -> shuffle -> batch
+            -> batched augmentation -> detection targets -> prefetch
+
+Images leave the pipeline as float32 RGB in [0, 255] at input_size x input_size,
+the same range the app feeds the uint8 TFLite model; MobileNetV3's built-in
+preprocessing does the rescaling.
+
+Loader benchmark (samples/sec with each stage switched on or off):
+    python jersey_tf_data.py --batches 50
+"""
+
+import argparse
+import json
+import logging
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from calibration import stratum_key
+from jersey_annotations import iter_annotation_files, is_validation_sample, load_annotation, yolo_box
+
+logger = logging.getLogger(__name__)
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def load_records(annotations_dir, images_dir, split="train", val_fraction=0.2, keys=None):
+    """
+    📋 Parses annotation JSON into parallel arrays (image paths, jersey numbers, YOLO boxes).
+    Annotations whose image is missing are skipped. If a list is passed as keys, the
+    balancing key of every kept sample is appended to it (see balanced_sampler.py).
+    """
+    images_dir = Path(images_dir)
+    paths, numbers, boxes = [], [], []
+    for annotation_file in iter_annotation_files(annotations_dir):
+        try:
+            annotation = load_annotation(annotation_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping {annotation_file.name}: {e}")
+            continue
+        if is_validation_sample(annotation["image_path"], val_fraction) != (split == "val"):
+            continue
+        image_path = images_dir / annotation["image_path"]
+        if not image_path.exists():
+            continue
+        paths.append(str(image_path))
+        numbers.append(annotation["jersey_number"])
+        boxes.append(yolo_box(annotation))
+        if keys is not None:
+            keys.append(stratum_key(annotation))
+
+    return (np.array(paths, dtype=str),
+            np.array(numbers, dtype=np.int32),
+            np.array(boxes, dtype=np.float32).reshape(-1, 4))
+
+
+def decode_image(encoded, input_size):
+    """Decode + bilinear resize, like the app's ResizeOp; cached as uint8 to keep the cache small"""
+    image = tf.io.decode_image(encoded, channels=3, expand_animations=False)
+    image = tf.image.resize(image, (input_size, input_size), method="bilinear")
+    return tf.cast(tf.round(image), tf.uint8)
+
+
+def random_affine(images, boxes, augment_config=None):
+    """
+    🎲 Batched random rotation / zoom / translation that moves the YOLO boxes with
+    the pixels, drawn like augment_cache.render_variant (same AUGMENT_CONFIG ranges).
+    A draw that would leave less than min_visible of the box in frame is dropped
+    for that image (identity) instead of re-drawn.
+    """
+    if augment_config is None:
+        from augment_cache import AUGMENT_CONFIG as augment_config
+
+    batch = tf.shape(images)[0]
+    size = tf.cast(tf.shape(images)[1], tf.float32)
+
+    def uniform():
+        return tf.random.uniform((batch, 1), -1.0, 1.0)
+
+    angle = uniform() * augment_config["rotation"] * 2 * np.pi
+    scale = 1.0 + uniform() * augment_config["zoom"]
+    tx = uniform() * augment_config["translation"] * size
+    ty = uniform() * augment_config["translation"] * size
+    cos, sin = tf.cos(angle) * scale, tf.sin(angle) * scale
+    c = size / 2
+    # Forward matrix (source pixel -> output pixel), as augment_cache._affine
+    ox = c - cos * c + sin * c + tx
+    oy = c - sin * c - cos * c + ty
+
+    cx, cy, w, h = tf.unstack(boxes * size, axis=-1)
+    xs = tf.stack([cx - w / 2, cx + w / 2, cx - w / 2, cx + w / 2], axis=-1)
+    ys = tf.stack([cy - h / 2, cy - h / 2, cy + h / 2, cy + h / 2], axis=-1)
+    px, py = cos * xs - sin * ys + ox, sin * xs + cos * ys + oy
+    x0, x1 = tf.reduce_min(px, axis=-1), tf.reduce_max(px, axis=-1)
+    y0, y1 = tf.reduce_min(py, axis=-1), tf.reduce_max(py, axis=-1)
+    full = tf.maximum((x1 - x0) * (y1 - y0), 1e-6)
+    x0, x1 = tf.clip_by_value(x0, 0.0, size), tf.clip_by_value(x1, 0.0, size)
+    y0, y1 = tf.clip_by_value(y0, 0.0, size), tf.clip_by_value(y1, 0.0, size)
+    keep = (x1 - x0) * (y1 - y0) / full >= augment_config["min_visible"]
+    moved = tf.stack([(x0 + x1) / 2, (y0 + y1) / 2, x1 - x0, y1 - y0], axis=-1) / size
+    boxes = tf.where(keep[:, tf.newaxis], moved, boxes)
+
+    # The projective transform op maps output pixels to source pixels: invert the similarity
+    det = cos * cos + sin * sin
+    ia, ib = cos / det, sin / det
+    inverse = tf.concat([ia, ib, -(ia * ox + ib * oy), -ib, ia, -(-ib * ox + ia * oy),
+                         tf.zeros_like(ia), tf.zeros_like(ia)], axis=-1)
+    identity = tf.constant([[1, 0, 0, 0, 1, 0, 0, 0]], tf.float32)
+    transforms = tf.where(keep[:, tf.newaxis], inverse, identity)
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=tf.shape(images)[1:3],
+        fill_value=0.0, interpolation="BILINEAR", fill_mode="CONSTANT")
+    return images, boxes
+
+
+def make_targets(numbers, boxes, config):
+    """
+    🎯 Encodes one ground-truth box per image into the model's fixed-slot outputs:
+    slot 0 holds the box, confidence 1 and a one-hot class; the other slots are empty.
+    The grid head (config["head"] == "grid") uses the cell holding the box center instead.
+    """
+    if config.get("head") == "grid":
+        from grid_head import make_grid_targets
+
+        return make_grid_targets(numbers, boxes, config)
+    max_det = config["max_detections"]
+    slot = tf.one_hot(0, max_det)  # (max_det,)
+    confidence = tf.tile(slot[tf.newaxis, :], [tf.shape(numbers)[0], 1])
+    box_targets = confidence[:, :, tf.newaxis] * boxes[:, tf.newaxis, :]
+    class_targets = confidence[:, :, tf.newaxis] * tf.one_hot(numbers, config["num_classes"])[:, tf.newaxis, :]
+    return {"boxes": box_targets, "confidence": confidence, "classes": class_targets}
+
+
+def build_dataset(config, split="train", data_dir=None, shards_dir=None, augmentation=None,
+                  cache_dir=None, parallel=True, prefetch=True, shuffle=True, val_fraction=0.2, limit=None,
+                  augmented_dir=None, variants=8, balance_temperature=None, seed=0, sampler_hook=None):
+    """
+    🚀 Builds the training/validation tf.data pipeline.
+
+    config        MODEL_CONFIG from training_config.py
+    data_dir      directory with annotations/ and images/ (loose files), or
+    shards_dir    packed shards root (contains train/ and val/)
+    augmentation  Keras Sequential (photometric) applied to whole batches after
+                  random_affine, which moves the boxes with the pixels (training only)
+    cache_dir     decoded images are cached to a file here after the first epoch
+    limit         only use the first N samples (benchmarks, smoke tests)
+    augmented_dir pre-rendered variants from augment_cache.py; the train split reads
+                  one random cached variant per sample instead of augmenting online
+    balance_temperature
+                  train split draws class- and condition-balanced samples with
+                  replacement (balanced_sampler.py) instead of one uniform pass;
+                  the file cache is skipped since every epoch is a different draw;
+                  not combinable with augmented_dir
+    sampler_hook  called with the BalancedSampler once built (e.g. to restore or
+                  checkpoint its position, see training_orchestration.py)
+    """
+    input_size = config["input_size"]
+    num_parallel = AUTOTUNE if parallel else None
+    pre_rendered = bool(augmented_dir) and split == "train"
+    balanced = bool(balance_temperature) and split == "train"
+    if pre_rendered and balanced:
+        raise ValueError("augmented_dir and balance_temperature can't be combined: "
+                         "the augmentation store is read uniformly")
+    sampler = None
+
+    if pre_rendered:
+        from augment_cache import AugmentationStore, to_tf_dataset
+
+        store = AugmentationStore.open(augmented_dir)
+        if store.input_size != input_size:
+            raise ValueError(f"{augmented_dir} holds {store.input_size}px variants, model expects {input_size}px")
+        ds = to_tf_dataset(store, variants)
+        logger.info(f"🎲 {split}: {len(store)} cached variants from {augmented_dir}")
+        if limit:
+            ds = ds.take(limit)
+        # Variants are already augmented and memory-mapped: no file cache, no online augmentation
+        cache_dir, augmentation = None, None
+    elif shards_dir:
+        from jersey_shards import INDEX_FILE, to_tf_dataset
+
+        if balanced:
+            from balanced_sampler import BalancedSampler
+
+            sampler = BalancedSampler.from_shards(Path(shards_dir) / split, temperature=balance_temperature,
+                                                  epoch_size=limit, seed=seed)
+        ds = to_tf_dataset(Path(shards_dir) / split, sampler)
+        index_stat = (Path(shards_dir) / split / INDEX_FILE).stat()
+        fingerprint = f"{index_stat.st_size}:{index_stat.st_mtime_ns}"
+    else:
+        data_dir = Path(data_dir)
+        keys = [] if balanced else None
+        paths, numbers, boxes = load_records(data_dir / "annotations", data_dir / "images", split, val_fraction,
+                                             keys)
+        logger.info(f"📊 {split}: {len(paths)} samples from {data_dir}")
+        if balanced:
+            from balanced_sampler import BalancedSampler, sample_id_dataset
+
+            sampler = BalancedSampler(keys, temperature=balance_temperature, epoch_size=limit, seed=seed)
+            records = tuple(tf.constant(array) for array in (paths, numbers, boxes))
+            ds = sample_id_dataset(sampler).map(lambda i: tuple(tf.gather(array, i) for array in records))
+        else:
+            ds = tf.data.Dataset.from_tensor_slices((paths, numbers, boxes))
+        fingerprint = "\n".join(paths.tolist())
+
+    if sampler is not None:
+        if sampler_hook:
+            sampler_hook(sampler)
+        logger.info(f"⚖️ {split}: balanced sampling {json.dumps(sampler.report())}")
+        # Every epoch is a fresh draw, so a file cache would freeze the first one
+        cache_dir, shuffle = None, False
+
+    if not pre_rendered:
+        if limit and sampler is None:
+            ds = ds.take(limit)
+
+        if not shards_dir:
+            ds = ds.map(lambda path, number, box: (tf.io.read_file(path), number, box),
+                        num_parallel_calls=num_parallel)
+
+        ds = ds.map(lambda encoded, number, box: (decode_image(encoded, input_size), number, box),
+                    num_parallel_calls=num_parallel, deterministic=False)
+
+    if cache_dir:
+        # tf.data never invalidates a cache file, so key it on the sample list
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        source = "shards" if shards_dir else "files"
+        key = zlib.crc32(f"{fingerprint}|{limit}".encode("utf-8"))
+        ds = ds.cache(str(Path(cache_dir) / f"{split}_{source}_{input_size}_{key:08x}"))
+
+    if shuffle and split == "train":
+        ds = ds.shuffle(buffer_size=1024, reshuffle_each_iteration=True)
+
+    ds = ds.batch(config["batch_size"], drop_remainder=split == "train")
+    ds = ds.map(lambda images, numbers, boxes: (tf.cast(images, tf.float32), numbers, boxes),
+                num_parallel_calls=num_parallel)
+
+    if augmentation is not None and split == "train":
+        # One call per batch instead of per image keeps the Python/graph overhead down.
+        # Geometry goes through random_affine so the boxes follow the jersey.
+        def augment(images, numbers, boxes):
+            images, boxes = random_affine(images, boxes)
+            return augmentation(images, training=True), numbers, boxes
+
+        ds = ds.map(augment, num_parallel_calls=num_parallel)
+
+    ds = ds.map(lambda images, numbers, boxes: (images, make_targets(numbers, boxes, config)),
+                num_parallel_calls=num_parallel)
+
+    if prefetch:
+        ds = ds.prefetch(AUTOTUNE)
+    return ds
+
+
+def benchmark_loader(config, data_dir=None, shards_dir=None, cache_dir=None, batches=50):
+    """
+    ⏱️ Measures samples/sec for each stage switched on/off.
+    Every configuration gets one untimed warm-up pass (which also fills the cache)
+    before the timed pass. The sample count is capped before the cache stage, so
+    the cache is always read to completion and actually gets written.
+    """
+    from train_jersey_detector import create_data_augmentation
+
+    augmentation = create_data_augmentation()
+    variants = [
+        ("baseline", dict(parallel=False, prefetch=False, cache=False, augment=False)),
+        ("+parallel", dict(parallel=True, prefetch=False, cache=False, augment=False)),
+        ("+prefetch", dict(parallel=True, prefetch=True, cache=False, augment=False)),
+        ("+cache", dict(parallel=True, prefetch=True, cache=True, augment=False)),
+        ("+augment", dict(parallel=True, prefetch=True, cache=True, augment=True)),
+        ("augment, no cache", dict(parallel=True, prefetch=True, cache=False, augment=True)),
+    ]
+
+    results = []
+    for name, opts in variants:
+        ds = build_dataset(
+            config, "train", data_dir=data_dir, shards_dir=shards_dir,
+            augmentation=augmentation if opts["augment"] else None,
+            cache_dir=Path(cache_dir) / "benchmark" if opts["cache"] else None,
+            parallel=opts["parallel"], prefetch=opts["prefetch"],
+            limit=batches * config["batch_size"],
+        )
+
+        for _ in ds:  # warm-up
+            pass
+        samples = 0
+        started = time.perf_counter()
+        for images, _targets in ds:
+            samples += int(images.shape[0])
+        elapsed = time.perf_counter() - started
+        results.append({"variant": name, **opts, "samples": samples,
+                        "seconds": round(elapsed, 3),
+                        "samples_per_sec": round(samples / elapsed, 1) if elapsed > 0 else 0.0})
+        logger.info(f"⏱️ {name:<18} {results[-1]['samples_per_sec']:>8} samples/sec")
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from training_config import DATA_DIR, MODEL_CONFIG
+
+    parser = argparse.ArgumentParser(description='⏱️ Benchmark the tf.data input pipeline')
+    parser.add_argument('--data-path', default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', help='Packed shards root (overrides --data-path)')
+    parser.add_argument('--cache-dir', default=str(DATA_DIR / "cache"), help='Decoded-image cache directory')
+    parser.add_argument('--batches', type=int, default=50, help='Batches per timed pass')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = benchmark_loader(MODEL_CONFIG, args.data_path, args.shards, args.cache_dir, args.batches)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
+
+
+if __name__ == '__main__':
+    main()
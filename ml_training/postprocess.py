@@ -0,0 +1,248 @@
+"""
+🧹 Batched Detection Post-processing
+
+Turns raw detector output into final detections for whole batches at once,
+entirely in NumPy: confidence filtering, class argmax and class-aware NMS
+driven by vectorized IoU matrices. Shared by evaluation, pseudo-labeling and
+benchmarking so offline runs over thousands of frames don't pay a Python loop
+per box pair.
+
+Supported outputs:
+- Keras detector (train_jersey_detector.py): boxes (B, D, 4) as YOLO
+  center_x/center_y/width/height, confidence (B, D), classes (B, D, C)
+- Ultralytics YOLOv8 export: (B, 4 + C, N) or (B, N, 4 + C)
+
+Detections come back as flat arrays sorted by image, then score:
+    {"image": (M,), "boxes": (M, 4) normalized x1/y1/x2/y2, "scores": (M,), "classes": (M,)}
+
+Micro-benchmark against a per-pair loop (like NumberLocator.locate):
+    python postprocess.py --batch 256
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from training_config import MODEL_CONFIG
+
+# Cap on candidates per image that go into NMS (dense YOLO heads emit thousands)
+MAX_CANDIDATES = 300
+
+
+def xywh_to_xyxy(boxes):
+    half = boxes[..., 2:4] / 2
+    return np.concatenate([boxes[..., 0:2] - half, boxes[..., 0:2] + half], axis=-1)
+
+
+def box_area(boxes):
+    return np.clip(boxes[..., 2] - boxes[..., 0], 0, None) * np.clip(boxes[..., 3] - boxes[..., 1], 0, None)
+
+
+def box_iou(a, b):
+    """
+    Pairwise IoU of x1/y1/x2/y2 boxes with broadcasting over leading dims:
+    (..., N, 4) x (..., M, 4) -> (..., N, M)
+    """
+    top_left = np.maximum(a[..., :, None, :2], b[..., None, :, :2])
+    bottom_right = np.minimum(a[..., :, None, 2:], b[..., None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=-1)
+    union = box_area(a)[..., :, None] + box_area(b)[..., None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-12), 0.0)
+
+
+def batched_nms(boxes, scores, classes, valid, iou_threshold, max_detections):
+    """
+    🎯 Greedy class-aware NMS for a padded batch.
+
+    boxes (B, K, 4) xyxy, scores (B, K), classes (B, K), valid (B, K) bool.
+    Candidates are sorted by score, then one IoU matrix per image is computed
+    up front; the greedy pass loops over the K slots (not over images or box
+    pairs), suppressing with a vectorized row of the matrix at each step.
+    Returns a (B, K) keep mask in the original candidate order.
+    """
+    batch, k = scores.shape
+    order = np.argsort(-np.where(valid, scores, -np.inf), axis=1, kind="stable")
+    rows = np.arange(batch)[:, None]
+    boxes_s, classes_s, valid_s = boxes[rows, order], classes[rows, order], valid[rows, order]
+
+    iou = box_iou(boxes_s, boxes_s)
+    overlap = (iou > iou_threshold) & (classes_s[:, :, None] == classes_s[:, None, :])
+
+    keep_s = np.zeros((batch, k), dtype=bool)
+    suppressed = ~valid_s
+    kept_count = np.zeros(batch, dtype=np.int32)
+    for i in range(k):
+        take = ~suppressed[:, i] & (kept_count < max_detections)
+        if take.any():
+            keep_s[:, i] = take
+            kept_count += take
+            suppressed |= take[:, None] & overlap[:, i, :]
+        # Stop once every image is full or has no candidates left
+        if ((kept_count >= max_detections) | suppressed[:, i + 1:].all(axis=1)).all():
+            break
+
+    keep = np.zeros_like(keep_s)
+    keep[rows, order] = keep_s
+    return keep
+
+
+def _flatten(boxes, scores, classes, keep):
+    image_idx, slot = np.nonzero(keep)
+    result = {
+        "image": image_idx.astype(np.int32),
+        "boxes": boxes[image_idx, slot].astype(np.float32),
+        "scores": scores[image_idx, slot].astype(np.float32),
+        "classes": classes[image_idx, slot].astype(np.int32),
+    }
+    # Sort by image, then descending score
+    order = np.lexsort((-result["scores"], result["image"]))
+    return {key: value[order] for key, value in result.items()}
+
+
+def _top_candidates(boxes, scores, classes, max_candidates):
+    """Keeps the best max_candidates per image so NMS stays O(K^2) with small K"""
+    if scores.shape[1] <= max_candidates:
+        return boxes, scores, classes
+    top = np.argpartition(-scores, max_candidates - 1, axis=1)[:, :max_candidates]
+    rows = np.arange(scores.shape[0])[:, None]
+    return boxes[rows, top], scores[rows, top], classes[rows, top]
+
+
+def decode_batch(boxes, confidence, classes, confidence_threshold=MODEL_CONFIG["confidence_threshold"],
+                 nms_threshold=MODEL_CONFIG["nms_threshold"], max_detections=MODEL_CONFIG["max_detections"]):
+    """
+    🚀 Decodes a batch of Keras detector outputs.
+    Score = slot confidence x best class probability; slots below the confidence
+    threshold are dropped before NMS.
+    """
+    boxes = xywh_to_xyxy(np.asarray(boxes, dtype=np.float32))
+    classes = np.asarray(classes, dtype=np.float32)
+    class_ids = classes.argmax(axis=-1)
+    scores = np.asarray(confidence, dtype=np.float32) * classes.max(axis=-1)
+
+    valid = scores >= confidence_threshold
+    keep = batched_nms(boxes, scores, class_ids, valid, nms_threshold, max_detections)
+    return _flatten(boxes, scores, class_ids, keep)
+
+
+def decode_yolov8_batch(output, confidence_threshold=MODEL_CONFIG["confidence_threshold"],
+                        nms_threshold=MODEL_CONFIG["nms_threshold"], max_detections=MODEL_CONFIG["max_detections"],
+                        image_size=None, max_candidates=MAX_CANDIDATES):
+    """
+    🚀 Decodes a batch of ultralytics YOLOv8 exported output ((B, 4 + C, N) or (B, N, 4 + C)).
+    Boxes are center x/y, width, height; pass image_size if they're in pixels
+    so results come back normalized like decode_batch.
+    """
+    output = np.asarray(output, dtype=np.float32)
+    if output.shape[1] < output.shape[2]:
+        output = output.transpose(0, 2, 1)  # -> (B, N, 4 + C)
+
+    boxes = output[..., :4]
+    if image_size:
+        boxes = boxes / float(image_size)
+    class_scores = output[..., 4:]
+    class_ids = class_scores.argmax(axis=-1)
+    scores = class_scores.max(axis=-1)
+
+    boxes, scores, class_ids = _top_candidates(boxes, scores, class_ids, max_candidates)
+    boxes = xywh_to_xyxy(boxes)
+    valid = scores >= confidence_threshold
+    keep = batched_nms(boxes, scores, class_ids, valid, nms_threshold, max_detections)
+    return _flatten(boxes, scores, class_ids, keep)
+
+
+def split_by_image(detections, batch_size):
+    """Per-image views of flat detections: list of dicts, one per image in the batch"""
+    bounds = np.searchsorted(detections["image"], np.arange(batch_size + 1))
+    return [{key: value[bounds[i]:bounds[i + 1]] for key, value in detections.items() if key != "image"}
+            for i in range(batch_size)]
+
+
+def _decode_reference(boxes, confidence, classes, confidence_threshold, nms_threshold, max_detections):
+    """Per-image, per-pair loop equivalent of decode_batch (benchmark baseline)"""
+    def iou(a, b):
+        x_a, y_a = max(a[0], b[0]), max(a[1], b[1])
+        x_b, y_b = min(a[2], b[2]), min(a[3], b[3])
+        inter = max(0.0, x_b - x_a) * max(0.0, y_b - y_a)
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return 0.0 if union <= 0 else inter / union
+
+    results = []
+    for image in range(len(boxes)):
+        candidates = []
+        for slot in range(len(boxes[image])):
+            cls = int(np.argmax(classes[image][slot]))
+            score = float(confidence[image][slot] * classes[image][slot][cls])
+            if score >= confidence_threshold:
+                cx, cy, w, h = boxes[image][slot]
+                candidates.append((score, cls, (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)))
+        candidates.sort(key=lambda c: -c[0])
+        kept = []
+        for candidate in candidates:
+            if len(kept) >= max_detections:
+                break
+            if all(k[1] != candidate[1] or iou(k[2], candidate[2]) <= nms_threshold for k in kept):
+                kept.append(candidate)
+        results.append(kept)
+    return results
+
+
+def _same_detections(detections, reference, atol=1e-5):
+    """True if decode_batch output holds the reference's boxes, scores and classes (float32 vs float64)"""
+    expected = np.array([(image, score, cls, *box) for image, kept in enumerate(reference) for score, cls, box in kept],
+                        dtype=np.float64).reshape(-1, 7)
+    actual = np.column_stack([detections["image"], detections["scores"], detections["classes"],
+                              detections["boxes"]]).astype(np.float64)
+    if actual.shape != expected.shape:
+        return False
+
+    def ordered(rows):
+        # image, then class, then score: the same order for both however ties were broken
+        return rows[np.lexsort((rows[:, 1], rows[:, 2], rows[:, 0]))]
+
+    return bool(np.allclose(ordered(actual), ordered(expected), atol=atol))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🧹 Benchmark batched post-processing vs a per-pair loop')
+    parser.add_argument('--batch', type=int, default=256, help='Images per batch')
+    parser.add_argument('--slots', type=int, default=MODEL_CONFIG["max_detections"], help='Detection slots per image')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed repetitions')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    num_classes = MODEL_CONFIG["num_classes"]
+    boxes = np.concatenate([rng.uniform(0.2, 0.8, (args.batch, args.slots, 2)),
+                            rng.uniform(0.05, 0.3, (args.batch, args.slots, 2))], axis=-1)
+    confidence = rng.uniform(0.5, 1.0, (args.batch, args.slots))
+    logits = rng.normal(0, 3, (args.batch, args.slots, num_classes))
+    classes = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+    # Low threshold so NMS has real work to do
+    params = dict(confidence_threshold=0.05, nms_threshold=MODEL_CONFIG["nms_threshold"],
+                  max_detections=MODEL_CONFIG["max_detections"])
+
+    def timed(fn):
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            result = fn()
+        return (time.perf_counter() - started) / args.repeats, result
+
+    vectorized_s, detections = timed(lambda: decode_batch(boxes, confidence, classes, **params))
+    reference_s, reference = timed(lambda: _decode_reference(boxes, confidence, classes, **params))
+
+    print(json.dumps({
+        "batch": args.batch,
+        "slots": args.slots,
+        "vectorized_ms": round(vectorized_s * 1000, 3),
+        "reference_ms": round(reference_s * 1000, 3),
+        "speedup": round(reference_s / vectorized_s, 1),
+        "images_per_sec": round(args.batch / vectorized_s, 1),
+        "detections": int(len(detections["scores"])),
+        "same_detections": _same_detections(detections, reference),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
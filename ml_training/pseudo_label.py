@@ -0,0 +1,351 @@
+"""
+🏷️ Batched Pseudo-Labeling and Review Queue
+
+Runs an exported detector (.tflite or .onnx) over unlabeled images on the host
+and splits them three ways:
+
+- confident: every detection scores >= MODEL_CONFIG["confidence_threshold"] and
+  beats any overlapping detection of another number by --min-margin. Written as
+  JerseyAnnotation JSON (capture_mode "auto", detection_source "custom",
+  confidence = score) next to the app's own annotations.
+- uncertain: anything else scoring above --review-floor. Goes to a review queue
+  ranked by margin (top score minus best competing number at the same spot),
+  lowest margin first, so reviewers label the most informative images first.
+- empty: nothing above --review-floor.
+
+Images are decoded (JPEG draft mode, straight to model resolution) and run in a
+pool of interpreter workers, one thread each, in chunks; workers only send back
+the top detections. Raw detections are cached per image in
+<output>/.pseudo_label_state.jsonl keyed by (size, mtime, model hash), so a
+re-run only infers new or changed images, and changing thresholds re-decides
+from the cache without running the model. Images that already have a manual
+(or other non-pseudo) annotation are skipped.
+
+Usage:
+    python pseudo_label.py --model models/matrix/best_416_int8.tflite --images ./data/images
+    python pseudo_label.py --model best.onnx --images ./unlabeled --annotations ./data/annotations --min-margin 0.3
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from evaluate_model import _chunks, make_runner
+from jersey_annotations import CAPTURE_METADATA_DEFAULTS, iter_annotation_files, load_annotation
+from postprocess import box_iou, split_by_image
+from training_config import ANNOTATIONS_DIR, DATA_DIR, IMAGES_DIR, MODEL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = ".pseudo_label_state.jsonl"
+QUEUE_NAME = "review_queue.json"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CHUNK_SIZE = 64
+# Decode far below the labeling threshold so competing numbers are still visible
+DECODE_CONFIDENCE = 0.05
+COMPETING_IOU = 0.5
+DEFAULT_MIN_MARGIN = 0.2
+DEFAULT_REVIEW_FLOOR = 0.1
+AUTO_SUFFIX = "_auto_"
+
+
+# 🔍 Inference -------------------------------------------------------------
+
+def model_hash(model_path):
+    """Short content hash; a re-exported model invalidates the cached detections"""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def load_for_model(path, width, height):
+    """(pixels, original size). JPEG draft mode decodes at reduced scale, which is most of the speedup"""
+    with Image.open(path) as img:
+        size = img.size
+        img.draft("RGB", (width, height))
+        pixels = np.asarray(img.convert("RGB").resize((width, height), Image.Resampling.BILINEAR),
+                            dtype=np.float32)
+    return pixels, size
+
+
+_worker_runner = None
+
+
+def _init_worker(model_path, decode_args):
+    global _worker_runner
+    _worker_runner = make_runner(model_path, 1, **decode_args)
+
+
+def _label_chunk(chunk):
+    """Worker entry point: [(name, path, stat_key)] -> per-image records with raw detections"""
+    runner = _worker_runner
+    images, records = [], []
+    for name, path, stat_key in chunk:
+        try:
+            pixels, (width, height) = load_for_model(path, runner.width, runner.height)
+        except (OSError, ValueError) as e:
+            records.append({"image": name, "stat": stat_key, "error": str(e)})
+            continue
+        images.append(pixels)
+        records.append({"image": name, "stat": stat_key, "width": width, "height": height})
+
+    decoded = [r for r in records if "error" not in r]
+    if images:
+        for record, detections in zip(decoded, split_by_image(runner.predict(images), len(images))):
+            record["detections"] = [
+                [round(float(v), 5) for v in box] + [round(float(score), 4), int(number)]
+                for box, score, number in zip(detections["boxes"], detections["scores"], detections["classes"])
+            ]
+    return records
+
+
+# ⚖️ Decisions -------------------------------------------------------------
+
+def detection_margins(detections):
+    """
+    Per detection: its score minus the best score of a different number overlapping
+    it (IoU >= COMPETING_IOU), or minus 0 if there is none. NMS is class-aware, so
+    a number the model hesitated over survives as such an overlapping detection.
+    """
+    if not detections:
+        return np.zeros(0, dtype=np.float32)
+    detections = np.asarray(detections, dtype=np.float32)
+    boxes, scores, numbers = detections[:, :4], detections[:, 4], detections[:, 5].astype(np.int32)
+    competing = (box_iou(boxes, boxes) >= COMPETING_IOU) & (numbers[:, None] != numbers[None, :])
+    best_other = np.where(competing, scores[None, :], 0.0).max(axis=1)
+    return scores - best_other
+
+
+def decide(record, confidence_threshold=MODEL_CONFIG["confidence_threshold"],
+           min_margin=DEFAULT_MIN_MARGIN, review_floor=DEFAULT_REVIEW_FLOOR):
+    """
+    (status, detections to write, margin): status is "confident", "uncertain" or "empty".
+    Only the winner of each overlapping group counts; a competing number shows up
+    as that winner's small margin. An image is pseudo-labeled only when all of its
+    winners are confident, so a half-labeled image never trains a miss as background.
+    """
+    detections = record["detections"]
+    margins = detection_margins(detections)
+    winners = [(d, m) for d, m in zip(detections, margins) if m >= 0 and d[4] >= review_floor]
+    if not winners:
+        return "empty", None, None
+    margin = float(min(m for _d, m in winners))
+    if all(d[4] >= confidence_threshold and m >= min_margin for d, m in winners):
+        return "confident", [d for d, _m in winners], margin
+    return "uncertain", None, margin
+
+
+def to_annotation(record, detection):
+    """A JerseyAnnotation dict (pixel-space BoundingBox) for one detection"""
+    width, height = record["width"], record["height"]
+    x0, y0, x1, y1 = np.clip(detection[:4], 0.0, 1.0)
+    return {
+        "image_path": record["image"],
+        "image_width": width,
+        "image_height": height,
+        "jersey_number": int(detection[5]),
+        "bounding_box": {"x": round(float(x0) * width, 2), "y": round(float(y0) * height, 2),
+                         "width": round(float(x1 - x0) * width, 2), "height": round(float(y1 - y0) * height, 2)},
+        "metadata": {**CAPTURE_METADATA_DEFAULTS, "capture_mode": "auto", "confidence": float(detection[4]),
+                     "detection_source": "custom"},
+        "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3],
+    }
+
+
+# 💾 State -----------------------------------------------------------------
+
+def load_state(state_path):
+    """{image name: record}; later lines win, unreadable lines are ignored"""
+    state = {}
+    if not state_path.exists():
+        return state
+    with open(state_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                state[record["image"]] = record
+            except (ValueError, KeyError):
+                continue
+    return state
+
+
+def save_state(state_path, records):
+    """Rewrites the state with only the current images, so deleted images drop out"""
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, state_path)
+
+
+def _scan_images(images_dir):
+    """{name: (path, [size, mtime_ns])}"""
+    images = {}
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                stat = entry.stat()
+                images[entry.name] = (entry.path, [stat.st_size, stat.st_mtime_ns])
+    return images
+
+
+def _annotated_images(annotations_dir):
+    """Image names that already have an annotation this tool didn't write"""
+    annotated = set()
+    if not annotations_dir.is_dir():
+        return annotated
+    for annotation_file in iter_annotation_files(annotations_dir):
+        if AUTO_SUFFIX in annotation_file.stem:
+            continue
+        try:
+            annotated.add(Path(load_annotation(annotation_file)["image_path"]).name)
+        except (OSError, ValueError, KeyError):
+            continue
+    return annotated
+
+
+def _write_annotations(annotations_dir, record, detections):
+    """Replaces the image's previous pseudo-labels; returns the file names written"""
+    for name in record.get("files", []):
+        (annotations_dir / name).unlink(missing_ok=True)
+    files = []
+    for k, detection in enumerate(detections or []):
+        name = f"{Path(record['image']).stem}{AUTO_SUFFIX}{k}.json"
+        tmp_path = annotations_dir / (name + ".tmp")
+        tmp_path.write_text(json.dumps(to_annotation(record, detection), indent=2))
+        os.replace(tmp_path, annotations_dir / name)
+        files.append(name)
+    return files
+
+
+# 🚀 Pipeline --------------------------------------------------------------
+
+def pseudo_label(model_path, images_dir=IMAGES_DIR, annotations_dir=ANNOTATIONS_DIR,
+                 output_dir=DATA_DIR / "pseudo_labels", workers=None,
+                 confidence_threshold=MODEL_CONFIG["confidence_threshold"], min_margin=DEFAULT_MIN_MARGIN,
+                 review_floor=DEFAULT_REVIEW_FLOOR, chunk_size=CHUNK_SIZE):
+    """🏷️ Infers new/changed images, writes confident pseudo-labels and the ranked review queue"""
+    images_dir, annotations_dir, output_dir = Path(images_dir), Path(annotations_dir), Path(output_dir)
+    annotations_dir.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state_path = output_dir / STATE_NAME
+
+    model = model_hash(model_path)
+    decision_key = [confidence_threshold, min_margin, review_floor]
+    images = _scan_images(images_dir)
+    annotated = _annotated_images(annotations_dir)
+    state = {name: record for name, record in load_state(state_path).items() if name in images}
+
+    todo = [(name, path, stat_key) for name, (path, stat_key) in sorted(images.items())
+            if name not in annotated
+            and not (name in state and state[name].get("model") == model and state[name]["stat"] == stat_key)]
+    logger.info(f"🏷️ {len(images)} images: {len(annotated & images.keys())} already annotated, "
+                f"{len(todo)} to infer, {len(state)} cached")
+
+    started = time.perf_counter()
+    failures = []
+    decode_args = {"confidence_threshold": DECODE_CONFIDENCE, "nms_threshold": MODEL_CONFIG["nms_threshold"],
+                   "max_detections": MODEL_CONFIG["max_detections"]}
+
+    def collect(records):
+        with open(state_path, "a", encoding="utf-8") as f:
+            for record in records:
+                if "error" in record:
+                    failures.append({"image": record["image"], "error": record["error"]})
+                    continue
+                record["model"] = model
+                previous = state.get(record["image"])
+                if previous:
+                    record["files"] = previous.get("files", [])
+                state[record["image"]] = record
+                # Appended as they arrive, so an interrupted run keeps what it inferred
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    if todo:
+        workers = max(1, workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(str(model_path), decode_args)) as executor:
+            in_flight = set()
+            for chunk in _chunks(todo, chunk_size):
+                in_flight.add(executor.submit(_label_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+            for future in wait(in_flight).done:
+                collect(future.result())
+    inferred = len(todo) - len(failures)
+    elapsed = time.perf_counter() - started
+
+    counts = {"confident": 0, "uncertain": 0, "empty": 0, "annotated": 0}
+    queue = []
+    for name, record in state.items():
+        if name in annotated:
+            # Labeled by a person since the last run: their annotation wins
+            _write_annotations(annotations_dir, record, None)
+            record["files"], record["status"] = [], "annotated"
+            counts["annotated"] += 1
+            continue
+        if record.get("decision") != decision_key or record.get("status") in (None, "annotated"):
+            status, detections, margin = decide(record, confidence_threshold, min_margin, review_floor)
+            record["files"] = _write_annotations(annotations_dir, record, detections)
+            record.update({"status": status, "margin": margin, "decision": decision_key})
+        counts[record["status"]] += 1
+        if record["status"] == "uncertain":
+            top = max(record["detections"], key=lambda d: d[4])
+            queue.append({"image": name, "margin": round(record["margin"], 4), "top_score": top[4],
+                          "top_number": top[5], "detections": record["detections"]})
+    save_state(state_path, state.values())
+
+    queue.sort(key=lambda entry: (entry["margin"], entry["top_score"]))
+    report = {
+        "model": str(model_path),
+        "images": len(images),
+        "inferred": inferred,
+        "wall_time_s": round(elapsed, 3),
+        "images_per_min": round(inferred / elapsed * 60, 1) if inferred and elapsed > 0 else None,
+        "counts": counts,
+        "failed_images": failures,
+        "review_queue": str(output_dir / QUEUE_NAME),
+    }
+    with open(output_dir / QUEUE_NAME, "w", encoding="utf-8") as f:
+        json.dump({"images_dir": str(images_dir), "queue": queue}, f, indent=2)
+    return report
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🏷️ Pseudo-label unlabeled images and rank the rest for review')
+    parser.add_argument('--model', required=True, help='Exported .tflite or .onnx detector')
+    parser.add_argument('--images', default=str(IMAGES_DIR), help='Directory of (mostly unlabeled) images')
+    parser.add_argument('--annotations', default=str(ANNOTATIONS_DIR), help='Where pseudo-label JSON is written')
+    parser.add_argument('--output-dir', default=str(DATA_DIR / "pseudo_labels"), help='State and review queue')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Interpreter worker processes')
+    parser.add_argument('--conf', type=float, default=MODEL_CONFIG["confidence_threshold"],
+                        help='Minimum score for a pseudo-label')
+    parser.add_argument('--min-margin', type=float, default=DEFAULT_MIN_MARGIN,
+                        help='Minimum lead over a competing number at the same spot')
+    parser.add_argument('--review-floor', type=float, default=DEFAULT_REVIEW_FLOOR,
+                        help='Detections below this score are ignored (image counts as empty)')
+    args = parser.parse_args()
+
+    report = pseudo_label(args.model, args.images, args.annotations, args.output_dir, args.workers,
+                          args.conf, args.min_margin, args.review_floor)
+    logger.info(f"📊 {report['counts']}  ⏱️ {report['inferred']} images in {report['wall_time_s']}s "
+                f"({report['images_per_min']} images/min)")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,7 @@ pip install -r requirements.txt
 
 REM Initialize training directories
 echo 📁 Creating training directories...
-python train_jersey_detector.py
+python jersey_cli.py setup-dirs
 
 echo ✅ Setup complete!
 echo.
@@ -0,0 +1,116 @@
+"""
+📦 Ultralytics integration for packed jersey shards
+
+Lets the YOLOv8 trainer read images and labels straight from the shards built
+by jersey_shards.py instead of loose files. Used by
+train_jersey_detector_enhanced.py when it is run with --shards.
+"""
+
+import math
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+
+from jersey_shards import ShardReader
+
+
+class ShardYOLODataset(YOLODataset):
+    """YOLODataset whose images and labels come from a ShardReader"""
+
+    def __init__(self, *args, **kwargs):
+        self.reader = ShardReader(kwargs["img_path"])
+        super().__init__(*args, **kwargs)
+
+    def get_img_files(self, img_path):
+        # Virtual names: only used for logging and plots
+        return [str(Path(img_path) / f"{sample_id:08d}.jpg") for sample_id in range(len(self.reader))]
+
+    def get_labels(self):
+        index = self.reader.index
+        labels = []
+        for sample_id, im_file in enumerate(self.im_files):
+            row = index[sample_id]
+            labels.append(dict(
+                im_file=im_file,
+                shape=(int(row["image_height"]), int(row["image_width"])),
+                cls=np.array([[row["jersey_number"]]], dtype=np.float32),
+                bboxes=np.array([row["bbox"]], dtype=np.float32),
+                segments=[],
+                keypoints=None,
+                normalized=True,
+                bbox_format="xywh",
+            ))
+        return labels
+
+    def check_cache_ram(self, safety_margin=0.5):
+        # The base implementation cv2.imread()s a sample of files, which don't exist here
+        import psutil
+
+        index = self.reader.index
+        scale = self.imgsz / np.maximum(index["image_width"], index["image_height"])
+        needed = float((index["image_width"] * index["image_height"] * 3 * scale ** 2).sum())
+        return needed * (1 + safety_margin) < psutil.virtual_memory().available
+
+    def load_image(self, i, rect_mode=True):
+        """Same contract as BaseDataset.load_image, decoding from the shard instead of disk"""
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        im = cv2.imdecode(np.frombuffer(self.reader.image_bytes(i), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if im is None:
+            raise FileNotFoundError(f"Shard sample {i} could not be decoded")
+
+        h0, w0 = im.shape[:2]
+        if rect_mode:  # resize long side to imgsz while maintaining aspect ratio
+            r = self.imgsz / max(h0, w0)
+            if r != 1:
+                w, h = (min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz))
+                im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        elif not (h0 == w0 == self.imgsz):  # resize by stretching image to square imgsz
+            im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+
+        # Add to buffer if training with augmentations
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, (h0, w0), im.shape[:2]
+
+
+def build_shard_dataset(cfg, img_path, batch, data, mode="train", rect=False, stride=32):
+    """Mirror of ultralytics.data.build_yolo_dataset for shard-backed splits"""
+    return ShardYOLODataset(
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == "train",
+        hyp=cfg,
+        rect=cfg.rect or rect,
+        cache=cfg.cache or None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == "train" else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == "train" else 1.0,
+    )
+
+
+class ShardDetectionTrainer(DetectionTrainer):
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_shard_dataset(self.args, img_path, batch, self.data, mode=mode, rect=mode == "val", stride=gs)
+
+
+class ShardDetectionValidator(DetectionValidator):
+    def build_dataset(self, img_path, mode="val", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_shard_dataset(self.args, img_path, batch, self.data, mode=mode, stride=gs)
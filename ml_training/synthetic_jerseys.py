@@ -0,0 +1,361 @@
+"""
+🎨 Host-side Synthetic Jersey Generator
+
+Renders the app's "enhanced positioning" training samples on a CPU box instead
+of tapping through SampleJerseyGenerator on a phone:
+
+- 640x480 camera view with grass / court / stadium / sand backgrounds
+- 9 player zones (center, top, bottom, both sidelines, four corners), same
+  placement math as getRealisticJerseyPosition in JerseyValidationScreen.kt
+- 80-250px jerseys (distance), fonts, outlined numbers, rotation (angle),
+  blur (difficulty) and brightness (lighting)
+
+Backgrounds and lighting are generated for a whole batch at once with NumPy;
+each worker process renders its own batches and writes them straight to disk
+as JerseyAnnotation JSON + YOLO labels, so the output drops into every other
+tool here (jersey_shards.py, dataset_validation.py, train_jersey_detector*.py).
+
+Usage:
+    python synthetic_jerseys.py --count 10000 --output data/synthetic
+    python synthetic_jerseys.py --count 200 --output /tmp/preview --seed 7 --workers 1
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from jersey_annotations import NUM_CLASSES, write_yolo_dataset_yaml, yolo_label_line
+
+logger = logging.getLogger(__name__)
+
+VIEW_WIDTH, VIEW_HEIGHT = 640, 480
+JERSEY_WIDTH_RANGE = (80, 250)
+JERSEY_ASPECT = 1.25  # height / width, like the app's 40x50 .. 100x125 jersey areas
+BATCH_SIZE = 32
+JPEG_QUALITY = 90
+
+# Player zones as (x range, y range) fractions of the free space, from getRealisticJerseyPosition
+ZONES = [
+    ((0.3, 0.7), (0.3, 0.7)),  # Center
+    ((0.2, 0.8), (0.1, 0.4)),  # Top (running toward camera)
+    ((0.2, 0.8), (0.6, 0.9)),  # Bottom (running away)
+    ((0.0, 0.3), (0.2, 0.8)),  # Left sideline
+    ((0.7, 1.0), (0.2, 0.8)),  # Right sideline
+    ((0.0, 0.3), (0.0, 0.3)),  # Corners
+    ((0.7, 1.0), (0.0, 0.3)),
+    ((0.0, 0.3), (0.7, 1.0)),
+    ((0.7, 1.0), (0.7, 1.0)),
+]
+
+BACKGROUNDS = {
+    "grass": [(34, 139, 34), (0, 100, 0)],
+    "court": [(139, 69, 19), (205, 133, 63)],
+    "stadium": [(105, 105, 105)],
+    "sand": [(245, 222, 179)],
+}
+
+JERSEY_COLORS = [
+    (0, 0, 255), (255, 0, 0), (0, 128, 0), (255, 255, 0), (0, 255, 255), (255, 0, 255), (0, 0, 0),
+    (255, 255, 255), (128, 128, 128), (255, 102, 0), (128, 0, 128), (139, 69, 19), (0, 100, 0), (139, 0, 0),
+]
+
+# Number fill / outline colors, like the app's number variations (None = contrasting)
+VARIATIONS = {
+    "white_numbers": ((255, 255, 255), None),
+    "black_numbers": ((0, 0, 0), None),
+    "gold_numbers": ((255, 215, 0), None),
+    "red_numbers": ((220, 20, 60), None),
+    "contrasting": (None, None),
+    "white_black_outlined": ((255, 255, 255), (0, 0, 0)),
+    "gold_black_outlined": ((255, 215, 0), (0, 0, 0)),
+    "blue_white_outlined": ((0, 0, 205), (255, 255, 255)),
+    "red_white_outlined": ((220, 20, 60), (255, 255, 255)),
+    "yellow_black_outlined": ((255, 255, 0), (0, 0, 0)),
+}
+
+DIFFICULTY_BLUR = {"easy": 0.0, "medium": 0.6, "hard": 1.2, "very_hard": 2.0}
+LIGHTING_GAIN = {"bright": (1.15, 1.35), "normal": (0.9, 1.1), "dark": (0.45, 0.7)}
+ANGLE_ROTATION = {"front": 4.0, "angled": 20.0, "side": 8.0}
+
+FONT_CANDIDATES = [
+    "DejaVuSans-Bold.ttf", "DejaVuSerif-Bold.ttf", "DejaVuSansMono-Bold.ttf", "DejaVuSans.ttf",
+    "LiberationSans-Bold.ttf", "LiberationSerif-Bold.ttf", "arialbd.ttf", "arial.ttf", "impact.ttf",
+]
+GLYPH_SIZE = 96  # numbers are rendered once at this size and rescaled per sample
+
+_fonts = None
+_glyph_cache = {}
+
+
+def load_fonts():
+    """Every candidate font that can be loaded; PIL's built-in font as a last resort"""
+    global _fonts
+    if _fonts is None:
+        _fonts = []
+        for name in FONT_CANDIDATES:
+            try:
+                _fonts.append(ImageFont.truetype(name, GLYPH_SIZE))
+            except OSError:
+                continue
+        if not _fonts:
+            _fonts.append(ImageFont.load_default())
+    return _fonts
+
+
+def glyph_masks(text, font_index, stroke):
+    """(fill, outline) grayscale masks of text at GLYPH_SIZE, cached per worker"""
+    key = (text, font_index, stroke)
+    if key not in _glyph_cache:
+        font = load_fonts()[font_index]
+        pad = stroke + 4
+        left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox(
+            (0, 0), text, font=font, stroke_width=stroke)
+        size = (right - left + 2 * pad, bottom - top + 2 * pad)
+        origin = (pad - left, pad - top)
+
+        fill = Image.new("L", size)
+        ImageDraw.Draw(fill).text(origin, text, fill=255, font=font)
+        outline = Image.new("L", size)
+        if stroke:
+            ImageDraw.Draw(outline).text(origin, text, fill=255, font=font, stroke_width=stroke, stroke_fill=255)
+        _glyph_cache[key] = (fill, outline)
+    return _glyph_cache[key]
+
+
+def render_backgrounds(rng, kinds):
+    """
+    📐 (B, H, W, 3) float32 backgrounds for a whole batch: base color, mowing
+    stripes / wood planks, coarse blotches and fine sensor noise.
+    """
+    batch = len(kinds)
+    base = np.array([BACKGROUNDS[kind][rng.integers(len(BACKGROUNDS[kind]))] for kind in kinds], dtype=np.float32)
+    images = np.broadcast_to(base[:, None, None, :], (batch, VIEW_HEIGHT, VIEW_WIDTH, 3)).copy()
+
+    x = np.arange(VIEW_WIDTH, dtype=np.float32)
+    y = np.arange(VIEW_HEIGHT, dtype=np.float32)
+    grass = np.array([kind == "grass" for kind in kinds])
+    court = np.array([kind == "court" for kind in kinds])
+    period = rng.uniform(60, 160, batch).astype(np.float32)
+    phase = rng.uniform(0, 2 * np.pi, batch).astype(np.float32)
+    # Mowing stripes across x for grass, plank lines across y for courts
+    stripes = np.sign(np.sin(2 * np.pi * x[None, :] / period[:, None] + phase[:, None])) * 10
+    planks = np.sin(2 * np.pi * y[None, :] / (period[:, None] / 4) + phase[:, None]) * 8
+    images += (grass[:, None] * stripes)[:, None, :, None]
+    images += (court[:, None] * planks)[:, :, None, None]
+
+    # Coarse blotches: low-res noise upsampled by repetition
+    block = 16
+    coarse = rng.standard_normal((batch, VIEW_HEIGHT // block, VIEW_WIDTH // block, 1), dtype=np.float32) * 8
+    images += coarse.repeat(block, axis=1).repeat(block, axis=2)
+    # Luminance-only grain: a third of the random draws of per-channel noise
+    images += rng.standard_normal((batch, VIEW_HEIGHT, VIEW_WIDTH, 1), dtype=np.float32) * 4
+    return images
+
+
+def contrasting_color(color):
+    luminance = 0.299 * color[0] + 0.587 * color[1] + 0.114 * color[2]
+    return (0, 0, 0) if luminance > 140 else (255, 255, 255)
+
+
+def render_jersey(rng, number, spec):
+    """
+    👕 One jersey patch: RGB array, alpha mask and the number's mask, already
+    scaled, rotated and blurred.
+    """
+    width = spec["jersey_width"]
+    if spec["angle"] == "side":
+        width = max(24, int(width * 0.6))  # side-on players look narrower
+    height = int(spec["jersey_width"] * JERSEY_ASPECT)
+
+    jersey = np.empty((height, width, 3), dtype=np.float32)
+    jersey[:] = spec["jersey_color"]
+    # Soft vertical shading so the jersey isn't a flat rectangle
+    jersey *= np.linspace(1.08, 0.88, height, dtype=np.float32)[:, None, None]
+
+    fill_color, outline_color = VARIATIONS[spec["variation"]]
+    fill_color = fill_color or contrasting_color(spec["jersey_color"])
+    stroke = 6 if outline_color else 0
+    fill, outline = glyph_masks(str(number), spec["font"], stroke)
+
+    # Number height ~45-60% of the jersey, never wider than 90% of it
+    scale = min(height * rng.uniform(0.45, 0.6) / fill.height, width * 0.9 / fill.width)
+    size = (max(2, int(fill.width * scale)), max(2, int(fill.height * scale)))
+    fill = np.asarray(fill.resize(size, Image.Resampling.BILINEAR), dtype=np.float32) / 255
+    outline = np.asarray(outline.resize(size, Image.Resampling.BILINEAR), dtype=np.float32) / 255
+
+    top = (height - size[1]) // 2 - int(height * 0.05)
+    left = (width - size[0]) // 2
+    region = jersey[top:top + size[1], left:left + size[0]]
+    if outline_color:
+        region[:] = region * (1 - outline[..., None]) + np.array(outline_color, np.float32) * outline[..., None]
+    region[:] = region * (1 - fill[..., None]) + np.array(fill_color, np.float32) * fill[..., None]
+
+    number_mask = np.zeros((height, width), dtype=np.uint8)
+    number_mask[top:top + size[1], left:left + size[0]] = (np.maximum(fill, outline) > 0.5) * 255
+
+    patch = Image.fromarray(np.clip(jersey, 0, 255).astype(np.uint8))
+    alpha = Image.new("L", (width, height), 255)
+    mask = Image.fromarray(number_mask)
+    rotation = spec["rotation"]
+    if abs(rotation) > 0.5:
+        patch = patch.rotate(rotation, Image.Resampling.BICUBIC, expand=True)
+        alpha = alpha.rotate(rotation, Image.Resampling.BILINEAR, expand=True)
+        mask = mask.rotate(rotation, Image.Resampling.NEAREST, expand=True)
+    if spec["blur"] > 0:
+        patch = patch.filter(ImageFilter.GaussianBlur(spec["blur"]))
+        alpha = alpha.filter(ImageFilter.GaussianBlur(spec["blur"]))
+
+    return (np.asarray(patch, dtype=np.float32), np.asarray(alpha, dtype=np.float32)[..., None] / 255,
+            np.asarray(mask) > 127)
+
+
+def zone_position(rng, zone, patch_width, patch_height):
+    """Top-left corner inside one of the 9 player zones (same formula as the app)"""
+    (x0, x1), (y0, y1) = ZONES[zone]
+    max_left = VIEW_WIDTH - patch_width
+    max_top = VIEW_HEIGHT - patch_height
+    left = x0 * max_left + rng.random() * (x1 - x0) * max_left
+    top = y0 * max_top + rng.random() * (y1 - y0) * max_top
+    return int(np.clip(left, 0, max_left)), int(np.clip(top, 0, max_top))
+
+
+def sample_spec(rng):
+    """Random capture conditions for one sample"""
+    jersey_width = int(rng.integers(JERSEY_WIDTH_RANGE[0], JERSEY_WIDTH_RANGE[1] + 1))
+    angle = str(rng.choice(list(ANGLE_ROTATION), p=[0.6, 0.3, 0.1]))
+    difficulty = str(rng.choice(list(DIFFICULTY_BLUR)))
+    return {
+        "background": str(rng.choice(list(BACKGROUNDS))),
+        "zone": int(rng.integers(len(ZONES))),
+        "jersey_width": jersey_width,
+        "jersey_color": JERSEY_COLORS[rng.integers(len(JERSEY_COLORS))],
+        "variation": str(rng.choice(list(VARIATIONS))),
+        "font": int(rng.integers(len(load_fonts()))),
+        "angle": angle,
+        "rotation": float(rng.uniform(-1, 1) * ANGLE_ROTATION[angle]),
+        "difficulty": difficulty,
+        "blur": DIFFICULTY_BLUR[difficulty] * float(rng.uniform(0.7, 1.3)),
+        "lighting": str(rng.choice(list(LIGHTING_GAIN), p=[0.25, 0.5, 0.25])),
+        # Same size bands as the app's distant / medium / close jersey areas
+        "distance": "far" if jersey_width < 120 else ("medium" if jersey_width < 180 else "close"),
+    }
+
+
+def render_batch(task):
+    """
+    🚀 Worker entry point: renders and writes one batch.
+    task = (output_dir, seed, batch_index, first_index, count)
+    Sample i gets jersey number i % 100, so classes stay balanced.
+    """
+    output_dir, seed, batch_index, first_index, count = task
+    output_dir = Path(output_dir)
+    rng = np.random.default_rng([seed, batch_index])
+    specs = [sample_spec(rng) for _ in range(count)]
+    images = render_backgrounds(rng, [spec["background"] for spec in specs])
+
+    annotations = []
+    for i, spec in enumerate(specs):
+        index = first_index + i
+        number = index % NUM_CLASSES
+        patch, alpha, mask = render_jersey(rng, number, spec)
+        height, width = alpha.shape[:2]
+        left, top = zone_position(rng, spec["zone"], width, height)
+
+        view = images[i, top:top + height, left:left + width]
+        view[:] = view * (1 - alpha) + patch * alpha
+
+        ys, xs = np.nonzero(mask)
+        annotations.append({
+            "image_path": f"jersey_{number}_synth{seed}_{index:06d}.jpg",
+            "image_width": VIEW_WIDTH,
+            "image_height": VIEW_HEIGHT,
+            "jersey_number": number,
+            "bounding_box": {"x": float(left + xs.min()), "y": float(top + ys.min()),
+                             "width": float(xs.max() - xs.min() + 1), "height": float(ys.max() - ys.min() + 1)},
+            "metadata": {
+                "capture_mode": "auto",
+                "confidence": 1.0,
+                "detection_source": "synthetic",
+                "lighting_condition": spec["lighting"],
+                "distance": spec["distance"],
+                "angle": spec["angle"],
+            },
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3],
+        })
+
+    # Lighting for the whole batch in one multiply
+    gains = np.array([rng.uniform(*LIGHTING_GAIN[spec["lighting"]]) for spec in specs], dtype=np.float32)
+    images = np.clip(images * gains[:, None, None, None], 0, 255).astype(np.uint8)
+
+    for image, annotation in zip(images, annotations):
+        stem = Path(annotation["image_path"]).stem
+        Image.fromarray(image).save(output_dir / "images" / annotation["image_path"], quality=JPEG_QUALITY)
+        (output_dir / "annotations" / f"{stem}.json").write_text(json.dumps(annotation, indent=2))
+        (output_dir / "labels" / f"{stem}.txt").write_text(yolo_label_line(annotation) + "\n")
+    return count
+
+
+def generate_dataset(output_dir, count, seed=0, workers=None, batch_size=BATCH_SIZE):
+    """
+    🎨 Generates count samples under output_dir (images/, annotations/, labels/,
+    dataset.yaml). Returns a summary with samples/sec.
+    """
+    output_dir = Path(output_dir)
+    for sub in ("images", "annotations", "labels"):
+        (output_dir / sub).mkdir(parents=True, exist_ok=True)
+
+    tasks = [(str(output_dir), seed, b, start, min(batch_size, count - start))
+             for b, start in enumerate(range(0, count, batch_size))]
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    started = time.perf_counter()
+    done = 0
+    if workers == 1:
+        for task in tasks:
+            done += render_batch(task)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            for future in as_completed(executor.submit(render_batch, task) for task in tasks):
+                done += future.result()
+                if done % (batch_size * 50) < batch_size:
+                    logger.info(f"🎨 {done}/{count} samples")
+    elapsed = time.perf_counter() - started
+
+    write_yolo_dataset_yaml(output_dir)
+    return {
+        "output": str(output_dir),
+        "samples": done,
+        "seed": seed,
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "samples_per_sec": round(done / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from training_config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description='🎨 Generate synthetic jersey samples on the host')
+    parser.add_argument('--count', type=int, default=10000, help='Number of samples')
+    parser.add_argument('--output', default=str(DATA_DIR / "synthetic"), help='Output directory')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (same seed, same dataset)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Samples rendered per task')
+    args = parser.parse_args()
+
+    summary = generate_dataset(args.output, args.count, args.seed, args.workers, args.batch_size)
+    logger.info(f"✅ {summary['samples']} samples in {summary['seconds']}s ({summary['samples_per_sec']} samples/sec)")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,9 @@
 This script sets up training for a custom TensorFlow Lite model specifically 
 optimized for detecting jersey numbers in sports scenarios.
 
+TensorFlow is imported inside the functions that build, train or convert the
+model, so setup and --help don't pay for it (see jersey_cli.py).
+
 Target: >80% detection reliability with:
 - Motion blur tolerance
 - Variable lighting conditions  
@@ -12,102 +15,126 @@ Target: >80% detection reliability with:
 - Distance variations
 """
 
-import tensorflow as tf
-import tensorflow_datasets as tfds
-import numpy as np
-import cv2
+import argparse
 import json
-import os
+import shutil
 from pathlib import Path
-import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-
-# 🎯 Model Configuration
-MODEL_CONFIG = {
-    "input_size": 416,  # YOLO-style square input
-    "num_classes": 100,  # Jersey numbers 0-99
-    "max_detections": 10,
-    "confidence_threshold": 0.6,
-    "nms_threshold": 0.4,
-    "batch_size": 16,
-    "epochs": 100,
-    "learning_rate": 0.001
-}
-
-# 📁 Directory Structure
-BASE_DIR = Path(__file__).parent
-DATA_DIR = BASE_DIR / "data"
-ANNOTATIONS_DIR = DATA_DIR / "annotations"  
-IMAGES_DIR = DATA_DIR / "images"
-MODELS_DIR = BASE_DIR / "models"
-AUGMENTED_DIR = DATA_DIR / "augmented"
+
+from training_config import (
+    ANNOTATIONS_DIR,
+    AUGMENTED_DIR,
+    BASE_DIR,
+    DATA_DIR,
+    FEATURES_DIR,
+    IMAGES_DIR,
+    MODEL_CONFIG,
+    MODELS_DIR,
+)
+from training_orchestration import parse_duration
 
 def setup_directories():
     """Create training directory structure"""
-    for dir_path in [DATA_DIR, ANNOTATIONS_DIR, IMAGES_DIR, MODELS_DIR, AUGMENTED_DIR]:
+    for dir_path in [DATA_DIR, ANNOTATIONS_DIR, IMAGES_DIR, MODELS_DIR, AUGMENTED_DIR, FEATURES_DIR]:
         dir_path.mkdir(exist_ok=True)
     print("✅ Training directories created")
 
-def create_yolo_model():
-    """
-    🧠 Create YOLO-style model for jersey number detection
-    Optimized for sports scenarios with motion and lighting variations
-    """
-    
-    input_layer = tf.keras.Input(shape=(MODEL_CONFIG["input_size"], MODEL_CONFIG["input_size"], 3))
+def create_backbone():
+    """🔥 Feature extraction backbone (MobileNetV3 for efficiency), ImageNet weights, raw 0-255 input"""
+    import tensorflow as tf
     
-    # 🔥 Feature extraction backbone (MobileNetV3 for efficiency)
-    backbone = tf.keras.applications.MobileNetV3Large(
+    return tf.keras.applications.MobileNetV3Large(
         input_shape=(MODEL_CONFIG["input_size"], MODEL_CONFIG["input_size"], 3),
         include_top=False,
         weights='imagenet'
-    )(input_layer)
+    )
+
+def detection_head(features, head=None):
+    """
+    🎯 Detection head for jersey numbers on a backbone feature map.
+    head is "dense" (max_detections slots) or "grid" (grid_head.py), default MODEL_CONFIG["head"].
+    Every weighted layer is named, so create_head_model() and create_yolo_model()
+    share weights by layer name (see transfer_head_weights).
+    """
+    import tensorflow as tf
     
-    # 🎯 Detection head for jersey numbers
-    x = tf.keras.layers.GlobalAveragePooling2D()(backbone)
-    x = tf.keras.layers.Dense(512, activation='relu')(x)
-    x = tf.keras.layers.Dropout(0.3)(x)
+    head = head or MODEL_CONFIG["head"]
+    if head == "grid":
+        from grid_head import grid_detection_head
+
+        return grid_detection_head(features, MODEL_CONFIG)
+    if head != "dense":
+        raise ValueError(f"Unknown detection head: {head}")
+    
+    x = tf.keras.layers.GlobalAveragePooling2D(name='head_pool')(features)
+    x = tf.keras.layers.Dense(512, activation='relu', name='head_dense')(x)
+    x = tf.keras.layers.Dropout(0.3, name='head_dropout')(x)
     
     # Outputs: [boxes, confidence, classes]
-    boxes = tf.keras.layers.Dense(MODEL_CONFIG["max_detections"] * 4, activation='sigmoid', name='boxes')(x)
+    boxes = tf.keras.layers.Dense(MODEL_CONFIG["max_detections"] * 4, activation='sigmoid', name='boxes_flat')(x)
     confidence = tf.keras.layers.Dense(MODEL_CONFIG["max_detections"], activation='sigmoid', name='confidence')(x)
-    classes = tf.keras.layers.Dense(MODEL_CONFIG["max_detections"] * MODEL_CONFIG["num_classes"], activation='softmax', name='classes')(x)
+    classes = tf.keras.layers.Dense(MODEL_CONFIG["max_detections"] * MODEL_CONFIG["num_classes"], name='classes_flat')(x)
     
-    # Reshape outputs
-    boxes = tf.keras.layers.Reshape((MODEL_CONFIG["max_detections"], 4))(boxes)
+    # Reshape outputs (named so the loss dict in compile_model and the tf.data targets line up)
+    boxes = tf.keras.layers.Reshape((MODEL_CONFIG["max_detections"], 4), name='boxes')(boxes)
     classes = tf.keras.layers.Reshape((MODEL_CONFIG["max_detections"], MODEL_CONFIG["num_classes"]))(classes)
+    # Softmax per detection slot, not across all slots at once
+    classes = tf.keras.layers.Softmax(axis=-1, name='classes')(classes)
+    return [boxes, confidence, classes]
+
+def create_yolo_model(head=None):
+    """
+    🧠 Create YOLO-style model for jersey number detection
+    Optimized for sports scenarios with motion and lighting variations
+    head: "dense" or "grid" (see detection_head), default MODEL_CONFIG["head"]
+    """
+    import tensorflow as tf
     
-    model = tf.keras.Model(inputs=input_layer, outputs=[boxes, confidence, classes])
+    input_layer = tf.keras.Input(shape=(MODEL_CONFIG["input_size"], MODEL_CONFIG["input_size"], 3))
+    features = create_backbone()(input_layer)
+    model = tf.keras.Model(inputs=input_layer, outputs=detection_head(features, head))
     
     return model
 
+def create_head_model(feature_shape, head=None):
+    """🧊 The detection head alone, trained on cached backbone features (feature_cache.py)"""
+    import tensorflow as tf
+    
+    features = tf.keras.Input(shape=feature_shape)
+    return tf.keras.Model(inputs=features, outputs=detection_head(features, head), name='detection_head')
+
+def transfer_head_weights(head_model, model):
+    """Copies trained head weights into the full model, layer by layer name"""
+    for layer in head_model.layers:
+        if layer.weights:
+            model.get_layer(layer.name).set_weights(layer.get_weights())
+
 def create_data_augmentation():
     """
     🎨 Data augmentation pipeline for sports scenarios
     Simulates real-world conditions: motion blur, lighting, angles
+    Photometric only: camera angle (rotation), distance (zoom) and player movement
+    (translation) are applied by jersey_tf_data.random_affine, which also moves the
+    boxes; Keras' geometric layers would leave them pointing at the old position.
     """
+    import tensorflow as tf
     
     return tf.keras.Sequential([
-        # Geometric transformations
-        tf.keras.layers.RandomRotation(0.1),  # Camera angle variations
-        tf.keras.layers.RandomZoom(0.2),      # Distance variations
-        tf.keras.layers.RandomTranslation(0.1, 0.1),  # Player movement
-        
         # Color/lighting augmentations  
-        tf.keras.layers.RandomBrightness(0.3),  # Stadium lighting
+        tf.keras.layers.RandomBrightness(0.3, value_range=(0, 255)),  # Stadium lighting
         tf.keras.layers.RandomContrast(0.2),    # Shadow/sun conditions
         
         # Motion blur simulation (custom layer needed)
         # CustomMotionBlur(),
         
-        # Normalize for model input
-        tf.keras.layers.Rescaling(1./255)
+        # No Rescaling here: MobileNetV3 normalizes internally (include_preprocessing),
+        # and the app feeds raw 0-255 pixels to the TFLite model.
     ])
 
-def compile_model(model):
+def compile_model(model, head=None):
     """
     ⚡ Compile model with appropriate loss functions for detection
     """
+    import tensorflow as tf
     
     # Custom loss functions for detection
     def box_loss(y_true, y_pred):
@@ -119,13 +146,15 @@ def compile_model(model):
     def class_loss(y_true, y_pred):
         return tf.keras.losses.categorical_crossentropy(y_true, y_pred)
     
+    if (head or MODEL_CONFIG["head"]) == "grid":
+        from grid_head import grid_box_loss, grid_class_loss
+        losses = {'boxes': grid_box_loss, 'confidence': confidence_loss, 'classes': grid_class_loss}
+    else:
+        losses = {'boxes': box_loss, 'confidence': confidence_loss, 'classes': class_loss}
+    
     model.compile(
         optimizer=tf.keras.optimizers.Adam(learning_rate=MODEL_CONFIG["learning_rate"]),
-        loss={
-            'boxes': box_loss,
-            'confidence': confidence_loss, 
-            'classes': class_loss
-        },
+        loss=losses,
         loss_weights={
             'boxes': 1.0,
             'confidence': 1.0,
@@ -191,24 +220,23 @@ def create_dataset_collection_guide():
     
     print("📋 Dataset collection guide created")
 
-def convert_to_tflite(model, model_name="jersey_detector"):
+def convert_to_tflite(model, model_name="jersey_detector", data_dir=DATA_DIR, shards_dir=None):
     """
     📱 Convert trained model to TensorFlow Lite for Android deployment
     """
+    import tensorflow as tf
+
+    from calibration import tensor_range_report
     
     # Convert to TensorFlow Lite
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
     
-    # Optimization for mobile deployment
+    # Full integer quantization for smaller model size and faster inference.
+    # Builtin int8 ops only: conversion fails loudly instead of silently keeping
+    # float/SELECT_TF_OPS fallbacks that run slower on device.
     converter.optimizations = [tf.lite.Optimize.DEFAULT]
-    converter.target_spec.supported_ops = [
-        tf.lite.OpsSet.TFLITE_BUILTINS,
-        tf.lite.OpsSet.SELECT_TF_OPS
-    ]
-    
-    # Quantization for smaller model size and faster inference
-    converter.representative_dataset = lambda: representative_dataset_generator()
-    converter.target_spec.supported_types = [tf.int8]
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.representative_dataset = representative_dataset_generator(data_dir, shards_dir)
     converter.inference_input_type = tf.uint8
     converter.inference_output_type = tf.uint8
     
@@ -219,26 +247,218 @@ def convert_to_tflite(model, model_name="jersey_detector"):
     with open(model_path, "wb") as f:
         f.write(tflite_model)
     
+    # Save per-tensor calibration ranges next to the model
+    report = tensor_range_report(tflite_model)
+    with open(MODELS_DIR / f"{model_name}_calibration.json", "w") as f:
+        json.dump(report, f, indent=2)
+    
     print(f"📱 TensorFlow Lite model saved: {model_path}")
+    print(f"🎚️ Calibration ranges: {report['num_tensors']} tensors, {report['float_tensors']} float")
     return model_path
 
-def representative_dataset_generator():
-    """Generate representative dataset for quantization"""
-    # This would use actual training data samples
-    # For now, generate random samples
-    for _ in range(100):
-        yield [np.random.random((1, MODEL_CONFIG["input_size"], MODEL_CONFIG["input_size"], 3)).astype(np.float32)]
+def representative_dataset_generator(data_dir=DATA_DIR, shards_dir=None, num_samples=300):
+    """
+    Representative dataset for quantization: a stratified sample of real training
+    images (balanced across jersey number, lighting, distance and angle), with the
+    same preprocessing as training
+    """
+    from calibration import load_candidates, representative_dataset, sample_report, select_calibration_samples
+    
+    samples = select_calibration_samples(load_candidates(data_dir, shards_dir), num_samples)
+    if not samples:
+        raise ValueError(f"No calibration images found in {shards_dir or data_dir}; "
+                         "int8 ranges can't be calibrated without real samples")
+    
+    print(f"🎚️ Calibrating with {len(samples)} images: {sample_report(samples)}")
+    return representative_dataset(samples, MODEL_CONFIG["input_size"])
+
+def train_model(model, data_dir=DATA_DIR, shards_dir=None, epochs=MODEL_CONFIG["epochs"], cache_dir=None,
+                augmented_variants=0, augmented_budget_gb=5.0, balance_temperature=None,
+                profile_log=None, profile_epoch=None, run_name="jersey_detector", resume=True, time_budget=None):
+    """
+    🏋️ Train on the collected dataset through the tf.data pipeline (jersey_tf_data.py)
+    With augmented_variants > 0 the training split comes from the offline
+    augmentation store in AUGMENTED_DIR (augment_cache.py), refreshed first.
+    balance_temperature draws class/condition-balanced batches (balanced_sampler.py);
+    it can't be combined with augmented_variants.
+    profile_log records per-epoch throughput telemetry (training_profiler.py).
+    Checkpoints go to MODELS_DIR/checkpoints/<run_name> every epoch; an existing
+    one is resumed unless resume=False. SIGTERM/Ctrl-C checkpoints and stops, and
+    time_budget (seconds) stops before an epoch that wouldn't fit, keeping the best
+    weights (training_orchestration.py). Returns (history, interrupted).
+    """
+    from jersey_tf_data import build_dataset
+    from training_orchestration import KerasCheckpointer, StopController, train_with_checkpoints
+
+    checkpoint_dir = MODELS_DIR / "checkpoints" / run_name
+    if not resume:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    checkpointer = KerasCheckpointer(model, checkpoint_dir)
 
-def main():
+    augmented_dir = None
+    if augmented_variants:
+        from augment_cache import AugmentationStore, populate_store
+
+        store = AugmentationStore(AUGMENTED_DIR, MODEL_CONFIG["input_size"], int(augmented_budget_gb * 1024 ** 3))
+        summary = populate_store(store, data_dir, shards_dir, augmented_variants)
+        print(f"🎲 Augmentation store: {summary['rendered']} rendered, {summary['reused']} reused "
+              f"({summary['seconds']}s)")
+        augmented_dir = AUGMENTED_DIR
+
+    augmentation = create_data_augmentation()
+    train_ds = build_dataset(MODEL_CONFIG, "train", data_dir=data_dir, shards_dir=shards_dir,
+                             augmentation=augmentation, cache_dir=cache_dir,
+                             augmented_dir=augmented_dir, variants=augmented_variants or 8,
+                             balance_temperature=balance_temperature, sampler_hook=checkpointer.sampler_hook)
+    val_ds = build_dataset(MODEL_CONFIG, "val", data_dir=data_dir, shards_dir=shards_dir, cache_dir=cache_dir)
+
+    callbacks, profiler = [], None
+    if profile_log:
+        from training_profiler import RunProfiler, keras_profiler_callback
+
+        profiler = RunProfiler(profile_log, profile_epoch, {"trainer": "keras", "epochs": epochs,
+                                                            "batch_size": MODEL_CONFIG["batch_size"]})
+        profiler.probe_loader(train_ds)
+        callbacks.append(keras_profiler_callback(profiler, MODEL_CONFIG["batch_size"]))
+
+    controller = StopController(time_budget).install()
+    try:
+        history, interrupted = train_with_checkpoints(model, train_ds, val_ds, epochs, checkpointer, controller,
+                                                      callbacks, profiler)
+    finally:
+        controller.uninstall()
+    if interrupted:
+        print(f"⏸️ Training interrupted ({controller.reason}); run the same command again to resume")
+        return history, True
+
+    model_path = MODELS_DIR / "jersey_detector.keras"
+    if profiler:
+        with profiler.checkpoint():
+            model.save(model_path)
+    else:
+        model.save(model_path)
+    print(f"💾 Keras model saved: {model_path}")
+    return history, False
+
+def train_head_only(model, data_dir=DATA_DIR, shards_dir=None, epochs=MODEL_CONFIG["epochs"], variants=4,
+                    budget_gb=5.0, profile_log=None, profile_epoch=None, run_name="jersey_detector", resume=True,
+                    time_budget=None):
+    """
+    🧊 Trains only the detection head on cached frozen-backbone features (feature_cache.py).
+    The backbone runs once per new (image, variant); the trained head weights are then
+    copied into model, whose backbone is the same frozen ImageNet MobileNetV3.
+    Checkpoints, resume, SIGTERM/Ctrl-C and time_budget work as in train_model, with
+    the head's checkpoints in MODELS_DIR/checkpoints/<run_name>-head.
+    Returns (history, interrupted) like train_model.
+    """
+    import tensorflow as tf
+    from feature_cache import open_for_backbone, populate_features, to_tf_dataset
+    from training_orchestration import KerasCheckpointer, StopController, train_with_checkpoints
+
+    backbone = next(layer for layer in model.layers if isinstance(layer, tf.keras.Model))
+    store = open_for_backbone(backbone, MODEL_CONFIG["input_size"], FEATURES_DIR, budget_gb)
+    summaries = {}
+    for split, split_variants in (("train", variants), ("val", 1)):
+        summaries[split] = populate_features(store, backbone, MODEL_CONFIG["input_size"], data_dir, shards_dir,
+                                             split, split_variants)
+        print(f"🧊 {split} features: {summaries[split]['extracted']} extracted, "
+              f"{summaries[split]['reused']} reused ({summaries[split]['seconds']}s)")
+
+    train_ds = to_tf_dataset(store, summaries["train"]["keys"], variants, MODEL_CONFIG)
+    val_ds = to_tf_dataset(store, summaries["val"]["keys"], 1, MODEL_CONFIG, shuffle=False)
+
+    head_model = compile_model(create_head_model(backbone.output_shape[1:]))
+    checkpoint_dir = MODELS_DIR / "checkpoints" / f"{run_name}-head"
+    if not resume:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    checkpointer = KerasCheckpointer(head_model, checkpoint_dir)
+
+    # train_with_checkpoints loads the best weights back at the end
+    callbacks, profiler = [tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=10)], None
+    if profile_log:
+        from training_profiler import RunProfiler, keras_profiler_callback
+
+        profiler = RunProfiler(profile_log, profile_epoch, {"trainer": "keras-head", "epochs": epochs,
+                                                            "batch_size": MODEL_CONFIG["batch_size"]})
+        profiler.probe_loader(train_ds)
+        callbacks.append(keras_profiler_callback(profiler, MODEL_CONFIG["batch_size"]))
+
+    controller = StopController(time_budget).install()
+    try:
+        history, interrupted = train_with_checkpoints(head_model, train_ds, val_ds, epochs, checkpointer,
+                                                      controller, callbacks, profiler)
+    finally:
+        controller.uninstall()
+    if interrupted:
+        print(f"⏸️ Training interrupted ({controller.reason}); run the same command again to resume")
+        return history, True
+    transfer_head_weights(head_model, model)
+
+    model_path = MODELS_DIR / "jersey_detector.keras"
+    model.save(model_path)
+    print(f"💾 Keras model saved: {model_path}")
+    return history, False
+
+def has_training_data(data_dir, shards_dir=None):
+    if shards_dir:
+        return (Path(shards_dir) / "train").exists()
+    annotations_dir = Path(data_dir) / "annotations"
+    return annotations_dir.exists() and any(annotations_dir.glob("*.json"))
+
+def add_arguments(parser):
+    """Training options, shared by this script and `jersey_cli.py train-keras`"""
+    parser.add_argument('--epochs', type=int, default=MODEL_CONFIG["epochs"], help='Number of epochs')
+    parser.add_argument('--batch-size', type=int, default=MODEL_CONFIG["batch_size"], help='Batch size')
+    parser.add_argument('--data-path', type=str, default=str(DATA_DIR), help='Directory with annotations/ and images/')
+    parser.add_argument('--shards', type=str, help='Packed shards root from jersey_shards.py (instead of --data-path)')
+    parser.add_argument('--cache-dir', type=str, default=str(DATA_DIR / "cache"), help='Decoded-image cache directory')
+    parser.add_argument('--augmented', type=int, default=0,
+                        help='Train on N pre-rendered variants per image from augment_cache.py (0 = augment online); '
+                             'not combinable with --balance-temperature')
+    parser.add_argument('--aug-budget-gb', type=float, default=5.0, help='Disk budget for the augmentation store')
+    parser.add_argument('--balance-temperature', type=float,
+                        help='Class/condition-balanced sampling (1 = natural mix, inf = uniform over numbers)')
+    parser.add_argument('--profile-log', type=str,
+                        help='Write per-epoch throughput telemetry (JSON Lines) to this file')
+    parser.add_argument('--profile-epoch', type=int, help='Capture hot functions during this epoch (0-based)')
+    parser.add_argument('--run-name', type=str, default='jersey_detector',
+                        help='Checkpoints are kept in models/checkpoints/<run-name> and resumed automatically')
+    parser.add_argument('--fresh', action='store_true', help='Discard existing checkpoints and start over')
+    parser.add_argument('--time-budget', type=str, help='Wall-clock budget (e.g. 2h, 90m), then export the best model')
+    parser.add_argument('--head-only', action='store_true',
+                        help='Freeze the backbone and train only the head from cached features (feature_cache.py); '
+                             'not combinable with --augmented or --balance-temperature')
+    parser.add_argument('--feature-variants', type=int, default=4,
+                        help='Cached variants per training image for --head-only (variant 0 = unaugmented)')
+    parser.add_argument('--feature-budget-gb', type=float, default=5.0, help='Disk budget for the feature store')
+    parser.add_argument('--head', choices=['dense', 'grid'], default=MODEL_CONFIG["head"],
+                        help='Detection head: dense slots or the 13x13 grid with digit-decomposed classes (grid_head.py)')
+    parser.add_argument('--setup-only', action='store_true', help='Only create directories and the collection guide')
+
+def run(args):
     """
     🚀 Main training pipeline setup
     """
+    MODEL_CONFIG["batch_size"] = args.batch_size
+    MODEL_CONFIG["head"] = args.head
+    if args.head_only and (args.augmented or args.balance_temperature):
+        # The feature cache holds its own augmentation variants and is read uniformly
+        print("❌ --head-only trains from cached features; --augmented and --balance-temperature don't apply")
+        return 2
+    if args.augmented and args.balance_temperature:
+        # The augmentation store is read one random variant per sample, not through the balanced sampler
+        print("❌ --augmented reads the augmentation store uniformly; drop --balance-temperature or --augmented")
+        return 2
     
     print("🏆 Setting up Jersey Number Detection Model Training")
     
     # Setup
     setup_directories()
     create_dataset_collection_guide()
+    if args.setup_only:
+        return
+    
+    import tensorflow as tf
     
     # Create model architecture
     print("🧠 Creating model architecture...")
@@ -257,6 +477,29 @@ def main():
     )
     
     print("✅ Model architecture created")
+
+    if has_training_data(args.data_path, args.shards) and args.head_only:
+        print("🧊 Training the detection head on cached backbone features...")
+        _history, interrupted = train_head_only(model, args.data_path, args.shards, args.epochs,
+                                                args.feature_variants, args.feature_budget_gb, args.profile_log,
+                                                args.profile_epoch, args.run_name, not args.fresh,
+                                                parse_duration(args.time_budget))
+        if interrupted:
+            return
+        convert_to_tflite(model, data_dir=args.data_path, shards_dir=args.shards)
+        return
+
+    if has_training_data(args.data_path, args.shards):
+        print("🏋️ Training with collected data...")
+        _history, interrupted = train_model(model, args.data_path, args.shards, args.epochs, args.cache_dir,
+                                            args.augmented, args.aug_budget_gb, args.balance_temperature,
+                                            args.profile_log, args.profile_epoch, args.run_name, not args.fresh,
+                                            parse_duration(args.time_budget))
+        if interrupted:
+            return
+        convert_to_tflite(model, data_dir=args.data_path, shards_dir=args.shards)
+        return
+
     print(f"📁 Training setup complete at: {BASE_DIR}")
     print("📋 Next steps:")
     print("   1. Collect jersey number dataset (see dataset_collection_guide.md)")
@@ -265,5 +508,10 @@ def main():
     print("   4. Convert to TensorFlow Lite")
     print("   5. Deploy to Android app")
 
+def main():
+    parser = argparse.ArgumentParser(description='🏆 Jersey Number Detection Model Training')
+    add_arguments(parser)
+    return run(parser.parse_args())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
@@ -2,52 +2,48 @@
 """
 🚀 Enhanced Jersey Number Detection Training Pipeline
 Automated training script for custom jersey number detection model
+
+torch / ultralytics are only imported once training starts, so --help and
+dataset validation stay fast (see jersey_cli.py).
 """
 
 import argparse
 import os
 import sys
-import yaml
 from pathlib import Path
-import torch
-from ultralytics import YOLO
 import logging
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def setup_training_environment():
-    """🔧 Setup training environment and dependencies"""
-    try:
-        import ultralytics
-        import torch
-        import torchvision
-        logger.info("✅ All dependencies available")
-        return True
-    except ImportError as e:
-        logger.error(f"❌ Missing dependency: {e}")
-        logger.info("Installing required packages...")
-        
-        # Auto-install required packages
-        import subprocess
-        packages = [
-            "ultralytics",
-            "torch",
-            "torchvision", 
-            "opencv-python",
-            "Pillow",
-            "numpy",
-            "matplotlib"
-        ]
-        
-        for package in packages:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-        
-        logger.info("✅ Dependencies installed successfully")
-        return True
+    """🔧 Check (never install) the training dependencies; see environment_check.py"""
+    from environment_check import require
+
+    if not require("train-yolo"):
+        return False
+    logger.info("✅ All dependencies available")
+    return True
+
+def validate_shard_dataset(base_dir, config):
+    """📦 Validate a packed-shard dataset (see jersey_shards.py)"""
+    from jersey_shards import ShardReader
 
-def validate_dataset(data_path):
+    for split in ('train', 'val'):
+        split_dir = base_dir / config.get('path', '.') / config[split]
+        try:
+            reader = ShardReader(split_dir)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Invalid {split} shards at {split_dir}: {e}")
+            return False
+        logger.info(f"📦 {split}: {len(reader)} samples in {reader.meta['num_shards']} shard(s)")
+        if split == 'train' and len(reader) == 0:
+            logger.error("❌ No training samples found")
+            return False
+
+    logger.info("✅ Dataset validation passed")
+    return True
+
+def validate_dataset(data_path, shards=False):
     """📊 Validate dataset structure and contents"""
     logger.info(f"🔍 Validating dataset at {data_path}")
     
@@ -55,6 +51,8 @@ def validate_dataset(data_path):
         logger.error(f"❌ Dataset file not found: {data_path}")
         return False
     
+    import yaml
+    
     with open(data_path, 'r') as f:
         config = yaml.safe_load(f)
     
@@ -67,27 +65,18 @@ def validate_dataset(data_path):
     
     # Validate directories
     base_dir = Path(data_path).parent
-    train_dir = base_dir / config['train']
-    labels_dir = base_dir / 'labels'
-    
-    if not train_dir.exists():
-        logger.error(f"❌ Training images directory not found: {train_dir}")
-        return False
-        
-    if not labels_dir.exists():
-        logger.error(f"❌ Labels directory not found: {labels_dir}")
-        return False
-    
-    # Count samples
-    image_files = list(train_dir.glob('*.jpg')) + list(train_dir.glob('*.png'))
-    label_files = list(labels_dir.glob('*.txt'))
-    
-    logger.info(f"📊 Found {len(image_files)} images and {len(label_files)} labels")
-    
-    if len(image_files) == 0:
-        logger.error("❌ No training images found")
+    if shards:
+        return validate_shard_dataset(base_dir, config)
+
+    # Pairing, label syntax, box bounds, class range and decodability (cached per file)
+    from dataset_validation import log_report, validate_yolo_dataset
+
+    report = validate_yolo_dataset(data_path)
+    log_report(report)
+    if not report['ok']:
+        logger.error("❌ Dataset validation failed")
         return False
-    
+
     logger.info("✅ Dataset validation passed")
     return True
 
@@ -96,12 +85,40 @@ def train_jersey_detector(args):
     logger.info("🚀 Starting jersey number detection training")
     
     # Validate dataset
-    if not validate_dataset(args.data):
+    if not validate_dataset(args.data, shards=args.shards):
         return False
+
+    trainer_cls = validator_cls = None
+    if args.shards:
+        # Stream images and labels from packed shards instead of loose files
+        from shard_yolo import ShardDetectionTrainer, ShardDetectionValidator
+        trainer_cls, validator_cls = ShardDetectionTrainer, ShardDetectionValidator
+    if args.balance_temperature:
+        # Class/condition-balanced draws instead of one uniform pass per epoch
+        from balanced_sampler import balanced_trainer
+        from ultralytics.models.yolo.detect import DetectionTrainer
+        trainer_cls = balanced_trainer(trainer_cls or DetectionTrainer, args.balance_temperature,
+                                       args.annotations)
+    
+    # Resume an unfinished run of the same --project/--name (optimizer, epoch and sampler position)
+    from training_orchestration import (
+        StopController,
+        TrainingInterrupted,
+        attach_yolo_stop,
+        latest_yolo_checkpoint,
+        parse_duration,
+    )
+    weights_dir = Path(args.project) / args.name / 'weights'
+    resume_from = None if args.fresh else latest_yolo_checkpoint(args.project, args.name)
+    
+    from ultralytics import YOLO
     
     try:
         # Initialize YOLO model
-        if args.pretrained:
+        if resume_from:
+            logger.info(f"⏯️ Resuming training from {resume_from}")
+            model = YOLO(str(resume_from))
+        elif args.pretrained:
             logger.info(f"📥 Loading pretrained model: {args.pretrained}")
             model = YOLO(args.pretrained)
         else:
@@ -117,6 +134,7 @@ def train_jersey_detector(args):
             'device': args.device,
             'project': args.project,
             'name': args.name,
+            'exist_ok': True,   # Keep one run directory per name so it can be resumed
             'save': True,
             'save_period': 10,  # Save every 10 epochs
             'cache': True,      # Cache images for faster training
@@ -150,23 +168,57 @@ def train_jersey_detector(args):
             'verbose': True,   # Verbose output
         }
         
+        if args.profile_log:
+            # Per-epoch wall time, img/s, loader wait vs compute, RSS and checkpoint time
+            from training_profiler import RunProfiler, attach_yolo_profiler
+            profiler = RunProfiler(args.profile_log, args.profile_epoch,
+                                   {"trainer": "ultralytics", "epochs": args.epochs, "batch_size": args.batch})
+            attach_yolo_profiler(model, profiler)
+        
+        if resume_from:
+            training_args['resume'] = True
+        
+        # SIGTERM/Ctrl-C checkpoint and stop; --time-budget stops before an epoch that wouldn't fit
+        controller = StopController(parse_duration(args.time_budget)).install()
+        attach_yolo_stop(model, controller)
+        
         logger.info("🎯 Starting training with optimized parameters...")
-        results = model.train(**training_args)
+        try:
+            model.train(trainer=trainer_cls, **training_args)
+        except TrainingInterrupted:
+            if controller.interrupted:
+                logger.info(f"⏸️ Training interrupted ({controller.reason}); run the same command again to resume")
+                return True
+            # Budget ran out mid-epoch: export the best epoch so far, if any epoch finished
+            if not (weights_dir / 'best.pt').exists():
+                logger.error("⏰ Time budget ran out during the first epoch: nothing was trained, nothing to export. "
+                             "Raise --time-budget.")
+                return False
+            model = YOLO(str(weights_dir / 'best.pt'))
+        finally:
+            controller.uninstall()
         
         # Export trained model to different formats
         logger.info("📤 Exporting trained model...")
         
-        # Export to TensorFlow Lite for mobile deployment
-        model.export(format='tflite', imgsz=args.img)
-        logger.info("✅ TensorFlow Lite model exported")
-        
-        # Export to ONNX for flexibility
-        model.export(format='onnx', imgsz=args.img)
-        logger.info("✅ ONNX model exported")
+        if args.export_matrix:
+            # Every format x input size, benchmarked and scored on held-out images
+            from export_matrix import run_export_matrix
+            run_export_matrix(weights_dir / 'best.pt', args.data, args.matrix_imgsz, weights_dir / "matrix",
+                              args.eval_data, shards_dir=Path(args.data).parent if args.shards else None)
+            logger.info("✅ Export matrix written")
+        else:
+            # Export to TensorFlow Lite for mobile deployment
+            model.export(format='tflite', imgsz=args.img)
+            logger.info("✅ TensorFlow Lite model exported")
+            
+            # Export to ONNX for flexibility
+            model.export(format='onnx', imgsz=args.img)
+            logger.info("✅ ONNX model exported")
         
         # Validate trained model
         logger.info("🧪 Validating trained model...")
-        val_results = model.val()
+        val_results = model.val(validator=validator_cls)
         
         # Print training summary
         logger.info("🎉 Training completed successfully!")
@@ -179,8 +231,8 @@ def train_jersey_detector(args):
         logger.error(f"💥 Training failed: {str(e)}")
         return False
 
-def main():
-    parser = argparse.ArgumentParser(description='🚀 Jersey Number Detection Training')
+def add_arguments(parser):
+    """Training options, shared by this script and `jersey_cli.py train-yolo`"""
     parser.add_argument('--data', type=str, required=True, help='Path to dataset.yaml')
     parser.add_argument('--img', type=int, default=640, help='Image size')
     parser.add_argument('--batch', type=int, default=16, help='Batch size')
@@ -189,23 +241,47 @@ def main():
     parser.add_argument('--project', type=str, default='runs/train', help='Project directory')
     parser.add_argument('--name', type=str, default='jersey_detector', help='Experiment name')
     parser.add_argument('--pretrained', type=str, help='Path to pretrained model')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--shards', action='store_true',
+                        help='--data is a dataset.yaml written by jersey_shards.py pack')
+    parser.add_argument('--balance-temperature', type=float,
+                        help='Class/condition-balanced sampling (1 = natural mix, inf = uniform over numbers)')
+    parser.add_argument('--annotations', type=str,
+                        help='Annotation JSON directory for capture conditions when balancing loose datasets')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Start over instead of resuming an unfinished run of --project/--name')
+    parser.add_argument('--time-budget', type=str,
+                        help='Wall-clock budget (e.g. 2h, 90m); stops early and exports the best model')
+    parser.add_argument('--export-matrix', action='store_true',
+                        help='Export float32/float16/int8 TFLite + ONNX at several sizes and compare them')
+    parser.add_argument('--matrix-imgsz', type=int, nargs='+', default=[320, 416, 640],
+                        help='Input sizes for --export-matrix')
+    parser.add_argument('--eval-data', type=str, default='data',
+                        help='Directory with annotations/ and images/ for the --export-matrix accuracy check')
+    parser.add_argument('--profile-log', type=str,
+                        help='Write per-epoch throughput telemetry (JSON Lines) to this file')
+    parser.add_argument('--profile-epoch', type=int, help='Capture hot functions during this epoch (0-based)')
+
+def run(args):
+    """Environment check + training; returns the process exit code"""
     # Setup environment
     if not setup_training_environment():
         logger.error("❌ Failed to setup training environment")
-        sys.exit(1)
+        return 1
     
     # Run training
     success = train_jersey_detector(args)
     
     if success:
         logger.info("🎉 Jersey detector training completed successfully!")
-        sys.exit(0)
-    else:
-        logger.error("❌ Training failed")
-        sys.exit(1)
+        return 0
+    logger.error("❌ Training failed")
+    return 1
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='🚀 Jersey Number Detection Training')
+    add_arguments(parser)
+    sys.exit(run(parser.parse_args()))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+🎯 Shared Training Configuration
+
+Model and directory settings used by train_jersey_detector.py and the
+tools around it. Kept free of heavy imports so evaluation, post-processing
+and data tools can read it without loading TensorFlow.
+"""
+
+from pathlib import Path
+
+# 🎯 Model Configuration
+MODEL_CONFIG = {
+    "input_size": 416,  # YOLO-style square input
+    "num_classes": 100,  # Jersey numbers 0-99
+    "max_detections": 10,
+    "head": "dense",  # "dense" (slot head) or "grid" (13x13 anchor-free head, see grid_head.py)
+    "confidence_threshold": 0.6,
+    "nms_threshold": 0.4,
+    "batch_size": 16,
+    "epochs": 100,
+    "learning_rate": 0.001
+}
+
+# 📁 Directory Structure
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / "data"
+ANNOTATIONS_DIR = DATA_DIR / "annotations"  
+IMAGES_DIR = DATA_DIR / "images"
+MODELS_DIR = BASE_DIR / "models"
+AUGMENTED_DIR = DATA_DIR / "augmented"
+FEATURES_DIR = DATA_DIR / "features"
@@ -0,0 +1,304 @@
+"""
+⏯️ Resumable, Interruptible Training Orchestration
+
+Wraps both trainers so a long CPU run survives being killed:
+
+- Resume: the latest checkpoint for the run is found and training continues
+  with optimizer state, epoch and balanced-sampler position intact.
+    ultralytics   <project>/<name>/weights/last.pt  (model.train(resume=True))
+    Keras         tf.train.Checkpoint of model + optimizer + epoch + sampler epoch
+- SIGTERM / Ctrl-C: the current step finishes, a checkpoint is written and
+  training exits cleanly. The interrupted epoch is re-run on resume, starting
+  from the weights it had reached. A second signal kills the process as usual.
+- Wall-clock budget ("train for 2h, then export the best model"): no new epoch
+  is started unless it is expected to finish inside the budget (based on the
+  mean epoch time so far); the deadline is also enforced mid-epoch as a
+  fallback. The best model is exported afterwards.
+
+The balanced sampler's position is its epoch counter (see balanced_sampler.py);
+ultralytics derives it from the resumed epoch, the Keras checkpoint stores it.
+"""
+
+import logging
+import re
+import signal
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text):
+    """'2h', '90m', '1h30m' or plain seconds -> seconds"""
+    if text is None:
+        return None
+    text = str(text).strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", text):
+        return float(text)
+    parts = re.findall(r"(\d+(?:\.\d+)?)([smhd])", text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise ValueError(f"Invalid duration: {text!r} (use e.g. 2h, 90m, 1h30m)")
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+class TrainingInterrupted(Exception):
+    """Raised out of the ultralytics loop once the interrupted state is checkpointed"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class StopController:
+    """
+    Collects the reasons to stop: a signal, or the wall-clock budget.
+    stop_now() is checked after every step, stop_before_next_epoch() after every epoch.
+    """
+
+    def __init__(self, budget_seconds=None):
+        self.started = time.monotonic()
+        self.budget_seconds = budget_seconds
+        self.reason = None
+        self.epoch_times = []
+        self._previous_handlers = {}
+
+    def install(self):
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            self._previous_handlers[sig] = signal.signal(sig, self._handle)
+        return self
+
+    def uninstall(self):
+        for sig, handler in self._previous_handlers.items():
+            signal.signal(sig, handler)
+        self._previous_handlers = {}
+
+    def _handle(self, signum, frame):
+        name = signal.Signals(signum).name
+        logger.warning(f"🛑 {name} received: checkpointing after the current step (send again to kill)")
+        self.reason = name
+        # Restore the previous handler so a second signal behaves normally
+        signal.signal(signum, self._previous_handlers.get(signum, signal.SIG_DFL))
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def stop_now(self):
+        if self.reason is None and self.budget_seconds and self.elapsed >= self.budget_seconds:
+            self.reason = "budget"
+            logger.warning("⏰ Wall-clock budget reached mid-epoch")
+        return self.reason is not None
+
+    def epoch_finished(self, seconds):
+        self.epoch_times.append(seconds)
+
+    def stop_before_next_epoch(self):
+        if self.stop_now():
+            return True
+        if self.budget_seconds and self.epoch_times:
+            expected = sum(self.epoch_times) / len(self.epoch_times)
+            if self.elapsed + expected > self.budget_seconds:
+                self.reason = "budget"
+                logger.info(f"⏰ Next epoch (~{expected:.0f}s) would overrun the budget; stopping")
+                return True
+        return False
+
+    @property
+    def interrupted(self):
+        """Stopped by a signal (resume later) rather than by the budget (run is done)"""
+        return self.reason not in (None, "budget")
+
+
+# 🚀 ultralytics --------------------------------------------------------------
+
+def latest_yolo_checkpoint(project, name):
+    """
+    last.pt of an unfinished run in project/name, or None. ultralytics marks a
+    finished run by stripping the optimizer and setting epoch to -1.
+    """
+    last = Path(project) / name / "weights" / "last.pt"
+    if not last.exists():
+        return None
+    import torch
+
+    checkpoint = torch.load(last, map_location="cpu")
+    if checkpoint.get("epoch", -1) < 0 or checkpoint.get("optimizer") is None:
+        return None
+    logger.info(f"⏯️ Resuming from {last} (epoch {checkpoint['epoch'] + 1} done)")
+    return last
+
+
+def finish_yolo_run(trainer):
+    """Marks last.pt / best.pt as a finished run (epoch -1, no optimizer), if they exist"""
+    from ultralytics.utils.torch_utils import strip_optimizer
+
+    for weights in (trainer.last, trainer.best):
+        if Path(weights).exists():
+            strip_optimizer(weights)
+
+
+def attach_yolo_stop(model, controller):
+    """
+    Registers the stop checks on a YOLO model. A budget stop between epochs ends
+    the run through trainer.stop (final validation and best.pt still happen). A
+    signal between epochs raises TrainingInterrupted right after last.pt is
+    written; mid-epoch, last.pt is first written with the epoch marked as not done.
+    A budget stop mid-epoch ends the run: the partial epoch is dropped and last.pt /
+    best.pt are stripped like ultralytics' final eval does, so the next run with the
+    same name starts fresh instead of resuming a finished run.
+    """
+    epoch_started = {}
+
+    def on_train_epoch_start(trainer):
+        epoch_started["t"] = time.monotonic()
+
+    def on_train_batch_end(trainer):
+        if not controller.stop_now():
+            return
+        if not controller.interrupted:
+            finish_yolo_run(trainer)
+            raise TrainingInterrupted(controller.reason)
+        if trainer.epoch == 0:
+            # epoch -1 would mark the run as finished; there's nothing worth resuming yet
+            logger.warning("⚠️ Stopped during the first epoch; no checkpoint written")
+            raise TrainingInterrupted(controller.reason)
+        # Resume re-runs this epoch from the weights reached so far
+        trainer.epoch -= 1
+        # NaN never equals best_fitness, so best.pt isn't overwritten with a partial epoch
+        fitness, trainer.fitness = trainer.fitness, float("nan")
+        trainer.save_model()
+        trainer.epoch += 1
+        trainer.fitness = fitness
+        logger.info(f"💾 Checkpoint written to {trainer.last}")
+        raise TrainingInterrupted(controller.reason)
+
+    def on_fit_epoch_end(trainer):
+        # Fires after the epoch's checkpoint write, so last.pt already holds this epoch
+        controller.epoch_finished(time.monotonic() - epoch_started["t"])
+        if controller.interrupted:
+            # Not trainer.stop: the final eval would strip the optimizer from last.pt
+            raise TrainingInterrupted(controller.reason)
+        if controller.stop_before_next_epoch():
+            trainer.stop = True
+
+    model.add_callback("on_train_epoch_start", on_train_epoch_start)
+    model.add_callback("on_train_batch_end", on_train_batch_end)
+    model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+
+
+# 🧠 Keras --------------------------------------------------------------------
+
+class KerasCheckpointer:
+    """
+    tf.train.CheckpointManager over model, optimizer, next epoch, sampler epoch and
+    the best val_loss so far. The best weights (lowest val_loss) are also kept
+    separately for export; the stored val_loss keeps a resumed run from replacing
+    them with a worse epoch.
+    """
+
+    def __init__(self, model, checkpoint_dir, max_to_keep=3):
+        import tensorflow as tf
+
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.sampler_epoch = tf.Variable(-1, dtype=tf.int64, trainable=False)
+        self.best_val_loss = tf.Variable(float("inf"), dtype=tf.float64, trainable=False)
+        self.checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer, epoch=self.epoch,
+                                              sampler_epoch=self.sampler_epoch, best_val_loss=self.best_val_loss)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, str(self.checkpoint_dir), max_to_keep)
+        self.best_weights = self.checkpoint_dir / "best.weights.h5"
+        self.sampler = None
+        self.interrupted_epoch = None
+
+    def restore(self):
+        """Restores the latest checkpoint; returns the epoch to start at (0 if none)"""
+        if not self.manager.latest_checkpoint:
+            return 0
+        self.checkpoint.restore(self.manager.latest_checkpoint)
+        if self.sampler is not None:
+            self.sampler_hook(self.sampler)
+        logger.info(f"⏯️ Resuming from {self.manager.latest_checkpoint} at epoch {int(self.epoch.numpy())}")
+        return int(self.epoch.numpy())
+
+    def sampler_hook(self, sampler):
+        """build_dataset(sampler_hook=...): puts a restored sampler back at its saved position"""
+        self.sampler = sampler
+        if int(self.sampler_epoch.numpy()) >= 0:
+            sampler.epoch = int(self.sampler_epoch.numpy())
+
+    def save(self, next_epoch):
+        self.epoch.assign(next_epoch)
+        if self.sampler is not None:
+            self.sampler_epoch.assign(self.sampler.epoch)
+        path = self.manager.save()
+        logger.info(f"💾 Checkpoint written to {path} (next epoch {next_epoch})")
+        return path
+
+    def callbacks(self, controller, profiler=None):
+        """Keras callbacks: checkpoint every epoch, keep best weights, stop on signal/budget"""
+        import tensorflow as tf
+
+        checkpointer = self
+
+        class OrchestrationCallback(tf.keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self.epoch_started = time.monotonic()
+                self.stopped_mid_epoch = False
+
+            def on_train_batch_end(self, batch, logs=None):
+                if controller.stop_now():
+                    self.stopped_mid_epoch = self.model.stop_training = True
+
+            def on_epoch_end(self, epoch, logs=None):
+                # Same rule as the ModelCheckpoint below, which sees the same logs
+                val_loss = (logs or {}).get("val_loss")
+                if val_loss is not None and val_loss < float(checkpointer.best_val_loss.numpy()):
+                    checkpointer.best_val_loss.assign(val_loss)
+                if self.stopped_mid_epoch:
+                    # Partial epoch: train_with_checkpoints saves it as not done
+                    checkpointer.interrupted_epoch = epoch
+                    return
+                controller.epoch_finished(time.monotonic() - self.epoch_started)
+                if profiler:
+                    with profiler.checkpoint():
+                        checkpointer.save(epoch + 1)
+                else:
+                    checkpointer.save(epoch + 1)
+                if controller.stop_before_next_epoch():
+                    self.model.stop_training = True
+
+        # Start from the restored best, not inf, so the first resumed epoch must beat it
+        best_so_far = float(self.best_val_loss.numpy())
+        best = tf.keras.callbacks.ModelCheckpoint(
+            str(self.best_weights), monitor="val_loss", save_best_only=True, save_weights_only=True,
+            initial_value_threshold=best_so_far if best_so_far != float("inf") else None)
+        return [OrchestrationCallback(), best]
+
+
+def train_with_checkpoints(model, train_ds, val_ds, epochs, checkpointer, controller, callbacks=(), profiler=None):
+    """
+    🏋️ model.fit with resume, checkpoints and graceful stop.
+    Returns (history, interrupted). When the run ends (finished or budget), the
+    best weights are loaded back into model so the caller exports them.
+    """
+    initial_epoch = checkpointer.restore()
+    if initial_epoch >= epochs:
+        logger.info(f"✅ Checkpoint already covers all {epochs} epochs")
+        history = None
+    else:
+        orchestration = checkpointer.callbacks(controller, profiler)
+        history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, initial_epoch=initial_epoch,
+                            callbacks=list(callbacks) + orchestration)
+
+    if checkpointer.interrupted_epoch is not None:
+        # Weights are mid-epoch: save them with the epoch still marked as not done
+        checkpointer.save(checkpointer.interrupted_epoch)
+    if controller.interrupted:
+        return history, True
+
+    if checkpointer.best_weights.exists():
+        model.load_weights(str(checkpointer.best_weights))
+        logger.info(f"🏆 Loaded best weights from {checkpointer.best_weights}")
+    return history, False
@@ -0,0 +1,334 @@
+"""
+⏱️ Training Run Profiler
+
+Per-epoch telemetry for both trainers, so we can tell whether CPU training is
+input-bound or compute-bound before buying hardware:
+
+- wall time, images/sec
+- data-loader wait vs compute time
+- peak RSS
+- checkpoint write time
+- optional sampling profile (top hot functions) for one chosen epoch
+
+Every epoch is appended to a JSON Lines log as it finishes; a summary row and
+table are written when the run ends.
+
+Hooks:
+    Keras         keras_profiler_callback(profiler, batch_size) in model.fit(callbacks=...)
+    ultralytics   attach_yolo_profiler(model, profiler) before model.train()
+
+Keras runs the tf.data fetch inside its compiled train step, so there the
+"data wait" is the host-side gap between steps; probe_loader() additionally
+times the input pipeline on its own so the two rates can be compared.
+ultralytics fetches batches in Python, so its data wait is exact.
+
+Usage:
+    python training_profiler.py runs/profile.jsonl        # summary table of a finished log
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmark_tflite import peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Above this share of epoch time spent waiting for data, the run is called input-bound
+INPUT_BOUND_WAIT_FRACTION = 0.2
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_TOP_FUNCTIONS = 25
+
+
+class SamplingProfiler:
+    """
+    Stdlib sampling profiler: a daemon thread snapshots the target thread's stack
+    every interval and counts self (innermost frame) and inclusive hits per function.
+    Cheap enough to leave on for a whole epoch, unlike cProfile.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.self_hits = Counter()
+        self.total_hits = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            innermost = True
+            while frame is not None:
+                code = frame.f_code
+                name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                if innermost:
+                    self.self_hits[name] += 1
+                    innermost = False
+                if name not in seen:
+                    self.total_hits[name] += 1
+                    seen.add(name)
+                frame = frame.f_back
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def top(self, n=DEFAULT_TOP_FUNCTIONS):
+        if not self.samples:
+            return []
+        return [{"function": name, "self_pct": round(100 * hits / self.samples, 1),
+                 "total_pct": round(100 * self.total_hits[name] / self.samples, 1)}
+                for name, hits in self.self_hits.most_common(n)]
+
+
+class RunProfiler:
+    """
+    Framework-neutral timing state for one training run. The trainer hooks call
+    epoch_start / batch_start / batch_end / epoch_end; checkpoint() times saves.
+    """
+
+    def __init__(self, log_path, profile_epoch=None, run_info=None):
+        self.log_path = Path(log_path)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile_epoch = profile_epoch
+        self.epochs = []
+        self.loader_probe = None
+        self._epoch = None
+        self._sampler = None
+        self._write({"event": "start", "time": time.time(), **(run_info or {})})
+
+    def _write(self, record):
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def epoch_start(self, epoch):
+        now = time.perf_counter()
+        self._epoch = {"epoch": epoch, "images": 0, "batches": 0, "data_wait_s": 0.0, "compute_s": 0.0,
+                       "checkpoint_s": 0.0}
+        self._epoch_started = self._last_batch_end = now
+        if self.profile_epoch == epoch:
+            self._sampler = SamplingProfiler()
+            self._sampler.start()
+
+    def batch_start(self):
+        now = time.perf_counter()
+        self._epoch["data_wait_s"] += now - self._last_batch_end
+        self._batch_started = now
+
+    def batch_end(self, images):
+        now = time.perf_counter()
+        self._epoch["compute_s"] += now - self._batch_started
+        self._epoch["images"] += int(images)
+        self._epoch["batches"] += 1
+        self._last_batch_end = now
+
+    @contextmanager
+    def checkpoint(self):
+        """Times a checkpoint write (counted toward the current epoch, or the run if none)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if self._epoch is not None:
+                self._epoch["checkpoint_s"] += elapsed
+            else:
+                self._write({"event": "checkpoint", "seconds": round(elapsed, 4)})
+
+    def epoch_end(self, **extra):
+        """Closes the epoch and appends it to the log; extra holds e.g. losses"""
+        record = self._epoch
+        self._epoch = None
+        wall = time.perf_counter() - self._epoch_started
+        record.update({
+            "event": "epoch",
+            "wall_s": round(wall, 3),
+            "images_per_sec": round(record["images"] / wall, 2) if wall > 0 else 0.0,
+            "data_wait_fraction": round(record["data_wait_s"] / wall, 4) if wall > 0 else 0.0,
+            "data_wait_s": round(record["data_wait_s"], 3),
+            "compute_s": round(record["compute_s"], 3),
+            "checkpoint_s": round(record["checkpoint_s"], 4),
+            "peak_rss_mb": peak_rss_mb(),
+            **extra,
+        })
+        if self._sampler is not None:
+            self._sampler.stop()
+            record["hot_functions"] = self._sampler.top()
+            self._sampler = None
+        self.epochs.append(record)
+        self._write(record)
+        logger.info(f"⏱️ epoch {record['epoch']}: {record['wall_s']}s, {record['images_per_sec']} img/s, "
+                    f"data wait {record['data_wait_fraction']:.0%}, peak RSS {record['peak_rss_mb']} MB")
+        return record
+
+    def probe_loader(self, dataset, batches=20):
+        """
+        Times the input pipeline alone for a few batches (Keras path), so the loader's
+        ceiling can be compared with the training rate.
+        """
+        images = 0
+        iterator = iter(dataset)
+        next(iterator)  # first batch pays for graph tracing / worker start-up
+        started = time.perf_counter()
+        for _ in range(batches):
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            inputs = batch[0] if isinstance(batch, tuple) else batch
+            images += int(inputs.shape[0])
+        elapsed = time.perf_counter() - started
+        self.loader_probe = {"batches": batches, "images": images, "seconds": round(elapsed, 3),
+                             "images_per_sec": round(images / elapsed, 2) if elapsed > 0 else 0.0}
+        self._write({"event": "loader_probe", **self.loader_probe})
+        return self.loader_probe
+
+    def finish(self):
+        summary = summarize(self.epochs, self.loader_probe)
+        self._write({"event": "summary", **summary})
+        for line in summary_table(self.epochs, summary):
+            logger.info(line)
+        return summary
+
+
+def summarize(epochs, loader_probe=None):
+    """Run totals and an input-bound / compute-bound verdict"""
+    if not epochs:
+        return {"epochs": 0}
+    wall = sum(e["wall_s"] for e in epochs)
+    images = sum(e["images"] for e in epochs)
+    wait = sum(e["data_wait_s"] for e in epochs)
+    summary = {
+        "epochs": len(epochs),
+        "wall_s": round(wall, 2),
+        "images": images,
+        "images_per_sec": round(images / wall, 2) if wall > 0 else 0.0,
+        "data_wait_fraction": round(wait / wall, 4) if wall > 0 else 0.0,
+        "checkpoint_s": round(sum(e["checkpoint_s"] for e in epochs), 3),
+        "peak_rss_mb": max((e["peak_rss_mb"] or 0) for e in epochs) or None,
+    }
+    input_bound = summary["data_wait_fraction"] > INPUT_BOUND_WAIT_FRACTION
+    if loader_probe:
+        summary["loader_images_per_sec"] = loader_probe["images_per_sec"]
+        # A loader that can barely outrun training will stall it as soon as anything else competes for CPU
+        input_bound = input_bound or loader_probe["images_per_sec"] < 1.2 * summary["images_per_sec"]
+    summary["verdict"] = "input-bound" if input_bound else "compute-bound"
+    return summary
+
+
+def summary_table(epochs, summary):
+    header = f"{'epoch':>5} {'wall s':>9} {'img/s':>9} {'wait %':>7} {'compute s':>10} {'ckpt s':>8} {'RSS MB':>8}"
+    lines = [header, "-" * len(header)]
+    for e in epochs:
+        lines.append(f"{e['epoch']:>5} {e['wall_s']:>9.2f} {e['images_per_sec']:>9.1f} "
+                     f"{100 * e['data_wait_fraction']:>6.1f}% {e['compute_s']:>10.2f} "
+                     f"{e['checkpoint_s']:>8.3f} {e['peak_rss_mb'] or 0:>8.0f}")
+    lines.append("-" * len(header))
+    lines.append(f"{summary['epochs']} epochs, {summary['images_per_sec']} img/s, "
+                 f"data wait {100 * summary['data_wait_fraction']:.1f}% -> {summary['verdict']}")
+    return lines
+
+
+def keras_profiler_callback(profiler, batch_size):
+    """tf.keras Callback feeding a RunProfiler (TensorFlow is only imported here)"""
+    import tensorflow as tf
+
+    class KerasProfilerCallback(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            profiler.epoch_start(epoch)
+
+        def on_train_batch_begin(self, batch, logs=None):
+            profiler.batch_start()
+
+        def on_train_batch_end(self, batch, logs=None):
+            # The train split is batched with drop_remainder, so every step has batch_size images
+            profiler.batch_end(batch_size)
+
+        def on_epoch_end(self, epoch, logs=None):
+            profiler.epoch_end(**{k: round(float(v), 5) for k, v in (logs or {}).items()})
+
+        def on_train_end(self, logs=None):
+            profiler.finish()
+
+    return KerasProfilerCallback()
+
+
+def attach_yolo_profiler(model, profiler):
+    """
+    Registers ultralytics callbacks on a YOLO model. on_train_batch_start fires after
+    the batch has been fetched, so the gap since the previous step is loader wait.
+    save_model() is wrapped to time checkpoint writes.
+    """
+    def on_pretrain_routine_end(trainer):
+        save_model = trainer.save_model
+
+        def timed_save_model():
+            with profiler.checkpoint():
+                return save_model()
+
+        trainer.save_model = timed_save_model
+
+    def on_train_batch_end(trainer):
+        profiler.batch_end(trainer.batch_size)
+
+    def on_fit_epoch_end(trainer):
+        # Fires after validation and the checkpoint write of the epoch
+        profiler.epoch_end(**{k: round(float(v), 5) for k, v in (trainer.metrics or {}).items()})
+
+    model.add_callback("on_pretrain_routine_end", on_pretrain_routine_end)
+    model.add_callback("on_train_epoch_start", lambda trainer: profiler.epoch_start(trainer.epoch))
+    model.add_callback("on_train_batch_start", lambda trainer: profiler.batch_start())
+    model.add_callback("on_train_batch_end", on_train_batch_end)
+    model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+    model.add_callback("on_train_end", lambda trainer: profiler.finish())
+
+
+def load_log(log_path):
+    epochs, probe = [], None
+    with open(log_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["event"] == "epoch":
+                epochs.append(record)
+            elif record["event"] == "loader_probe":
+                probe = record
+    return epochs, probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description='⏱️ Summarize a training profile log')
+    parser.add_argument('log', help='JSON Lines log written by a profiled training run')
+    parser.add_argument('--hot', action='store_true', help='Also print the sampled hot functions')
+    args = parser.parse_args()
+
+    epochs, probe = load_log(args.log)
+    summary = summarize(epochs, probe)
+    print("\n".join(summary_table(epochs, summary)))
+    if args.hot:
+        for epoch in epochs:
+            for entry in epoch.get("hot_functions", []):
+                print(f"epoch {epoch['epoch']}: {entry['self_pct']:>5.1f}% self "
+                      f"{entry['total_pct']:>5.1f}% total  {entry['function']}")
+
+
+if __name__ == '__main__':
+    main()
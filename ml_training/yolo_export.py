@@ -0,0 +1,331 @@
+"""
+📤 Host-side YOLO Export
+
+Bulk version of JerseyDatasetCollector.exportToYOLOFormat that runs on the
+training machine instead of the phone. Reads the pulled
+jersey_validation_data.json export and/or a directory of per-sample annotation
+JSON, and writes an ultralytics dataset:
+
+    <output>/labels/<image path>.txt   one `class cx cy w h` line per box (image suffix replaced)
+    <output>/images/<image path>       hard links to the source images (--images)
+    <output>/dataset.yaml
+
+Subdirectories of the image paths are mirrored under labels/ and images/, the
+way ultralytics pairs images/x/a.jpg with labels/x/a.txt. Two images that would
+share a label file (a.jpg and a.png) can't both be represented: the first one
+seen keeps it and the other's annotations are counted as label_collisions.
+
+- The export JSON is parsed incrementally (one record at a time), so multi-GB
+  exports never sit in memory; only the label lines are kept until written.
+- Every annotation for the same image becomes one line in that image's label
+  file, so frames with several players keep all their boxes.
+- Label files whose content is unchanged are not rewritten, and labels of
+  images that are no longer annotated are removed: re-running is a no-op.
+
+Usage:
+    python yolo_export.py --export jersey_validation_data.json --output yolo_export
+    python yolo_export.py --annotations data/annotations --images data/images --output yolo_export
+    python yolo_export.py --annotations data/annotations --output yolo_export --val-fraction 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from jersey_annotations import (
+    NUM_CLASSES,
+    is_validation_sample,
+    iter_annotation_files,
+    load_annotation,
+    normalize_annotation,
+    write_yolo_dataset_yaml,
+    yolo_label_line,
+)
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 1 << 20  # bytes read from the export per step
+WRITE_BATCH = 512     # label files per writer task
+# Keys under which an export object may hold its sample list
+RECORD_KEYS = ("annotations", "samples", "data", "items")
+
+_decoder = json.JSONDecoder()
+
+
+# 📖 Reading ----------------------------------------------------------------
+
+class _JsonStream:
+    """Minimal pull parser over a text file: enough to walk one top-level container"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.f.read(READ_CHUNK)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at EOF"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more input until it fits"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer might continue in the next chunk
+            if end == len(self.buffer) and isinstance(value, (int, float)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_export_records(path):
+    """
+    Streams JerseyAnnotation records from an export: a top-level array, or an
+    object with the list under one of RECORD_KEYS (other keys are skipped).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f)
+        if stream.peek() == "[":
+            yield from stream.array_items()
+            return
+
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key in RECORD_KEYS and stream.peek() == "[":
+                yield from stream.array_items()
+            else:
+                stream.value()
+            if stream.expect(",}") == "}":
+                return
+
+
+def iter_annotations(export=None, annotations_dir=None):
+    """Normalized annotations from the export JSON and/or per-sample files; malformed ones are counted"""
+    sources = []
+    if export:
+        sources.append(iter_export_records(export))
+    if annotations_dir:
+        sources.append(_iter_annotation_dir(annotations_dir))
+    for source in sources:
+        for record in source:
+            yield normalize_annotation(record) if isinstance(record, dict) else None
+
+
+def _iter_annotation_dir(annotations_dir):
+    for path in iter_annotation_files(annotations_dir):
+        try:
+            yield load_annotation(path)
+        except (OSError, ValueError):
+            yield None
+
+
+# ✍️ Writing ----------------------------------------------------------------
+
+def _write_if_changed(path, content):
+    """Returns True if the file had to be (re)written"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return True
+
+
+def _link_image(source, target):
+    """Hard link (no copy) when possible; returns True if the target was created"""
+    if target.exists():
+        if target.stat().st_size == source.stat().st_size:
+            return False
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    return True
+
+
+def label_key(image_path):
+    """Image path relative to the images root, without its suffix ('x/a.jpg' -> 'x/a'); None if it escapes the root"""
+    path = PurePosixPath(str(image_path).replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts or not path.name:
+        return None
+    return path.with_suffix("").as_posix()
+
+
+def _write_batch(labels_dir, items, images_src, images_dst):
+    written = linked = missing = 0
+    for key, (image_path, lines) in items:
+        label_path = labels_dir / f"{key}.txt"
+        label_path.parent.mkdir(parents=True, exist_ok=True)
+        written += _write_if_changed(label_path, "\n".join(lines) + "\n")
+        if images_src:
+            source = images_src / image_path
+            if source.exists():
+                target = images_dst / image_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                linked += _link_image(source, target)
+            else:
+                missing += 1
+    return written, linked, missing
+
+
+def export_yolo(output_dir, export=None, annotations_dir=None, images_dir=None, val_fraction=0.0, workers=None):
+    """
+    🚀 Converts annotations to an ultralytics dataset in output_dir.
+    Returns a summary with annotations/sec and how many files actually changed.
+    """
+    output_dir = Path(output_dir)
+    labels_dir = output_dir / "labels"
+    images_dst = output_dir / "images"
+    labels_dir.mkdir(parents=True, exist_ok=True)
+    images_src = Path(images_dir) if images_dir else None
+    if images_src:
+        images_dst.mkdir(exist_ok=True)
+
+    started = time.perf_counter()
+    # label key -> (image_path, label lines); duplicates of the same box collapse to one line
+    images, annotations, skipped, collisions = {}, 0, 0, 0
+    for annotation in iter_annotations(export, annotations_dir):
+        try:
+            if annotation is None or not 0 <= int(annotation["jersey_number"]) < NUM_CLASSES:
+                raise ValueError
+            line = yolo_label_line(annotation)
+            key = label_key(annotation["image_path"])
+            if key is None:
+                raise ValueError
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            skipped += 1
+            continue
+        image_path = annotation["image_path"]
+        owner, lines = images.setdefault(key, (image_path, []))
+        if owner != image_path:
+            collisions += 1
+            continue
+        if line not in lines:
+            lines.append(line)
+        annotations += 1
+    parsed = time.perf_counter()
+
+    items = list(images.items())
+    batches = [items[i:i + WRITE_BATCH] for i in range(0, len(items), WRITE_BATCH)]
+    workers = max(1, workers or min(32, (os.cpu_count() or 1) * 4))
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(lambda batch: _write_batch(labels_dir, batch, images_src, images_dst), batches))
+    written = sum(r[0] for r in results)
+    linked = sum(r[1] for r in results)
+    missing_images = sum(r[2] for r in results)
+
+    # Labels of images that are no longer annotated would otherwise linger as stale ground truth
+    removed = 0
+    for root, _dirs, files in os.walk(labels_dir):
+        for name in files:
+            path = Path(root) / name
+            if name.endswith(".txt") and path.relative_to(labels_dir).with_suffix("").as_posix() not in images:
+                os.unlink(path)
+                removed += 1
+    if collisions:
+        logger.warning(f"⚠️ {collisions} annotations skipped: their image shares a label file with another "
+                       f"image (same path apart from the suffix)")
+
+    if val_fraction > 0:
+        # Image lists keyed by the same deterministic split as the Keras pipeline
+        train, val = [], []
+        for image_path, _ in images.values():
+            (val if is_validation_sample(image_path, val_fraction) else train).append(f"./images/{image_path}")
+        _write_if_changed(output_dir / "train.txt", "\n".join(sorted(train)) + "\n")
+        _write_if_changed(output_dir / "val.txt", "\n".join(sorted(val)) + "\n")
+        write_yolo_dataset_yaml(output_dir, train="train.txt", val="val.txt")
+    else:
+        write_yolo_dataset_yaml(output_dir)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "output": str(output_dir),
+        "annotations": annotations,
+        "images": len(images),
+        "multi_object_images": sum(len(lines) > 1 for _, lines in images.values()),
+        "skipped": skipped,
+        "label_collisions": collisions,
+        "labels_written": written,
+        "labels_unchanged": len(images) - written,
+        "labels_removed": removed,
+        "images_linked": linked,
+        "images_missing": missing_images,
+        "parse_seconds": round(parsed - started, 2),
+        "seconds": round(elapsed, 2),
+        "annotations_per_sec": round(annotations / elapsed) if elapsed > 0 else None,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='📤 Convert app annotations to a YOLO dataset')
+    parser.add_argument('--export', help='jersey_validation_data.json pulled from the device')
+    parser.add_argument('--annotations', help='Directory of per-sample annotation JSON')
+    parser.add_argument('--images', help='Source images to hard-link into <output>/images')
+    parser.add_argument('--output', default='yolo_export', help='Dataset directory')
+    parser.add_argument('--val-fraction', type=float, default=0.0,
+                        help='Write train.txt/val.txt with this validation share (0 = train and val on all images)')
+    parser.add_argument('--workers', type=int, help='Writer threads')
+    args = parser.parse_args()
+    if not args.export and not args.annotations:
+        parser.error("give --export and/or --annotations")
+
+    summary = export_yolo(args.output, args.export, args.annotations, args.images, args.val_fraction, args.workers)
+    logger.info(f"✅ {summary['annotations']} annotations -> {summary['images']} label files "
+                f"({summary['labels_written']} written, {summary['labels_removed']} removed) "
+                f"at {summary['annotations_per_sec']} annotations/sec")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Training Pipeline Monitor
+Streams the app's pipeline logcat output (TrainingPipeline, Export, Training,
+Convert, Deploy tags) and turns it into structured events with per-stage
+durations:
+
+    export -> yolo_conversion -> training -> tflite_conversion -> deploy
+
+Events are appended to a JSON Lines time series as they happen; only the
+currently open stages and running totals are kept in memory, so multi-hour
+streams don't grow the process.
+
+Usage:
+    python pipeline_monitor.py --output pipeline_events.jsonl             # live device
+    python pipeline_monitor.py --until deploy --timeout 7200              # stop when deployed
+    python pipeline_monitor.py --replay recorded_logcat.txt --output e.jsonl
+    (record with: adb logcat -v threadtime > recorded_logcat.txt)
+
+tests/test_pipeline_monitor.py replays tests/fixtures/pipeline_logcat.txt (python -m pytest tests).
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+from adb_driver import LOG_TAGS, adb_command, find_adb
+
+# (stage, event, tag, pattern). Error rules win over end rules for the same line.
+STAGE_RULES = [
+    ("export", "start", "TrainingPipeline", r"Starting .*export"),
+    ("export", "end", "TrainingPipeline", r"exported successfully"),
+    ("export", "error", "TrainingPipeline", r"Failed to export|Export error"),
+    # The Export tag only logs the outcome; the conversion is the first step of the TrainingPipeline export
+    ("yolo_conversion", "start", "TrainingPipeline", r"Starting .*export"),
+    ("yolo_conversion", "end", "Export", r"Exported \d+ training samples"),
+    ("yolo_conversion", "error", "Export", r"Export failed|No training samples"),
+    ("training", "start", "Training", r"Starting model training"),
+    ("training", "end", "Training", r"Exporting trained model|Training completed with exit code"),
+    ("training", "error", "Training", r"Training failed|exit code: (?!0\b)-?\d+"),
+    ("tflite_conversion", "start", "Training", r"Exporting trained model"),
+    ("tflite_conversion", "end", "Training", r"TensorFlow Lite model exported"),
+    ("tflite_conversion", "error", "Convert", r"Conversion failed"),
+    ("deploy", "start", "Training", r"Training completed with exit code: 0"),
+    ("deploy", "end", "Deploy", r"Model deployed to"),
+    ("deploy", "error", "Deploy", r"not found|Failed|failed"),
+]
+STAGES = ("export", "yolo_conversion", "training", "tflite_conversion", "deploy")
+
+# "10-16 21:04:15.123  1234  1256 D TrainingPipeline: message"  (logcat -v threadtime)
+THREADTIME_LINE = re.compile(r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d{3})\s+\d+\s+\d+\s+([VDIWEF])\s+(.+?)\s*: (.*)$")
+# "D/TrainingPipeline( 1234): message"  (logcat -v brief)
+BRIEF_LINE = re.compile(r"^([VDIWEF])/(.+?)\(\s*\d+\): (.*)$")
+PERCENT = re.compile(r"(\d{1,3}(?:\.\d+)?)%")
+FRACTION = re.compile(r"\b(\d+)/(\d+)\b")
+
+
+def parse_line(line, now=None):
+    """Returns (timestamp, level, tag, message) or None for lines that aren't log entries"""
+    match = THREADTIME_LINE.match(line)
+    if match:
+        stamp, level, tag, message = match.groups()
+        # threadtime has no year; assume the current one
+        timestamp = datetime.strptime(f"{datetime.now().year}-{stamp}", "%Y-%m-%d %H:%M:%S.%f").timestamp()
+        return timestamp, level, tag, message
+    match = BRIEF_LINE.match(line)
+    if match:
+        level, tag, message = match.groups()
+        return (now if now is not None else time.time()), level, tag.strip(), message
+    return None
+
+
+def parse_progress(message):
+    """0-1 progress from 'NN%' or 'i/N' in a message, else None"""
+    match = PERCENT.search(message)
+    if match:
+        return min(float(match.group(1)) / 100.0, 1.0)
+    match = FRACTION.search(message)
+    if match and int(match.group(2)) > 0:
+        return min(int(match.group(1)) / int(match.group(2)), 1.0)
+    return None
+
+
+class PipelineMonitor:
+    """
+    Incremental parser: feed() log lines in order, get structured events back.
+    Memory is bounded by the number of stages, not the length of the stream.
+    """
+
+    def __init__(self, output=None, rules=STAGE_RULES):
+        self.rules = [(stage, event, tag, re.compile(pattern)) for stage, event, tag, pattern in rules]
+        self.output = output
+        self.first_timestamp = None
+        self.last_boundary = None
+        self.open_stages = {}  # stage -> start timestamp
+        self.last_progress = {}  # stage -> last reported percent
+        self.totals = {stage: {"runs": 0, "errors": 0, "total_s": 0.0, "last_s": None,
+                               "min_s": None, "max_s": None} for stage in STAGES}
+        self.lines = 0
+        self.events = 0
+        self.finished = set()  # stages that ended (ok or error) since they last started
+        self.failed = False
+
+    def _emit(self, timestamp, stage, event, tag, message, **extra):
+        record = {
+            "time": datetime.fromtimestamp(timestamp).isoformat(timespec="milliseconds"),
+            "elapsed_s": round(timestamp - self.first_timestamp, 3),
+            "stage": stage,
+            "event": event,
+            "tag": tag,
+            "message": message,
+            **extra,
+        }
+        self.events += 1
+        if self.output:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+        return record
+
+    def _close(self, stage, timestamp, event, tag, message):
+        # An end without a seen start began at the previous stage boundary
+        started = self.open_stages.pop(stage, self.last_boundary if self.last_boundary is not None else timestamp)
+        duration = round(timestamp - started, 3)
+        totals = self.totals[stage]
+        if event == "end":
+            totals["runs"] += 1
+            totals["total_s"] = round(totals["total_s"] + duration, 3)
+            totals["last_s"] = duration
+            totals["min_s"] = duration if totals["min_s"] is None else min(totals["min_s"], duration)
+            totals["max_s"] = duration if totals["max_s"] is None else max(totals["max_s"], duration)
+        else:
+            totals["errors"] += 1
+            self.failed = True
+        self.last_progress.pop(stage, None)
+        self.last_boundary = timestamp
+        self.finished.add(stage)
+        return self._emit(timestamp, stage, event, tag, message, duration_s=duration)
+
+    def feed(self, line, now=None):
+        """Parses one logcat line; returns the list of events it produced"""
+        parsed = parse_line(line.rstrip("\r\n"), now)
+        if parsed is None:
+            return []
+        timestamp, _level, tag, message = parsed
+        self.lines += 1
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+
+        matches = {}
+        for stage, event, rule_tag, pattern in self.rules:
+            if rule_tag == tag and pattern.search(message):
+                matches.setdefault(stage, set()).add(event)
+
+        events = []
+        for stage, kinds in matches.items():
+            if "error" in kinds:
+                events.append(self._close(stage, timestamp, "error", tag, message))
+                continue
+            # A second end line for a stage that already closed (e.g. exit code after export) is ignored
+            if "end" in kinds and (stage in self.open_stages or stage not in self.finished):
+                events.append(self._close(stage, timestamp, "end", tag, message))
+            if "start" in kinds and stage not in self.open_stages:
+                self.open_stages[stage] = timestamp
+                self.finished.discard(stage)
+                self.last_boundary = timestamp
+                events.append(self._emit(timestamp, stage, "start", tag, message))
+
+        if not events and self.open_stages:
+            # Progress belongs to the most recently started stage; only report whole-percent changes
+            progress = parse_progress(message)
+            if progress is not None:
+                stage = max(self.open_stages, key=self.open_stages.get)
+                percent = int(progress * 100)
+                if self.last_progress.get(stage) != percent:
+                    self.last_progress[stage] = percent
+                    events.append(self._emit(timestamp, stage, "progress", tag, message, progress=round(progress, 4)))
+        return events
+
+    def summary(self):
+        return {
+            "lines": self.lines,
+            "events": self.events,
+            "open_stages": sorted(self.open_stages),
+            "failed": self.failed,
+            "stages": self.totals,
+        }
+
+
+async def logcat_lines(adb=None, serial=None, tags=LOG_TAGS):
+    """Streams new logcat lines for tags from a device"""
+    command = adb_command(adb) if adb else find_adb()
+    if serial:
+        command += ["-s", serial]
+    filters = [f"{tag}:V" for tag in tags] + ["*:S"]
+    process = await asyncio.create_subprocess_exec(*command, "logcat", "-v", "threadtime", "-T", "1", *filters,
+                                                   stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.STDOUT)
+    try:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            yield line.decode("utf-8", errors="replace")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def replay_lines(path):
+    """Replays a recorded logcat file line by line (yields to the event loop as it goes)"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f):
+            if number % 1000 == 0:
+                await asyncio.sleep(0)
+            yield line
+
+
+async def run_monitor(lines, monitor, until=None, timeout=None, echo=True):
+    """
+    Consumes an async line source until it ends, `until` stage finishes,
+    a stage fails or timeout seconds pass. Returns the monitor summary.
+    """
+    async def consume():
+        async for line in lines:
+            for event in monitor.feed(line):
+                if echo:
+                    duration = f" ({event['duration_s']}s)" if "duration_s" in event else ""
+                    print(f"[{event['elapsed_s']:>9.1f}s] {event['stage']:<17} {event['event']:<8}{duration} "
+                          f"{event['message']}")
+            if monitor.failed or (until and until in monitor.finished):
+                return
+
+    try:
+        await asyncio.wait_for(consume(), timeout)
+    except asyncio.TimeoutError:
+        print(f"⏰ Monitor stopped after {timeout}s")
+    return monitor.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream and time the on-device training pipeline")
+    parser.add_argument("--serial", help="Device serial (adb devices)")
+    parser.add_argument("--adb", help="adb executable (default: ADB, ANDROID_SDK_ROOT or local.properties)")
+    parser.add_argument("--replay", help="Recorded logcat file to replay instead of a live device")
+    parser.add_argument("--output", help="Append events to this JSON Lines file")
+    parser.add_argument("--until", choices=STAGES, help="Stop once this stage finishes")
+    parser.add_argument("--timeout", type=float, help="Stop after this many seconds")
+    parser.add_argument("--quiet", action="store_true", help="Don't print events as they arrive")
+    args = parser.parse_args()
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    try:
+        lines = replay_lines(args.replay) if args.replay else logcat_lines(args.adb, args.serial)
+        summary = asyncio.run(run_monitor(lines, PipelineMonitor(output), args.until, args.timeout,
+                                          echo=not args.quiet))
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if output:
+            output.close()
+
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
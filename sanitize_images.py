@@ -1,14 +1,44 @@
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from PIL import Image
 
+from image_dedup import INDEX_NAME, NEAR_DUPLICATE_DISTANCE, DedupIndex, dhash, pixel_sha256
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # --- HOW TO USE ---
 # 1. Make sure you have the Pillow library installed. From your command prompt or terminal, run:
 #    pip install Pillow
 #
-# 2. Set the two folder paths below.
+# 2. Set the two folder paths below (or pass --input / --output on the command line).
 #
 # 3. Run this script from your terminal:
 #    python sanitize_images.py
+#
+#    Useful options:
+#    python sanitize_images.py --workers 8 --chunk-size 32 --summary summary.json
+#    python sanitize_images.py --max-side 640   # match the trainer's --img 640
+#    python sanitize_images.py --near-distance 8  # looser near-duplicate matching
+#
+#    Re-running is cheap: every processed file is recorded in a manifest inside the
+#    output folder, so files that were already cleaned are skipped and an interrupted
+#    run picks up where it stopped.
+#
+#    Duplicates are skipped too: the same photo under a different filename (exact
+#    pixel match) or a re-compressed/resized copy (perceptual hash match) is not
+#    written again. The duplicate index lives in the output folder as well, so every
+#    new batch is checked against everything imported before.
+#
+#    Outputs are named <name>.jpg. When two sources share a name (img1.png and
+#    img1.jpg) the second one becomes <name>_<hash>.jpg instead of overwriting it.
 # ------------------
 
 # --- Configuration ---
@@ -19,53 +49,392 @@ input_folder = "C:/ProgramData/ASUS/ASUS Live Update/Temp/images_to_clean"
 # Set this to a new, empty folder where the cleaned images will be saved.
 # Example: '''C:/Users/Ryan/Downloads/cleaned_images'''
 output_folder = "C:/ProgramData/ASUS/ASUS Live Update/Temp/cleaned_images"
+
+# Number of worker processes used for re-encoding (defaults to every CPU core).
+workers = os.cpu_count() or 1
+
+# Number of files handed to a worker at a time. Larger chunks mean less
+# scheduling overhead, smaller chunks mean a more even spread across workers.
+chunk_size = 16
+
+# Longest side of the saved images, in pixels. Large phone photos are decoded
+# at reduced scale (JPEG/MPO draft mode) and downscaled to fit. The trainers
+# run at 640px, so there is no point keeping 4000px originals around.
+# Set to None to keep the original resolution.
+max_side = None
+
+# Skip exact and near-duplicate images (see image_dedup.py).
+dedup = True
 # --- End Configuration ---
 
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.mpo')
+MANIFEST_NAME = ".sanitize_manifest.jsonl"
+JPEG_QUALITY = 95
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file's raw bytes without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Reads the append-only manifest. Later lines win, so a file that failed once
+    and succeeded on a re-run is reported as "ok".
+    Returns (entries by content hash, content hash by (source, size, mtime_ns),
+    latest "ok" entry by output name).
+    """
+    by_hash = {}
+    by_stat = {}
+    by_output = {}
+    if not os.path.exists(manifest_path):
+        return by_hash, by_stat, by_output
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a truncated last line; ignore it.
+                continue
+            by_hash[entry["sha256"]] = entry
+            by_stat[(entry["source"], entry["size"], entry["mtime_ns"])] = entry["sha256"]
+            if entry["status"] == "ok":
+                by_output[entry["output"]] = entry
+    return by_hash, by_stat, by_output
+
+
+def decode_image(input_path, max_side=None):
+    """
+    Decodes an image to RGB, never holding more pixels than needed.
+    For JPEG/MPO the decoder is put in draft mode, so libjpeg scales by 1/2,
+    1/4 or 1/8 while decoding and a 12MP photo is never fully materialized.
+    Anything still larger than max_side is then downscaled with reduce().
+    """
+    with Image.open(input_path) as img:
+        if max_side and img.format in ("JPEG", "MPO"):
+            img.draft("RGB", (max_side, max_side))
+        # Convert to RGB to handle formats like RGBA (PNG) or P (Palette).
+        rgb = img.convert('RGB')
+    if max_side and max(rgb.size) > max_side:
+        rgb.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return rgb
+
+
+def _sanitize_file(input_path, partial_path, max_side=None):
+    """
+    Re-saves one image as a clean JPEG under a temporary name and returns its
+    duplicate signatures. The parent process decides whether the file is kept
+    (renamed into place) or dropped as a duplicate, so an interrupted run never
+    leaves a half-written JPEG behind.
+    """
+    try:
+        img = decode_image(input_path, max_side)
+        signatures = pixel_sha256(img), dhash(img)
+        # Saving the decoded pixels as a standard JPEG strips problematic metadata.
+        img.save(partial_path, "JPEG", quality=JPEG_QUALITY)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return os.path.getsize(partial_path), signatures
+
+
+def _sanitize_chunk(jobs):
+    """Worker entry point: sanitizes a chunk of files and reports each outcome."""
+    results = []
+    for job in jobs:
+        result = dict(job)
+        started = time.perf_counter()
+        try:
+            result["output_bytes"], result["signatures"] = _sanitize_file(
+                job["input_path"], job["partial_path"], job["max_side"])
+            result["status"] = "ok"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 4)
+        results.append(result)
+    return results
+
+
+def _iter_images(input_dir):
+    """
+    Streams image entries with os.scandir instead of listing the whole folder.
+    Directory order is kept as-is; sorting would require materializing it.
+    """
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(SUPPORTED_EXTENSIONS) and entry.is_file():
+                yield entry
+
+
+def _output_name(filename, content_hash, owners):
+    """
+    <stem>.jpg, unless another source already owns that name (img1.png and img1.jpg):
+    then <stem>_<hash prefix>.jpg. owners maps output name -> source file name.
+    """
+    stem = os.path.splitext(filename)[0]
+    name = stem + '.jpg'
+    if owners.get(name, filename) != filename:
+        name = f"{stem}_{content_hash[:8]}.jpg"
+    owners[name] = filename
+    return name
+
+
+def _iter_jobs(input_dir, output_dir, manifest_by_hash, manifest_by_stat, manifest_by_output, stats, max_side,
+               owners):
+    """
+    Yields a job for every image that still needs sanitizing.
+    owners (output name -> source file name) is updated as names are handed out.
+    """
+    for dir_entry in _iter_images(input_dir):
+        filename = dir_entry.name
+        input_path = dir_entry.path
+        st = dir_entry.stat()
+
+        # Fast path: same name, size and mtime as a file we already hashed.
+        content_hash = manifest_by_stat.get((filename, st.st_size, st.st_mtime_ns))
+        if content_hash is None:
+            content_hash = file_sha256(input_path)
+
+        entry = manifest_by_hash.get(content_hash)
+        if entry and entry.get("max_side") == max_side:
+            if entry["status"] == "duplicate":
+                stats["duplicates"] += 1
+                continue
+            if (entry["status"] == "ok" and os.path.exists(os.path.join(output_dir, entry["output"]))
+                    and manifest_by_output[entry["output"]]["sha256"] == content_hash):
+                stats["skipped"] += 1
+                continue
+
+        # Create a new filename with a .jpg extension
+        sanitized_filename = _output_name(filename, content_hash, owners)
+        output_path = os.path.join(output_dir, sanitized_filename)
+        yield {
+            "source": filename,
+            "sha256": content_hash,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "output": sanitized_filename,
+            "input_path": input_path,
+            "output_path": output_path,
+            # Unique per source so same-named files in flight never collide.
+            "partial_path": f"{output_path}.{content_hash[:12]}.part",
+            "max_side": max_side,
+        }
+
+
+def _iter_chunks(jobs, size):
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if the platform can't tell."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+def _finalize(result, index, duplicate_clusters):
+    """
+    Runs in the parent: either moves the worker's output into place or drops
+    it as a duplicate of an image that is already in the index.
+    Output names are unique per source (see _output_name), so the file this result
+    writes is never a duplicate candidate: it is either this source's earlier
+    version (replaced) or, after a crash between rename and manifest write, this
+    very content (recognized by the source hash and not indexed twice).
+    """
+    pixel_hash, perceptual_hash = result["signatures"]
+    match = index.find(pixel_hash, perceptual_hash, exclude=result["output"]) if index is not None else None
+    if match:
+        kind, kept, distance = match
+        os.remove(result["partial_path"])
+        index.add(result["source"], pixel_hash, perceptual_hash, duplicate_of=kept)
+        result.update(status="duplicate", duplicate_of=kept)
+        duplicate_clusters.setdefault(kept, []).append(
+            {"file": result["source"], "match": kind, "distance": distance})
+        return
+
+    os.replace(result["partial_path"], result["output_path"])
+    if index is None:
+        return
+    own = index.entry(result["output"])
+    if own and own["source_sha256"] == result["sha256"] and own["pixel_sha256"] == pixel_hash:
+        return  # crash recovery: already indexed
+    index.add(result["output"], pixel_hash, perceptual_hash, source=result["source"],
+              source_sha256=result["sha256"])
 
-def sanitize_images():
+
+def sanitize_images(input_dir=None, output_dir=None, num_workers=None, chunk=None, manifest_path=None,
+                    max_side_px=None, use_dedup=None, near_distance=NEAR_DUPLICATE_DISTANCE):
     """
     Opens each image from the input folder and re-saves it as a clean JPEG,
     stripping all non-standard metadata that can cause import errors.
+
+    Work is spread across a process pool in chunks. Every result is appended to
+    a manifest (content hash -> output file + status) as soon as it is known,
+    so re-runs skip files that are already clean and a crashed run resumes.
+
+    The pipeline is streaming end to end (scandir -> decode -> downscale ->
+    encode -> write) with a fixed number of chunks in flight, so memory stays
+    flat regardless of how many images the input folder holds.
+
+    With dedup enabled, each decoded image is checked against a persistent
+    index of exact (pixel SHA-256) and perceptual (dHash) signatures; matches
+    are not written and are reported as duplicate clusters.
+
+    Returns a summary dict with counts, throughput and per-file failures.
     """
-    if not os.path.exists(input_folder) or "PATH_TO_YOUR_INPUT_IMAGES" in input_folder:
-        print("Error: Please set the 'input_folder' variable in this script.")
-        return
+    input_dir = input_dir or input_folder
+    output_dir = output_dir or output_folder
+    num_workers = max(1, num_workers or workers)
+    chunk = max(1, chunk or chunk_size)
+    max_side_px = max_side_px or max_side
+    use_dedup = dedup if use_dedup is None else use_dedup
 
-    if not os.path.exists(output_folder):
-        print(f"Creating output folder: {output_folder}")
-        os.makedirs(output_folder)
+    if not os.path.exists(input_dir) or "PATH_TO_YOUR_INPUT_IMAGES" in input_dir:
+        raise FileNotFoundError(f"Input folder not found: {input_dir}. "
+                                "Please set the 'input_folder' variable in this script or pass --input.")
 
-    print(f"Starting image sanitization...")
-    print(f"Input folder: {input_folder}")
-    print(f"Output folder: {output_folder}")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    manifest_by_hash, manifest_by_stat, manifest_by_output = load_manifest(manifest_path)
+
+    stats = {"sanitized": 0, "skipped": 0, "duplicates": 0, "failed": 0, "input_bytes": 0, "output_bytes": 0}
+    failures = []
+    duplicate_clusters = {}
+    index = DedupIndex(os.path.join(output_dir, INDEX_NAME), near_distance) if use_dedup else None
+    # Which source each output name belongs to; the index also knows outputs whose
+    # manifest line was lost in a crash
+    owners = {name: entry["source"] for name, entry in manifest_by_output.items()}
+    if index is not None:
+        owners.update({name: kept["source"] for name, kept in index.kept.items()
+                       if kept["source"] and name not in owners})
+    started = time.perf_counter()
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        def record(results):
+            for result in results:
+                if result["status"] == "ok":
+                    try:
+                        _finalize(result, index, duplicate_clusters)
+                    except OSError as e:
+                        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+
+                entry = {key: result.get(key) for key in
+                         ("sha256", "source", "size", "mtime_ns", "output", "max_side", "status",
+                          "duplicate_of", "error")}
+                manifest.write(json.dumps(entry) + "\n")
+                stats["input_bytes"] += result["size"]
+                if result["status"] == "ok":
+                    stats["sanitized"] += 1
+                    stats["output_bytes"] += result["output_bytes"]
+                elif result["status"] == "duplicate":
+                    stats["duplicates"] += 1
+                else:
+                    stats["failed"] += 1
+                    failures.append({"file": result["source"], "error": result["error"]})
+            # Flush after every chunk so a crash loses at most the chunks in flight.
+            manifest.flush()
+            if index is not None:
+                index.flush()
+
+        jobs = _iter_jobs(input_dir, output_dir, manifest_by_hash, manifest_by_stat, manifest_by_output, stats,
+                          max_side_px, owners)
+        chunks = _iter_chunks(jobs, chunk)
+
+        if num_workers == 1:
+            for chunk_jobs in chunks:
+                record(_sanitize_chunk(chunk_jobs))
+        else:
+            # Keep only a couple of chunks queued per worker instead of
+            # submitting the whole folder up front.
+            max_in_flight = num_workers * 2
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                in_flight = set()
+                for chunk_jobs in chunks:
+                    in_flight.add(executor.submit(_sanitize_chunk, chunk_jobs))
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            record(future.result())
+                for future in wait(in_flight).done:
+                    record(future.result())
+
+    if index is not None:
+        index.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "input_folder": input_dir,
+        "output_folder": output_dir,
+        "manifest": manifest_path,
+        "workers": num_workers,
+        "chunk_size": chunk,
+        "max_side": max_side_px,
+        "sanitized": stats["sanitized"],
+        "skipped": stats["skipped"],
+        "duplicates": stats["duplicates"],
+        "failed": stats["failed"],
+        "elapsed_seconds": round(elapsed, 3),
+        "images_per_sec": round((stats["sanitized"] + stats["duplicates"]) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mb_per_sec": round(stats["input_bytes"] / 1e6 / elapsed, 2) if elapsed > 0 else 0.0,
+        "input_mb": round(stats["input_bytes"] / 1e6, 3),
+        "output_mb": round(stats["output_bytes"] / 1e6, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "failures": failures,
+        "indexed_images": len(index) if index is not None else None,
+        # Clusters that gained a member in this run; "duplicates" also lists earlier runs.
+        "duplicate_clusters": [
+            {"kept": kept, "duplicates": index.clusters[kept], "new_matches": matches}
+            for kept, matches in duplicate_clusters.items()
+        ],
+    }
 
-    sanitized_count = 0
-    failed_count = 0
-    for filename in os.listdir(input_folder):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.mpo')):
-            try:
-                input_path = os.path.join(input_folder, filename)
-                
-                # Create a new filename with a .jpg extension
-                sanitized_filename = os.path.splitext(filename)[0] + '.jpg'
-                output_path = os.path.join(output_folder, sanitized_filename)
 
-                with Image.open(input_path) as img:
-                    # Convert to RGB to handle formats like RGBA (PNG) or P (Palette)
-                    # and save as a standard JPEG. This strips problematic metadata.
-                    img.convert('RGB').save(output_path, "JPEG", quality=95)
-                
-                sanitized_count += 1
-                print(f"  - Sanitized: {filename} -> {sanitized_filename}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-save images as clean JPEGs for dataset import.")
+    parser.add_argument("--input", default=input_folder, help="Folder containing images to clean")
+    parser.add_argument("--output", default=output_folder, help="Folder where cleaned images are written")
+    parser.add_argument("--workers", type=int, default=workers, help="Worker processes (1 = run in-process)")
+    parser.add_argument("--chunk-size", type=int, default=chunk_size, help="Files per worker task")
+    parser.add_argument("--max-side", type=int, default=max_side,
+                        help="Downscale so the longest side is at most this many pixels (e.g. 640)")
+    parser.add_argument("--no-dedup", action="store_true", help="Write duplicates instead of skipping them")
+    parser.add_argument("--near-distance", type=int, default=NEAR_DUPLICATE_DISTANCE,
+                        help="Max dHash Hamming distance (0-64) treated as a near-duplicate")
+    parser.add_argument("--manifest", help=f"Manifest path (default: <output>/{MANIFEST_NAME})")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file")
+    args = parser.parse_args(argv)
 
-            except Exception as e:
-                failed_count += 1
-                print(f"  - FAILED to process {filename}. Error: {e}")
+    try:
+        summary = sanitize_images(args.input, args.output, args.workers, args.chunk_size, args.manifest,
+                                  args.max_side, not args.no_dedup and dedup, args.near_distance)
+    except FileNotFoundError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 2
 
-    print(f"\nSanitization complete.")
-    print(f"Successfully processed: {sanitized_count}")
-    print(f"Failed: {failed_count}")
+    report = json.dumps(summary, indent=2)
+    print(report)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    return 1 if summary["failed"] else 0
 
 
 if __name__ == "__main__":
-    sanitize_images()
+    sys.exit(main())
@@ -2,102 +2,194 @@
 """
 Test script to verify enhanced positioning system
 Generates sample jersey images and analyzes positioning
+
+Single device:   python test_positioning.py --samples 10
+Every device:    python test_positioning.py --all-devices --samples 300 --pull ./device_samples
 """
 
-import subprocess
+import argparse
+import queue
 import time
 import json
-import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-def test_enhanced_positioning():
-    """Test the enhanced positioning system by generating samples"""
-    
-    print("🏈 Testing Enhanced Jersey Positioning System")
-    print("=" * 50)
-    
+from adb_driver import APP_PACKAGE, LOG_TAGS, AdbDriver, AdbError, list_devices
+
+# Candidate positions of the Jersey Validation entry
+NAV_POSITIONS = [
+    (540, 700),   # Main Jersey Validation button
+    (540, 800),   # Alternative position
+    (540, 900),   # Lower position
+    (270, 1400),  # Bottom navigation
+    (810, 1400),  # Right side navigation
+]
+GENERATION_TAPS = [(540, 1100), (540, 1200), (540, 1300)]
+SKIP_BUTTON = (810, 1200)
+# JerseyDatasetCollector.captureTrainingSample logs one of these per tap on "YES - CORRECT"
+COLLECTOR_TAG = "DatasetCollector"
+CAPTURED_PATTERN = r"Captured training sample"
+CAPTURE_FAILED_PATTERN = r"Failed to capture training sample"
+CAPTURE_TIMEOUT = 2  # seconds to wait for the save line after a tap
+DRIVER_LOG_TAGS = LOG_TAGS + (COLLECTOR_TAG,)
+# Where JerseyDatasetCollector stores samples (getExternalFilesDir(null)/jersey_dataset)
+DEVICE_DATASET_DIR = f"/sdcard/Android/data/{APP_PACKAGE}/files/jersey_dataset"
+
+def prepare_device(device, prefix=""):
+    """Makes sure the app is running and showing the Jersey Validation screen"""
     # Check if app is running
     try:
-        result = subprocess.run([
-            "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe", 
-            "shell", "dumpsys", "activity", "activities"
-        ], capture_output=True, text=True, timeout=10)
-        
-        if "com.playerid.app" in result.stdout:
-            print("✅ PlayerID app is running")
+        if device.is_app_running():
+            print(f"{prefix}✅ PlayerID app is running")
         else:
-            print("❌ PlayerID app not found, starting...")
-            subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "am", "start", "-n", "com.playerid.app/.MainActivity"
-            ], timeout=10)
-            time.sleep(3)
-    
-    except Exception as e:
-        print(f"⚠️  Error checking app status: {e}")
-    
+            print(f"{prefix}❌ PlayerID app not found, starting...")
+            device.start_app()
+    except (AdbError, TimeoutError) as e:
+        print(f"{prefix}⚠️  Error checking app status: {e}")
+
+    # Stream the collector's log from here on, so no save line is missed
+    device.start_logcat()
+
     # Navigate to Jersey Validation screen
-    print("\n📱 Navigating to Jersey Validation...")
-    
-    # Try different tap coordinates for navigation
-    nav_attempts = [
-        (540, 700),   # Main Jersey Validation button
-        (540, 800),   # Alternative position
-        (540, 900),   # Lower position
-        (270, 1400),  # Bottom navigation
-        (810, 1400),  # Right side navigation
-    ]
-    
-    for i, (x, y) in enumerate(nav_attempts):
+    try:
+        point = device.tap_until_screen(NAV_POSITIONS, "JerseyValidation")
+        print(f"{prefix}✅ Successfully navigated to Jersey Validation screen!{f' (tapped {point})' if point else ''}")
+    except (AdbError, TimeoutError) as e:
+        print(f"{prefix}⚠️  Navigation failed: {e}")
+
+def generate_sample(device):
+    """
+    Taps the candidate positions one at a time until the collector logs a saved
+    sample (the app then shows the next photo by itself). If no tap saved one,
+    Skip moves on to a new positioning and we wait for the screen to be back.
+    Returns True if a sample was stored.
+    """
+    for point in GENERATION_TAPS:
+        device.tap(*point)
         try:
-            print(f"  Attempt {i+1}: Tapping ({x}, {y})")
-            subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "input", "tap", str(x), str(y)
-            ], timeout=5)
-            time.sleep(2)
-            
-            # Check if we're in validation screen
-            result = subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "dumpsys", "activity", "top"
-            ], capture_output=True, text=True, timeout=5)
-            
-            if "JerseyValidation" in result.stdout:
-                print("  ✅ Successfully navigated to Jersey Validation screen!")
-                break
-        except Exception as e:
-            print(f"  ⚠️  Navigation attempt {i+1} failed: {e}")
-    
-    # Generate test samples
-    print("\n🎯 Testing Enhanced Positioning...")
-    
-    # Generate multiple samples to test positioning variety
-    sample_positions = []
-    
-    for i in range(10):
+            device.wait_for_log(CAPTURED_PATTERN, timeout=CAPTURE_TIMEOUT, fail_pattern=CAPTURE_FAILED_PATTERN)
+            return True
+        except TimeoutError:
+            continue
+    device.tap(*SKIP_BUTTON)
+    device.wait_for_screen("JerseyValidation")
+    return False
+
+def generate_samples(device, count):
+    """Generates count samples on one device; returns how many were stored"""
+    stored = 0
+    for i in range(count):
         try:
-            print(f"  Generating sample {i+1}/10...")
-            
-            # Tap to generate new sample (try multiple locations)
-            generation_taps = [(540, 1100), (540, 1200), (540, 1300)]
-            
-            for tap_x, tap_y in generation_taps:
-                subprocess.run([
-                    "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                    "shell", "input", "tap", str(tap_x), str(tap_y)
-                ], timeout=5)
-                time.sleep(1)
-            
-            # Skip/Next to generate new positioning
-            subprocess.run([
-                "C:/Users/Ryan/AppData/Local/Android/Sdk/platform-tools/adb.exe",
-                "shell", "input", "tap", "810", "1200"  # Skip button
-            ], timeout=5)
-            
-            time.sleep(2)
-            
-        except Exception as e:
+            print(f"  Generating sample {i+1}/{count}...")
+            if generate_sample(device):
+                stored += 1
+            else:
+                print(f"    ⚠️  Sample {i+1}: no tap saved a sample, skipped")
+        except (AdbError, TimeoutError) as e:
             print(f"    ⚠️  Sample {i+1} generation error: {e}")
+    return stored
+
+def count_device_samples(device):
+    """Images currently stored by the app on the device"""
+    output = device.shell(f"ls {DEVICE_DATASET_DIR}/images 2>/dev/null | wc -l || true")
+    return int(output.strip() or 0)
+
+def _device_worker(serial, adb, tickets, pull_dir):
+    """
+    Runs on its own thread per device: claims samples from the shared queue until
+    it's empty, so faster devices end up generating more.
+    """
+    prefix = f"  [{serial}] "
+    result = {"serial": serial, "generated": 0, "captured": 0, "errors": 0}
+    try:
+        with AdbDriver(serial=serial, adb=adb, log_tags=DRIVER_LOG_TAGS) as device:
+            prepare_device(device, prefix)
+            before = count_device_samples(device)
+            started = time.perf_counter()
+            while True:
+                try:
+                    tickets.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    result["captured"] += generate_sample(device)
+                    result["generated"] += 1
+                except (AdbError, TimeoutError) as e:
+                    result["errors"] += 1
+                    print(f"{prefix}⚠️  Sample generation error: {e}")
+            elapsed = time.perf_counter() - started
+
+            result["seconds"] = round(elapsed, 2)
+            result["stored"] = count_device_samples(device) - before
+            result["samples_per_min"] = round(result["stored"] / elapsed * 60, 1) if elapsed > 0 else None
+
+            if pull_dir:
+                pull_started = time.perf_counter()
+                result["pulled_files"] = device.pull_tar(DEVICE_DATASET_DIR, Path(pull_dir) / serial.replace(":", "_"),
+                                                         paths=("images", "annotations"))
+                result["pull_seconds"] = round(time.perf_counter() - pull_started, 2)
+    except (AdbError, TimeoutError, OSError) as e:
+        result["error"] = str(e)
+        print(f"{prefix}❌ {e}")
+    return result
+
+def generate_on_all_devices(total_samples, adb=None, pull_dir=None):
+    """
+    Fans sample generation out over every attached device/emulator and
+    optionally pulls each device's dataset back with one tar stream.
+    Returns per-device results with samples/minute.
+    """
+    serials = list_devices(adb)
+    if not serials:
+        print("❌ No devices attached (adb devices)")
+        return []
+    print(f"📱 {len(serials)} device(s): {', '.join(serials)}")
+
+    tickets = queue.Queue()
+    for i in range(total_samples):
+        tickets.put(i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(len(serials)) as executor:
+        results = list(executor.map(lambda serial: _device_worker(serial, adb, tickets, pull_dir), serials))
+    elapsed = time.perf_counter() - started
+
+    print("\n⏱️  Per-device throughput:")
+    for result in results:
+        line = f"  {result['serial']:<24} {result.get('stored', 0):>5} stored ({result['generated']} attempted)"
+        if "samples_per_min" in result:
+            line += f"  {result['samples_per_min']:>7} samples/min"
+        if "pulled_files" in result:
+            line += f"  pulled {result['pulled_files']} files in {result['pull_seconds']}s"
+        if "error" in result:
+            line += f"  ❌ {result['error']}"
+        print(line)
+    stored = sum(result.get("stored", 0) for result in results)
+    print(f"  {'total':<24} {stored:>5} stored  {stored / elapsed * 60:>7.1f} samples/min ({elapsed:.1f}s)")
+    return results
+
+def test_enhanced_positioning(serial=None, adb=None, samples=10):
+    """Test the enhanced positioning system by generating samples"""
+    
+    print("🏈 Testing Enhanced Jersey Positioning System")
+    print("=" * 50)
+
+    try:
+        device = AdbDriver(serial=serial, adb=adb, log_tags=DRIVER_LOG_TAGS).open()
+    except AdbError as e:
+        print(f"❌ {e}")
+        return
+
+    with device:
+        print("\n📱 Navigating to Jersey Validation...")
+        prepare_device(device, "  ")
+
+        # Generate multiple samples to test positioning variety
+        print("\n🎯 Testing Enhanced Positioning...")
+        started = time.perf_counter()
+        stored = generate_samples(device, samples)
+        elapsed = time.perf_counter() - started
+        print(f"  ⏱️  {stored}/{samples} samples stored in {elapsed:.1f}s")
     
     # Analysis summary
     print("\n📊 Enhanced Positioning Test Summary:")
@@ -122,4 +214,19 @@ def test_enhanced_positioning():
     print("4. 📱 Deploy custom ML model for real-world testing")
 
 if __name__ == "__main__":
-    test_enhanced_positioning()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate positioning samples on a device over adb")
+    parser.add_argument("--serial", help="Device serial (adb devices); default: the only attached device")
+    parser.add_argument("--adb", help="adb executable (default: ADB, ANDROID_SDK_ROOT or local.properties)")
+    parser.add_argument("--samples", type=int, default=10, help="Samples to generate (in total with --all-devices)")
+    parser.add_argument("--all-devices", action="store_true", help="Spread generation over every attached device")
+    parser.add_argument("--pull", help="With --all-devices: pull each device's images/annotations here")
+    parser.add_argument("--report", help="With --all-devices: write per-device results as JSON")
+    args = parser.parse_args()
+
+    if args.all_devices:
+        results = generate_on_all_devices(args.samples, args.adb, args.pull)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(results, f, indent=2)
+    else:
+        test_enhanced_positioning(args.serial, args.adb, args.samples)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TESTS_DIR.parent))
+
+FAKE_ADB = TESTS_DIR / "fake_adb.py"
+
+
+@pytest.fixture
+def fake_device(tmp_path, monkeypatch):
+    """State directory of a fresh fake device (see fake_adb.py); ADB points at the stand-in"""
+    state = tmp_path / "device"
+    (state / "screens").mkdir(parents=True)
+    (state / "tap_logs").mkdir()
+    monkeypatch.setenv("FAKE_ADB_STATE", str(state))
+    monkeypatch.setenv("ADB", str(FAKE_ADB))
+    return state
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Fake ADB
+Stand-in for adb that adb_driver.py can drive without a device (ADB=tests/fake_adb.py).
+
+Device state lives in the directory named by FAKE_ADB_STATE:
+    screen          what `dumpsys ...` prints (the "top activity")
+    logcat          lines served by `adb logcat` (followed, so appended lines stream out)
+    taps            every `input tap X Y`, one per line
+    screens/X_Y     if present, becomes the screen after a tap at X Y
+    tap_logs/X_Y    if present, appended to logcat after a tap at X Y
+
+Supported:
+    adb [-s SERIAL] shell         a real `sh` with fake dumpsys / input / am on PATH
+    adb [-s SERIAL] exec-out CMD  runs CMD with `sh -c`
+    adb [-s SERIAL] logcat ...    filters and -T are ignored
+    adb devices                   one device, "fake-device"
+    adb tool NAME ARGS            used by the fake dumpsys / input / am wrappers
+"""
+
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+SERIAL = "fake-device"
+TOOLS = ("dumpsys", "input", "am")
+LOGCAT_POLL = 0.02  # seconds between checks for appended logcat lines
+
+
+def state_dir():
+    return Path(os.environ["FAKE_ADB_STATE"])
+
+
+def _install_tools(state):
+    """Small sh wrappers that call back into this script as `tool NAME`"""
+    bin_dir = state / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    for name in TOOLS:
+        wrapper = bin_dir / name
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).resolve()}" tool {name} "$@"\n')
+        wrapper.chmod(0o755)
+    return bin_dir
+
+
+def _shell(state):
+    bin_dir = _install_tools(state)
+    env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    os.execvpe("sh", ["sh"], env)
+
+
+def _logcat(state):
+    path = state / "logcat"
+    path.touch()
+    with open(path, encoding="utf-8") as log:
+        while True:
+            line = log.readline()
+            if line:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                time.sleep(LOGCAT_POLL)
+
+
+def _tool(state, name, args):
+    screen = state / "screen"
+    if name == "dumpsys":
+        print(screen.read_text(encoding="utf-8") if screen.exists() else "")
+    elif name == "input" and args[:1] == ["tap"]:
+        x, y = args[1:3]
+        with open(state / "taps", "a", encoding="utf-8") as taps:
+            taps.write(f"{x} {y}\n")
+        target = state / "screens" / f"{x}_{y}"
+        if target.exists():
+            shutil.copyfile(target, screen)
+        log = state / "tap_logs" / f"{x}_{y}"
+        if log.exists():
+            with open(state / "logcat", "a", encoding="utf-8") as logcat:
+                logcat.write(log.read_text(encoding="utf-8"))
+    elif name == "am" and args[:1] == ["start"]:
+        activity = args[args.index("-n") + 1]
+        screen.write_text(f"ACTIVITY {activity}\n", encoding="utf-8")
+        print(f"Starting: Intent {{ cmp={activity} }}\nStatus: ok\nActivity: {activity}")
+    else:
+        print(f"fake adb: unsupported {name} {' '.join(args)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv):
+    if argv[:1] == ["-s"]:
+        if argv[1] != SERIAL:
+            print(f"error: device '{argv[1]}' not found", file=sys.stderr)
+            return 1
+        argv = argv[2:]
+    if not argv:
+        print("usage: fake_adb.py [-s SERIAL] shell|exec-out|logcat|devices", file=sys.stderr)
+        return 1
+
+    command, args = argv[0], argv[1:]
+    if command == "devices":
+        print(f"List of devices attached\n{SERIAL}\tdevice\n")
+        return 0
+    state = state_dir()
+    if command == "shell" and not args:
+        _shell(state)
+    if command == "exec-out":
+        os.execvp("sh", ["sh", "-c", " ".join(args)])
+    if command == "logcat":
+        _logcat(state)
+    if command == "tool":
+        return _tool(state, args[0], args[1:])
+    print(f"fake adb: unsupported command {command}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from adb_driver import AdbDriver, AdbError, find_adb, list_devices
+
+
+@pytest.fixture
+def device(fake_device):
+    with AdbDriver() as driver:
+        yield driver
+
+
+def append_log(state, *lines, delay=0.0):
+    def write():
+        time.sleep(delay)
+        with open(state / "logcat", "a", encoding="utf-8") as log:
+            log.writelines(f"{line}\n" for line in lines)
+
+    threading.Thread(target=write, daemon=True).start()
+
+
+# Shell and end marker ---------------------------------------------------------
+
+def test_shell_returns_output(device):
+    assert device.shell("echo one; echo two") == "one\ntwo"
+
+
+def test_shell_output_without_trailing_newline(device):
+    started = time.monotonic()
+    assert device.shell("printf abc", timeout=3) == "abc"
+    assert time.monotonic() - started < 2
+
+
+def test_shell_empty_output(device):
+    assert device.shell("true") == ""
+
+
+def test_shell_keeps_session_state(device):
+    device.shell("export DRIVER_TEST=42")
+    assert device.shell("echo $DRIVER_TEST") == "42"
+
+
+def test_shell_nonzero_status_raises(device):
+    with pytest.raises(AdbError, match="exited with 3"):
+        device.shell("echo boom; (exit 3)")
+    assert device.shell("echo still alive") == "still alive"
+
+
+def test_shell_timeout_starts_a_fresh_session(device):
+    with pytest.raises(TimeoutError):
+        device.shell("sleep 5", timeout=0.5)
+    assert device.shell("echo recovered", timeout=3) == "recovered"
+
+
+def test_batch_and_taps(device, fake_device):
+    assert device.batch(["echo a", "echo b"]) == "a\nb"
+    device.taps([(1, 2), (3.7, 4)])
+    assert (fake_device / "taps").read_text().splitlines() == ["1 2", "3 4"]
+
+
+# Screen -------------------------------------------------------------------------
+
+def test_start_app_and_wait_for_screen(device):
+    device.start_app()
+    assert device.wait_for_screen("MainActivity", timeout=2)
+
+
+def test_wait_for_screen_times_out(device):
+    started = time.monotonic()
+    with pytest.raises(TimeoutError, match="JerseyValidation"):
+        device.wait_for_screen("JerseyValidation", timeout=0.5)
+    assert time.monotonic() - started < 3
+
+
+def test_tap_until_screen_stops_at_first_working_tap(device, fake_device):
+    (fake_device / "screens" / "540_800").write_text("ACTIVITY JerseyValidationActivity\n")
+    point = device.tap_until_screen([(540, 700), (540, 800), (540, 900)], "JerseyValidation",
+                                    timeout_per_tap=0.5)
+    assert point == (540, 800)
+    assert (fake_device / "taps").read_text().splitlines() == ["540 700", "540 800"]
+
+
+def test_tap_until_screen_raises_when_no_tap_works(device):
+    with pytest.raises(TimeoutError):
+        device.tap_until_screen([(1, 1), (2, 2)], "JerseyValidation", timeout_per_tap=0.3)
+
+
+# Logcat -------------------------------------------------------------------------
+
+def test_wait_for_log_returns_matching_line(device, fake_device):
+    device.start_logcat()
+    append_log(fake_device, "I TrainingPipeline: Training started", "I Export: model exported successfully",
+               delay=0.2)
+    assert "exported successfully" in device.wait_for_log("exported successfully", timeout=5)
+
+
+def test_wait_for_log_fail_pattern_raises(device, fake_device):
+    append_log(fake_device, "E TrainingPipeline: Conversion failed", "I Export: exported successfully")
+    with pytest.raises(AdbError, match="Conversion failed"):
+        device.wait_for_log("exported successfully", timeout=5, fail_pattern="failed")
+
+
+def test_wait_for_log_times_out(device, fake_device):
+    append_log(fake_device, "I TrainingPipeline: still training")
+    with pytest.raises(TimeoutError):
+        device.wait_for_log("exported successfully", timeout=0.5)
+
+
+# Device discovery and transfers ------------------------------------------------
+
+def test_find_adb_uses_python_for_fake_script(fake_device):
+    command = find_adb()
+    assert command[-1].endswith("fake_adb.py")
+    assert list_devices() == ["fake-device"]
+
+
+def test_unknown_serial_fails(fake_device):
+    with pytest.raises(AdbError):
+        AdbDriver(serial="missing").run("shell", "echo hi")
+
+
+def test_pull_tar(fake_device, tmp_path):
+    remote = tmp_path / "remote"
+    (remote / "images").mkdir(parents=True)
+    (remote / "images" / "a.jpg").write_bytes(b"jpeg")
+    (remote / "labels.json").write_text("{}")
+    local = tmp_path / "local"
+    assert AdbDriver().pull_tar(remote, local) == 2
+    assert (local / "images" / "a.jpg").read_bytes() == b"jpeg"
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from pipeline_monitor import PipelineMonitor, replay_lines, run_monitor
+
+RECORDED = Path(__file__).resolve().parent / "fixtures" / "pipeline_logcat.txt"
+
+
+def replay(path, output=None, until=None):
+    monitor = PipelineMonitor(output)
+    return asyncio.run(run_monitor(replay_lines(path), monitor, until=until, echo=False))
+
+
+def line(clock, tag, message):
+    return f"10-16 21:{clock}  4321  4390 D {tag}: {message}\n"
+
+
+def test_replay_times_every_stage(tmp_path):
+    events_path = tmp_path / "events.jsonl"
+    with open(events_path, "w", encoding="utf-8") as output:
+        summary = replay(RECORDED, output)
+
+    assert not summary["failed"]
+    assert summary["open_stages"] == []
+    durations = {stage: totals["last_s"] for stage, totals in summary["stages"].items()}
+    assert durations == {"export": 3.0, "yolo_conversion": 2.5, "training": 70.0,
+                         "tflite_conversion": 12.5, "deploy": 2.25}
+    assert all(totals["runs"] == 1 and totals["errors"] == 0 for totals in summary["stages"].values())
+
+    events = [json.loads(row) for row in events_path.read_text(encoding="utf-8").splitlines()]
+    assert [e["event"] for e in events if e["stage"] == "training"] == ["start", "progress", "progress", "end"]
+
+
+def test_second_end_line_for_a_closed_stage_is_ignored():
+    monitor = PipelineMonitor()
+    monitor.feed(line("04:20.000", "Training", "🐍 Starting model training with command: python train.py"))
+    assert [e["event"] for e in monitor.feed(line("05:30.000", "Training", "📊 📤 Exporting trained model..."))] \
+        == ["end", "start"]
+    # "exit code: 0" also matches the training end rule, but training already closed
+    events = monitor.feed(line("05:43.000", "Training", "🏁 Training completed with exit code: 0"))
+    assert [(e["stage"], e["event"]) for e in events] == [("deploy", "start")]
+    assert monitor.totals["training"]["runs"] == 1
+    assert monitor.totals["training"]["last_s"] == 70.0
+
+
+@pytest.mark.parametrize("code", ["1", "10", "-9"])
+def test_nonzero_exit_code_fails_training(code, tmp_path):
+    recorded = tmp_path / "failed.txt"
+    recorded.write_text(line("04:20.000", "Training", "🐍 Starting model training with command: python train.py")
+                        + line("04:35.500", "Training", f"🏁 Training completed with exit code: {code}")
+                        + line("04:36.000", "Deploy", "🚀 Model deployed to /data/model.tflite"),
+                        encoding="utf-8")
+    summary = replay(recorded)
+
+    assert summary["failed"]
+    assert summary["stages"]["training"]["errors"] == 1
+    assert summary["stages"]["training"]["runs"] == 0
+    # The monitor stops at the failure; deploy never starts
+    assert summary["lines"] == 2
+    assert summary["stages"]["deploy"]["runs"] == 0
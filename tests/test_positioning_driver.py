@@ -0,0 +1,38 @@
+import pytest
+
+import test_positioning
+from adb_driver import AdbDriver
+
+SCREEN = "ACTIVITY com.playerid.app/.JerseyValidationActivity\n"
+
+
+@pytest.fixture
+def device(fake_device, monkeypatch):
+    monkeypatch.setattr(test_positioning, "CAPTURE_TIMEOUT", 0.5)
+    (fake_device / "screen").write_text(SCREEN)
+    with AdbDriver(log_tags=test_positioning.DRIVER_LOG_TAGS) as driver:
+        driver.start_logcat()
+        yield driver
+
+
+def taps(state):
+    return (state / "taps").read_text().splitlines()
+
+
+def test_generate_sample_waits_for_the_save_line(device, fake_device):
+    (fake_device / "tap_logs" / "540_1200").write_text(
+        "D DatasetCollector: ✅ Captured training sample: jersey_7.jpg\n")
+    assert test_positioning.generate_sample(device) is True
+    # Stops at the tap that saved; no Skip afterwards
+    assert taps(fake_device) == ["540 1100", "540 1200"]
+
+
+def test_generate_sample_skips_when_nothing_is_saved(device, fake_device):
+    assert test_positioning.generate_sample(device) is False
+    assert taps(fake_device) == ["540 1100", "540 1200", "540 1300", "810 1200"]
+
+
+def test_generate_samples_counts_stored_samples(device, fake_device):
+    (fake_device / "tap_logs" / "540_1100").write_text(
+        "D DatasetCollector: ✅ Captured training sample: jersey_7.jpg\n")
+    assert test_positioning.generate_samples(device, 3) == 3